@@ -1,7 +1,25 @@
 from .autodock import AutoDock
+from .mapcache import MapCache
+from .prepcache import PrepCache
+from .resultstore import ResultStore
+from .posestore import PoseArchive
+from .metrics import RunMetrics, StageTimer
+from .poses import readPoses, pairwiseRMSD, clusterPoses, clusterDockingResults
+from .jobs import DockingJob
+from .journal import CheckpointJournal
+from .sinks import ResultSink
+from .engine import DockingEngine
+from .workqueue import WorkQueue
+from .scheduler import ReceptorMajorScheduler, estimateLigandCost
 from .dockprep import DockPrep
-from .alphafold import AlphaFold
+from .alphafold import AlphaFold, HTTPBackend, MirrorBackend
 from .workflow import Workflows
 from .utils import extractBindingAffinity, trimName
+from .extract import pdbqt2csv
+from .boxes import boxFromCavity, boxFromLigand, boxFromResidues
+from .trim import trimReceptor
+from .ligprep import prepareLigandsParallel
+from .library import LigandLibrary, screenLibrary
+from .manifest import JobManifest, writeManifest
 
-__all__ = ["extractBindingAffinity", "trimName", "AlphaFold", "AutoDock", "DockPrep", "Workflows"]
\ No newline at end of file
+__all__ = ["extractBindingAffinity", "trimName", "pdbqt2csv", "readPoses", "pairwiseRMSD", "clusterPoses", "clusterDockingResults", "boxFromCavity", "boxFromLigand", "boxFromResidues", "trimReceptor", "writeManifest", "prepareLigandsParallel", "AlphaFold", "HTTPBackend", "MirrorBackend", "AutoDock", "CheckpointJournal", "DockPrep", "DockingEngine", "DockingJob", "JobManifest", "LigandLibrary", "MapCache", "PoseArchive", "PrepCache", "ResultStore", "ReceptorMajorScheduler", "ResultSink", "RunMetrics", "StageTimer", "estimateLigandCost", "screenLibrary", "WorkQueue", "Workflows"]
\ No newline at end of file
@@ -0,0 +1,259 @@
+import os
+import json
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HTTPBackend:
+    def __init__(
+        self,
+        pool_size: int = 8,
+        retries: int = 3,
+        timeout: float = 30.0,
+        uniprot_url: str = "https://rest.uniprot.org/uniprotkb/search",
+        alphafold_url: str = "https://alphafold.ebi.ac.uk/files",
+    ) -> None:
+        """
+        Fetch structures from the AlphaFold database over HTTP.
+
+        All requests go through one `requests.Session` whose connection pool
+        holds `pool_size` keep-alive connections per host, so concurrent
+        fetches reuse connections instead of opening a new one per request.
+        Transient errors (429, 5xx) are retried with backoff.
+
+        Args:
+            pool_size: Connections kept per host, at least the fetch concurrency
+            retries: Retries of a failed request
+            timeout: Timeout of a request in seconds
+            uniprot_url: UniProt search endpoint used to map genes to UniProt IDs
+            alphafold_url: Base URL of the AlphaFold model files
+        """
+        self.timeout = timeout
+        self.uniprot_url = uniprot_url
+        # Scopes the gene lookups AlphaFold caches from this backend
+        self.cache_key = uniprot_url
+        self.alphafold_url = alphafold_url
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def resolve(self, gene: str, organism_id: int = 9606) -> Optional[str]:
+        """Return the reviewed UniProt ID of a gene, or None if there is none."""
+        response = self.session.get(
+            self.uniprot_url,
+            params={
+                "query": f"gene_exact:{gene} AND organism_id:{organism_id} AND reviewed:true",
+                "fields": "accession",
+                "format": "json",
+                "size": 1,
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        results = response.json().get("results", [])
+        return results[0]["primaryAccession"] if results else None
+
+    def fetch(self, uniprot_id: str, model_version: int) -> Optional[bytes]:
+        """Return the PDB file of a model, or None if the database has none."""
+        response = self.session.get(
+            f"{self.alphafold_url}/{modelFileName(uniprot_id, model_version)}",
+            timeout=self.timeout,
+        )
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.content
+
+
+class MirrorBackend:
+    def __init__(self, root: str) -> None:
+        """
+        Read structures from a local copy of the AlphaFold database.
+
+        The directory holds model files named like the database
+        (`AF-<UniProt ID>-F1-model_v<version>.pdb`) and, optionally, a
+        `genes.json` mapping gene names to UniProt IDs. Genes missing from the
+        mapping are not resolved. Useful offline and in tests.
+
+        Args:
+            root: Directory of the mirror
+        """
+        self.root = root
+        self.cache_key = f"mirror:{os.path.abspath(root)}"
+        self.genes: Dict[str, str] = {}
+        mapping_file = os.path.join(root, "genes.json")
+        if os.path.exists(mapping_file):
+            with open(mapping_file, "r") as f:
+                self.genes = json.load(f)
+
+    def resolve(self, gene: str, organism_id: int = 9606) -> Optional[str]:
+        """Return the UniProt ID of a gene from the mirror's mapping, or None if unmapped."""
+        return self.genes.get(gene)
+
+    def fetch(self, uniprot_id: str, model_version: int) -> Optional[bytes]:
+        """Return the PDB file of a model, or None if the mirror has none."""
+        path = os.path.join(self.root, modelFileName(uniprot_id, model_version))
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def modelFileName(uniprot_id: str, model_version: int) -> str:
+    """File name of an AlphaFold model in the database and the cache."""
+    return f"AF-{uniprot_id}-F1-model_v{model_version}.pdb"
+
+
+class AlphaFold:
+    def __init__(
+        self,
+        pdb_path: str = "./data/receptors",
+        backend=None,
+        cache_dir: str = "./.adpy_cache/alphafold",
+        model_version: int = 4,
+        max_workers: int = 8,
+        organism_id: int = 9606,
+    ) -> None:
+        """
+        Retrieve AlphaFold structures of genes.
+
+        Downloaded models are kept in an on-disk cache keyed by UniProt ID and
+        model version, and gene to UniProt ID lookups are cached next to them,
+        so repeated runs do not download the same receptors again. Batches
+        are fetched on a thread pool of at most `max_workers` threads.
+
+        Args:
+            pdb_path: Directory the structures are saved to, as `<gene>.pdb`
+            backend: HTTPBackend or MirrorBackend, defaults to an HTTPBackend
+                with one pooled connection per worker
+            cache_dir: Directory of the structure cache
+            model_version: AlphaFold database model version
+            max_workers: Maximum number of concurrent fetches
+            organism_id: NCBI taxonomy ID used to resolve gene names (9606: human)
+        """
+        self.pdb_path = pdb_path
+        self.backend = backend if backend is not None else HTTPBackend(pool_size=max_workers)
+        self.cache_dir = cache_dir
+        self.model_version = model_version
+        self.max_workers = max_workers
+        self.organism_id = organism_id
+        self.downloads = 0
+        self.cache_hits = 0
+
+        os.makedirs(self.pdb_path, exist_ok=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._uniprot_file = os.path.join(self.cache_dir, "uniprot_ids.json")
+        self._uniprot_ids: Dict[str, str] = {}
+        if os.path.exists(self._uniprot_file):
+            with open(self._uniprot_file, "r") as f:
+                self._uniprot_ids = json.load(f)
+
+    def _from_gene_single(self, gene: str) -> Optional[str]:
+        """
+        Retrieve the AlphaFold structure of one gene.
+
+        Args:
+            gene (str): Gene name, e.g. "EGFR".
+
+        Returns:
+            Optional[str]: Path of the saved structure, or None if the gene has
+            no UniProt entry or AlphaFold model.
+        """
+        try:
+            uniprot_id = self._uniprot_id(gene)
+            if uniprot_id is None:
+                print(f"No UniProt entry found for gene {gene}")
+                return None
+
+            cached = self._from_uniprot(uniprot_id)
+            if cached is None:
+                print(f"No AlphaFold model v{self.model_version} found for {gene} ({uniprot_id})")
+                return None
+        except requests.RequestException as e:
+            print(f"Error retrieving AlphaFold structure of {gene}: {str(e)}")
+            return None
+
+        target = os.path.join(self.pdb_path, f"{gene}.pdb")
+        shutil.copyfile(cached, target)
+        print(f"AlphaFold structure of {gene} ({uniprot_id}) saved to {target}")
+        return target
+
+    def _from_gene_batch(self, genes: List[str]) -> List[Optional[str]]:
+        """
+        Retrieve the AlphaFold structures of several genes concurrently.
+
+        Args:
+            genes (List[str]): Gene names.
+
+        Returns:
+            List[Optional[str]]: Path of the saved structure of every gene, in
+            input order; None for genes that could not be retrieved.
+        """
+        paths = dict(self._iter_genes(genes))
+        print(
+            f"AlphaFold structures retrieved: {sum(p is not None for p in paths.values())}"
+            f"/{len(genes)} (downloaded: {self.downloads}, cached: {self.cache_hits})"
+        )
+        return [paths[gene] for gene in genes]
+
+    def _iter_genes(self, genes: List[str]) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield (gene, path) as soon as each structure is retrieved, in completion order."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._from_gene_single, gene): gene for gene in genes}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def _from_uniprot(self, uniprot_id: str) -> Optional[str]:
+        """Return the cached model of a UniProt ID, fetching it on a cache miss."""
+        cached = os.path.join(self.cache_dir, modelFileName(uniprot_id, self.model_version))
+        if os.path.exists(cached):
+            with self._lock:
+                self.cache_hits += 1
+            return cached
+
+        content = self.backend.fetch(uniprot_id, self.model_version)
+        if content is None:
+            return None
+
+        # Write to a temporary file first so readers never see a partial model
+        tmp_file = f"{cached}.tmp-{uuid.uuid4().hex}"
+        with open(tmp_file, "wb") as f:
+            f.write(content)
+        os.replace(tmp_file, cached)
+        with self._lock:
+            self.downloads += 1
+        return cached
+
+    def _uniprot_id(self, gene: str) -> Optional[str]:
+        """Resolve a gene to its UniProt ID, cached on disk per backend."""
+        lookup = f"{self.backend.cache_key}|{gene}:{self.organism_id}"
+        with self._lock:
+            if lookup in self._uniprot_ids:
+                return self._uniprot_ids[lookup]
+
+        uniprot_id = self.backend.resolve(gene, self.organism_id)
+        if uniprot_id is None:
+            return None
+
+        with self._lock:
+            self._uniprot_ids[lookup] = uniprot_id
+            tmp_file = f"{self._uniprot_file}.tmp-{uuid.uuid4().hex}"
+            with open(tmp_file, "w") as f:
+                json.dump(self._uniprot_ids, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self._uniprot_file)
+        return uniprot_id
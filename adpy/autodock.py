@@ -1,26 +1,138 @@
 import os
 import csv
-from typing import List, Tuple, Optional, Union
+from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
 import subprocess
 import requests
 import sys
 
 from vina import Vina
-from .utils import trimName, extractBindingAffinity
+from .utils import trimName
+from .mapcache import MapCache
+from .jobs import DockingJob
+from .journal import CheckpointJournal
+from .sinks import ResultSink
+from .resultstore import ResultStore
+from .posestore import PoseArchive
+from .poses import readPoses, poseClusterColumns
+from .metrics import StageTimer, RunMetrics, _castTimingColumns
+from .boxes import readBoxFile, receptorBoxFile
+from .manifest import JobManifest, _scanPDBQT
+from .extract import POSE_FIELDS
 import polars as pl
 
+if TYPE_CHECKING:
+    from .engine import DockingEngine
+
+# Stages timed for every docking job, see StageTimer
+TIMED_STAGES = ("receptor", "ligand", "maps", "dock", "write", "energies")
+
+# Settings that change the result of a job; an engine's workers must be
+# configured like the AutoDock whose batch method they dock for
+ENGINE_SETTINGS = ("sf_name", "seed", "spacing", "diagnostics", "pose_archive_dir", "cluster_rmsd")
+
+
+def _emptyResultRow(
+    job: DockingJob,
+    status: str,
+    diagnostics: bool = False,
+    cluster_rmsd: Optional[float] = None,
+    timing: bool = False,
+) -> dict:
+    """
+    Result row of a job that produced no result (failed, timed out)
+
+    The row has the columns of a successful row of the same configuration,
+    with every value None, so all execution paths emit the same columns.
+    """
+    row = {
+        "ligand": trimName(job.ligand),
+        "receptor": trimName(job.receptor),
+        "binding_affinity": None,
+    }
+    for k in range(1, job.n_poses + 1):
+        for field in POSE_FIELDS:
+            row[f"{field}_{k}"] = None
+    if cluster_rmsd is not None:
+        row["n_clusters"] = None
+        row["top_cluster_size"] = None
+        for k in range(1, job.n_poses + 1):
+            row[f"cluster_{k}"] = None
+    if diagnostics:
+        row["score_before_minimization"] = None
+        row["score_after_minimization"] = None
+    if timing:
+        stages = TIMED_STAGES + (("diagnostics",) if diagnostics else ())
+        stages += ("cluster",) if cluster_rmsd is not None else ()
+        for stage in stages:
+            row[f"time_{stage}"] = None
+        row["time_total"] = None
+        row["peak_rss_mb"] = None
+    row["status"] = status
+    return row
+
 
 class AutoDock:
-    def __init__(self, sf_name: str = "vina") -> None:
+    def __init__(
+        self,
+        sf_name: str = "vina",
+        reuse_maps: bool = True,
+        map_cache: Optional[MapCache] = None,
+        spacing: float = 0.375,
+        cpu: int = 0,
+        seed: int = 0,
+        result_store: Optional[ResultStore] = None,
+        diagnostics: bool = False,
+        pose_archive: Optional[PoseArchive] = None,
+        cluster_rmsd: Optional[float] = None,
+        timing: bool = False,
+        metrics: Optional[RunMetrics] = None,
+    ) -> None:
         """
         Initialize AutoDock with Vina scoring function.
 
         Args:
             sf_name: Scoring function name for Vina
+            reuse_maps: Keep the affinity maps of the last receptor/box and only
+                swap the ligand when the batch methods dock against them again
+            map_cache: On-disk map cache to load maps from instead of computing them
+            spacing: Grid spacing of the affinity maps in Angstrom
+            cpu: Number of CPUs Vina uses (0 uses all available)
+            seed: Random seed for Vina (0 picks a random seed)
+            result_store: Store of finished results consulted by the batch
+                methods before docking a job
+            diagnostics: Score and locally optimize the input pose before
+                docking and add both scores to the results. Off for screening.
+            pose_archive: Append docked poses to this sharded archive instead
+                of writing one PDBQT file per ligand-receptor pair. Results
+                reused from the result store are not appended again.
+            cluster_rmsd: Cluster the poses of every run at this RMSD cutoff
+                (Angstrom) and add the cluster columns to the results
+            timing: Add per-stage wall times (time_<stage>, time_total) and
+                the peak RSS of the process (peak_rss_mb) to every result
+            metrics: Run metrics the batch methods report throughput to.
+                Turns on timing.
         """
-        self.v = Vina(sf_name=sf_name)
+        self.sf_name = sf_name
+        self.seed = seed
+        self.v = Vina(sf_name=sf_name, cpu=cpu, seed=seed)
         self.default_center = (-0.319, 5.27, 1.59)
         self.default_box_size = (80, 80, 80)
+        self.spacing = spacing
+        self.map_cache = map_cache
+        self.result_store = result_store
+        self.diagnostics = diagnostics
+        self.pose_archive = pose_archive
+        self.cluster_rmsd = cluster_rmsd
+        self.metrics = metrics
+        self.timing = timing or metrics is not None
+
+        # Affinity map reuse state
+        self.reuse_maps = reuse_maps
+        self._map_key = None
+        self.map_builds = 0
+        self.map_builds_skipped = 0
+        # Set once jobs ran on workers that do not report their map builds back
+        self._map_builds_unknown = False
 
     def singleLigandSingleReceptor(
         self,
@@ -33,6 +145,7 @@ class AutoDock:
         exhaustiveness: int = 32,
         n_poses: int = 5,
         save_csv: bool = True,
+        box_from_receptor: bool = False,
     ) -> pl.DataFrame:
         """
         Run docking: Single Ligand - Single Receptor
@@ -46,6 +159,8 @@ class AutoDock:
             exhaustiveness: pass
             n_poses: pass
             save_csv: pass
+            box_from_receptor: Use the box file written next to the prepared
+                receptor by DockPrep.prepare_receptor, if present
 
         Raises:
             FileNotFoundError: If ligand or receptor file doesn't exist
@@ -57,6 +172,7 @@ class AutoDock:
         # use default values if AlphaFold protein
         center = self.default_center if AlphaFold else center
         box_size = self.default_box_size if AlphaFold else box_size
+        center, box_size = self._resolve_box(receptor, center, box_size, box_from_receptor)
 
         # Ensure output directories exist
         os.makedirs(output_dir, exist_ok=True)
@@ -67,10 +183,11 @@ class AutoDock:
                 ligand, receptor, center, box_size, exhaustiveness, n_poses, output_dir
             )
 
+            df_docking_results = pl.DataFrame(docking_results)
+
             # Save results if requested
             if save_csv:
                 # self._save_results_to_csv(docking_results, output_dir)
-                df_docking_results = pl.DataFrame(docking_results)
                 csv_path = f"{docking_results['ligand']}_{docking_results['receptor']}_docking_results.csv"
                 output_path = os.path.join(output_dir, csv_path)
                 df_docking_results.write_csv(output_path)
@@ -93,6 +210,10 @@ class AutoDock:
         exhaustiveness: int = 32,
         n_poses: int = 5,
         save_csv: bool = True,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        box_from_receptor: bool = False,
     ) -> None:
         """
         Run docking: Single Ligand - Single Receptor
@@ -106,6 +227,15 @@ class AutoDock:
             exhaustiveness: pass
             n_poses: pass
             save_csv: pass
+            engine: DockingEngine to run the jobs on worker processes
+                instead of this instance's Vina object, configured with the
+                same ENGINE_SETTINGS as this instance
+            journal: Checkpoint journal to resume from; finished jobs are
+                skipped and failed jobs are recorded instead of raising
+            sink: Streaming writer for the result rows, defaults to a CSV
+                in output_dir
+            box_from_receptor: Use the box file written next to each prepared
+                receptor by DockPrep.prepare_receptor, if present
 
         Raises:
             FileNotFoundError: If ligand or receptor file doesn't exist
@@ -122,34 +252,34 @@ class AutoDock:
         os.makedirs(output_dir, exist_ok=True)
 
         # List all the ligands from the directory
-        ligands = [f for f in os.listdir(ligand_dir) if f.endswith(".pdbqt")]
-        df_docking_results_all = []
+        ligands = _scanPDBQT(ligand_dir)
+        center, box_size = self._resolve_box(receptor, center, box_size, box_from_receptor)
+        jobs = [
+            DockingJob(
+                ligand,
+                receptor,
+                center,
+                box_size,
+                exhaustiveness,
+                n_poses,
+                output_dir,
+            )
+            for ligand in ligands
+        ]
 
         try:
-            for ligand in ligands:
-                ligand = os.path.join(ligand_dir, ligand)
-                # Setup docking
-                docking_results = self._setup_and_dock(
-                    ligand,
-                    receptor,
-                    center,
-                    box_size,
-                    exhaustiveness,
-                    n_poses,
-                    output_dir,
-                )
-                df_docking_results = pl.DataFrame(docking_results)
-                df_docking_results_all.append(df_docking_results)
-
-            df_final = pl.concat(df_docking_results_all)
-            output_csv = f"{df_final['receptor'][0]}_docking_results.csv"
-            output_path = os.path.join(output_dir, output_csv)
-            df_final.write_csv(output_path)
+            if sink is None:
+                output_csv = f"{trimName(receptor)}_docking_results.csv"
+                sink = ResultSink(os.path.join(output_dir, output_csv))
+            with sink:
+                self._run_jobs(jobs, engine, journal, sink)
+            output_path = sink.path
 
             # Check if results not saved as CSV
             if not os.path.exists(output_path):
                 print(f"Failed to create {output_path}")
             print(f"Docking successful: Output saved in {output_dir}")
+            self._report_map_reuse()
 
         except Exception as e:
             print(f"Docking failed: {str(e)}")
@@ -166,6 +296,10 @@ class AutoDock:
         exhaustiveness: int = 32,
         n_poses: int = 5,
         save_csv: bool = True,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        box_from_receptor: bool = False,
     ) -> None:
         """
         Run docking: Single Ligand - Single Receptor
@@ -179,6 +313,15 @@ class AutoDock:
             exhaustiveness: pass
             n_poses: pass
             save_csv: pass
+            engine: DockingEngine to run the jobs on worker processes
+                instead of this instance's Vina object, configured with the
+                same ENGINE_SETTINGS as this instance
+            journal: Checkpoint journal to resume from; finished jobs are
+                skipped and failed jobs are recorded instead of raising
+            sink: Streaming writer for the result rows, defaults to a CSV
+                in output_dir
+            box_from_receptor: Use the box file written next to each prepared
+                receptor by DockPrep.prepare_receptor, if present
 
         Raises:
             FileNotFoundError: If ligand or receptor file doesn't exist
@@ -195,34 +338,37 @@ class AutoDock:
         os.makedirs(output_dir, exist_ok=True)
 
         # List all the receptors from the directory
-        receptors = [f for f in os.listdir(receptor_dir) if f.endswith(".pdbqt")]
-        df_docking_results_all = []
-
-        try:
-            for receptor in receptors:
-                receptor = os.path.join(receptor_dir, receptor)
-                # Setup docking
-                docking_results = self._setup_and_dock(
-                    ligand,
+        receptors = _scanPDBQT(receptor_dir)
+        jobs = [
+            DockingJob(
+                ligand,
+                receptor,
+                *self._resolve_box(
                     receptor,
                     center,
                     box_size,
-                    exhaustiveness,
-                    n_poses,
-                    output_dir,
-                )
-                df_docking_results = pl.DataFrame(docking_results)
-                df_docking_results_all.append(df_docking_results)
+                    box_from_receptor,
+                ),
+                exhaustiveness,
+                n_poses,
+                output_dir,
+            )
+            for receptor in receptors
+        ]
 
-            df_final = pl.concat(df_docking_results_all)
-            output_csv = f"{df_final['ligand'][0]}_docking_results.csv"
-            output_path = os.path.join(output_dir, output_csv)
-            df_final.write_csv(output_path)
+        try:
+            if sink is None:
+                output_csv = f"{trimName(ligand)}_docking_results.csv"
+                sink = ResultSink(os.path.join(output_dir, output_csv))
+            with sink:
+                self._run_jobs(jobs, engine, journal, sink)
+            output_path = sink.path
 
             # Check if results not saved as CSV
             if not os.path.exists(output_path):
                 print(f"Failed to create {output_path}")
             print(f"Docking successful: Output saved in {output_dir}")
+            self._report_map_reuse()
 
         except Exception as e:
             print(f"Docking failed: {str(e)}")
@@ -239,6 +385,10 @@ class AutoDock:
         exhaustiveness: int = 32,
         n_poses: int = 5,
         save_csv: bool = True,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        box_from_receptor: bool = False,
     ) -> None:
         """
         Run docking: Single Ligand - Single Receptor
@@ -252,6 +402,15 @@ class AutoDock:
             exhaustiveness: pass
             n_poses: pass
             save_csv: pass
+            engine: DockingEngine to run the jobs on worker processes
+                instead of this instance's Vina object, configured with the
+                same ENGINE_SETTINGS as this instance
+            journal: Checkpoint journal to resume from; finished jobs are
+                skipped and failed jobs are recorded instead of raising
+            sink: Streaming writer for the result rows, defaults to a CSV
+                in output_dir
+            box_from_receptor: Use the box file written next to each prepared
+                receptor by DockPrep.prepare_receptor, if present
 
         Raises:
             FileNotFoundError: If ligand or receptor file doesn't exist
@@ -269,44 +428,608 @@ class AutoDock:
         os.makedirs(output_dir, exist_ok=True)
 
         # List all ligands and receptors from the directory
-        receptors = [f for f in os.listdir(receptor_dir) if f.endswith(".pdbqt")]
-        ligands = [f for f in os.listdir(ligand_dir) if f.endswith(".pdbqt")]
+        receptors = _scanPDBQT(receptor_dir)
+        ligands = _scanPDBQT(ligand_dir)
+        boxes = {
+            receptor: self._resolve_box(receptor, center, box_size, box_from_receptor)
+            for receptor in receptors
+        }
+
+        jobs = [
+            DockingJob(
+                ligand,
+                receptor,
+                *boxes[receptor],
+                exhaustiveness,
+                n_poses,
+                output_dir,
+            )
+            for receptor in receptors
+            for ligand in ligands
+        ]
+
+        try:
+            if sink is None:
+                output_csv = "docking_results.csv"
+                sink = ResultSink(os.path.join(output_dir, output_csv))
+            with sink:
+                self._run_jobs(jobs, engine, journal, sink)
+            output_path = sink.path
+
+            # Check if results not saved as CSV
+            if not os.path.exists(output_path):
+                print(f"Failed to create {output_path}")
+            print(f"Docking successful: Output saved in {output_dir}")
+            self._report_map_reuse()
+
+        except Exception as e:
+            print(f"Docking failed: {str(e)}")
+            raise
+
+    def dockLigandStrings(
+        self,
+        ligands: Dict[str, str],
+        receptor: str,
+        output_dir: str,
+        AlphaFold: bool = True,
+        center: Optional[Tuple[float, float, float]] = None,
+        box_size: Optional[Tuple[int, int, int]] = None,
+        exhaustiveness: int = 32,
+        n_poses: int = 5,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        box_from_receptor: bool = False,
+    ) -> None:
+        """
+        Run docking: Multi Ligand - Single Receptor, from PDBQT strings
+
+        Ligands prepared in memory (e.g. by DockPrep.prepare_ligand_strings)
+        are set with Vina.set_ligand_from_string, without a disk round-trip.
+
+        Args:
+            ligands: Ligand name -> prepared PDBQT string
+            receptor: Path to prepared receptor (.pdbqt)
+            output_dir: Directory to save docking output
+            AlphaFold: Use the default AlphaFold box
+            center: Center of the docking box, required if AlphaFold is False
+            box_size: Size of the docking box, required if AlphaFold is False
+            exhaustiveness: Exhaustiveness of the global search
+            n_poses: Number of binding poses to generate
+            engine: DockingEngine to run the jobs on worker processes,
+                configured with the same ENGINE_SETTINGS as this instance
+            journal: Checkpoint journal to resume from
+            sink: Streaming writer for the result rows, defaults to a CSV
+                in output_dir
+            box_from_receptor: Use the box file written next to the prepared
+                receptor by DockPrep.prepare_receptor, if present
+
+        Raises:
+            FileNotFoundError: If the receptor file doesn't exist
+            Exception: If docking process fails
+        """
+        if not os.path.exists(receptor):
+            raise FileNotFoundError(f"Receptor file not found: {receptor}")
+
+        # use default values if not provided
+        center = self.default_center if AlphaFold else center
+        box_size = self.default_box_size if AlphaFold else box_size
+        center, box_size = self._resolve_box(receptor, center, box_size, box_from_receptor)
+
+        # Ensure output directories exist
+        os.makedirs(output_dir, exist_ok=True)
+
+        jobs = [
+            DockingJob(
+                f"{name}.pdbqt",
+                receptor,
+                center,
+                box_size,
+                exhaustiveness,
+                n_poses,
+                output_dir,
+                ligand_pdbqt=pdbqt_string,
+            )
+            for name, pdbqt_string in ligands.items()
+        ]
+
+        try:
+            if sink is None:
+                output_csv = f"{trimName(receptor)}_docking_results.csv"
+                sink = ResultSink(os.path.join(output_dir, output_csv))
+            with sink:
+                self._run_jobs(jobs, engine, journal, sink)
+            print(f"Docking successful: Output saved in {output_dir}")
+            self._report_map_reuse()
+
+        except Exception as e:
+            print(f"Docking failed: {str(e)}")
+            raise
+
+    def dockManifest(
+        self,
+        manifest: JobManifest,
+        output_dir: str,
+        AlphaFold: bool = True,
+        center: Optional[Tuple[float, float, float]] = None,
+        box_size: Optional[Tuple[int, int, int]] = None,
+        exhaustiveness: int = 32,
+        n_poses: int = 5,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        box_from_receptor: bool = False,
+    ) -> None:
+        """
+        Run docking: the ligand - receptor pairs of a job manifest
 
-        df_docking_results_all = []
+        The manifest is read and docked chunk by chunk, in row order, so no
+        input directory is listed and the job list is never fully in memory.
+        Per-row box, exhaustiveness, n_poses, spacing and output_dir override
+        the arguments below.
 
+        Args:
+            manifest: Job manifest (see JobManifest)
+            output_dir: Directory to save docking output of rows without an
+                output_dir
+            AlphaFold: Use the default AlphaFold box for rows without a box
+            center: Center of the docking box of rows without a box, required
+                if AlphaFold is False
+            box_size: Size of the docking box of rows without a box, required
+                if AlphaFold is False
+            exhaustiveness: Exhaustiveness of rows without one
+            n_poses: Number of binding poses of rows without one
+            engine: DockingEngine to run the jobs on worker processes,
+                configured with the same ENGINE_SETTINGS as this instance
+            journal: Checkpoint journal to resume from
+            sink: Streaming writer for the result rows, defaults to a CSV
+                in output_dir
+            box_from_receptor: For rows without a box, use the box file
+                written next to the prepared receptor by
+                DockPrep.prepare_receptor, if present
+
+        Raises:
+            ValueError: If a row has no ligand or receptor
+            Exception: If docking process fails
+        """
+        # use default values if not provided
+        center = self.default_center if AlphaFold else center
+        box_size = self.default_box_size if AlphaFold else box_size
+
+        # Ensure output directories exist
+        os.makedirs(output_dir, exist_ok=True)
+
+        boxes = {}
+        output_dirs = {output_dir}
+        n_docked = 0
         try:
-            for receptor in receptors:
-                receptor = os.path.join(receptor_dir, receptor)
-                for ligand in ligands:
-                    ligand = os.path.join(ligand_dir, ligand)
-
-                    # Setup docking
-                    docking_results = self._setup_and_dock(
-                        ligand,
-                        receptor,
-                        center,
-                        box_size,
+            if sink is None:
+                output_csv = "docking_results.csv"
+                sink = ResultSink(os.path.join(output_dir, output_csv))
+            with sink:
+                for rows in manifest:
+                    jobs = []
+                    for row in rows:
+                        receptor = row["receptor"]
+                        row_box = tuple(
+                            row[column]
+                            for column in ("center_x", "center_y", "center_z", "size_x", "size_y", "size_z")
+                        )
+                        if None not in row_box:
+                            job_box = (tuple(row_box[:3]), tuple(row_box[3:]))
+                        else:
+                            if receptor not in boxes:
+                                boxes[receptor] = self._resolve_box(
+                                    receptor, center, box_size, box_from_receptor
+                                )
+                            job_box = boxes[receptor]
+
+                        job_output_dir = row["output_dir"] or output_dir
+                        if job_output_dir not in output_dirs:
+                            os.makedirs(job_output_dir, exist_ok=True)
+                            output_dirs.add(job_output_dir)
+
+                        jobs.append(
+                            DockingJob(
+                                row["ligand"],
+                                receptor,
+                                *job_box,
+                                row["exhaustiveness"] or exhaustiveness,
+                                row["n_poses"] or n_poses,
+                                job_output_dir,
+                                spacing=row["spacing"],
+                            )
+                        )
+                    self._run_jobs(jobs, engine, journal, sink)
+                    sink.flush()
+                    n_docked += len(jobs)
+                    print(f"Docked {n_docked} jobs from {manifest.path}")
+            print(f"Docking successful: Output saved in {output_dir}")
+            self._report_map_reuse()
+
+        except Exception as e:
+            print(f"Docking failed: {str(e)}")
+            raise
+
+    def tieredScreen(
+        self,
+        ligand_dir: str,
+        receptor_dir: str,
+        output_dir: str,
+        AlphaFold: bool = True,
+        center: Optional[Tuple[float, float, float]] = None,
+        box_size: Optional[Tuple[int, int, int]] = None,
+        screen_exhaustiveness: int = 4,
+        screen_n_poses: int = 1,
+        screen_spacing: Optional[float] = None,
+        top_k: Optional[int] = None,
+        top_percent: Optional[float] = None,
+        exhaustiveness: int = 32,
+        n_poses: int = 5,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        box_from_receptor: bool = False,
+    ) -> pl.DataFrame:
+        """
+        Run docking: Multi Ligand - Multi Receptor, in two fidelity tiers
+
+        Every pair is first screened at low exhaustiveness, optionally on a
+        coarser grid. Only the best ligands of each receptor are then docked
+        again at full exhaustiveness and n_poses.
+
+        Args:
+            ligand_dir: Directory of prepared ligands (.pdbqt)
+            receptor_dir: Directory of prepared receptors (.pdbqt)
+            output_dir: Directory to save docking output
+            AlphaFold: Use the default AlphaFold box
+            center: Center of the docking box, required if AlphaFold is False
+            box_size: Size of the docking box, required if AlphaFold is False
+            screen_exhaustiveness: Exhaustiveness of the screening tier
+            screen_n_poses: Number of poses written by the screening tier
+            screen_spacing: Grid spacing of the screening tier, e.g. 0.5 for a
+                coarser grid. Uses the instance spacing if None.
+            top_k: Number of ligands per receptor to re-dock
+            top_percent: Percentage of ligands per receptor to re-dock, used
+                when top_k is None. Defaults to 10.
+            exhaustiveness: Exhaustiveness of the re-docking tier
+            n_poses: Number of poses generated by the re-docking tier
+            engine: DockingEngine to run the jobs on worker processes,
+                configured with the same ENGINE_SETTINGS as this instance
+            journal: Checkpoint journal shared by both tiers
+            box_from_receptor: Use the box file written next to each prepared
+                receptor by DockPrep.prepare_receptor, if present
+
+        Returns:
+            pl.DataFrame: One row per screened pair with `screen_affinity`,
+            `binding_affinity` (null if the pair was not re-docked) and
+            `rescored`.
+
+        Raises:
+            FileNotFoundError: If ligand or receptor directory doesn't exist
+            ValueError: If top_percent is not within (0, 100]
+        """
+        self._validate_input_dir(ligand_dir)
+        self._validate_input_dir(receptor_dir)
+
+        if top_k is None and top_percent is None:
+            top_percent = 10.0
+        if top_k is None and not 0 < top_percent <= 100:
+            raise ValueError(f"top_percent must be within (0, 100]: {top_percent}")
+
+        # use default values if not provided
+        center = self.default_center if AlphaFold else center
+        box_size = self.default_box_size if AlphaFold else box_size
+
+        screen_dir = os.path.join(output_dir, "screen")
+        os.makedirs(screen_dir, exist_ok=True)
+
+        receptors = _scanPDBQT(receptor_dir)
+        ligands = _scanPDBQT(ligand_dir)
+        boxes = {
+            receptor: self._resolve_box(receptor, center, box_size, box_from_receptor)
+            for receptor in receptors
+        }
+        screen_jobs = [
+            DockingJob(
+                ligand,
+                receptor,
+                *boxes[receptor],
+                screen_exhaustiveness,
+                screen_n_poses,
+                screen_dir,
+                screen_spacing,
+            )
+            for receptor in receptors
+            for ligand in ligands
+        ]
+        if not screen_jobs:
+            print(f"No ligands in {ligand_dir} or no receptors in {receptor_dir}")
+            return pl.DataFrame(
+                schema={
+                    "ligand": pl.Utf8,
+                    "receptor": pl.Utf8,
+                    "screen_affinity": pl.Float64,
+                    "binding_affinity": pl.Float64,
+                    "rescored": pl.Boolean,
+                }
+            )
+
+        try:
+            # Tier 1: cheap screen of every pair
+            df_screen = (
+                self._run_jobs(screen_jobs, engine, journal)
+                .filter(pl.col("binding_affinity").is_not_null())
+                .select(
+                    "ligand",
+                    "receptor",
+                    pl.col("binding_affinity").alias("screen_affinity"),
+                )
+            )
+
+            # Select the best ligands of every receptor
+            rank = pl.col("screen_affinity").rank("ordinal").over("receptor")
+            if top_k is not None:
+                keep = rank <= top_k
+            else:
+                keep = rank <= (pl.len().over("receptor") * top_percent / 100).ceil()
+            df_selected = df_screen.filter(keep)
+
+            # Tier 2: full exhaustiveness re-docking of the selection
+            jobs_by_name = {
+                (trimName(job.ligand), trimName(job.receptor)): job
+                for job in screen_jobs
+            }
+            rescore_jobs = []
+            for ligand_name, receptor_name in df_selected.select(
+                "ligand", "receptor"
+            ).iter_rows():
+                job = jobs_by_name[(ligand_name, receptor_name)]
+                rescore_jobs.append(
+                    DockingJob(
+                        job.ligand,
+                        job.receptor,
+                        job.center,
+                        job.box_size,
                         exhaustiveness,
                         n_poses,
                         output_dir,
                     )
-                    df_docking_results = pl.DataFrame(docking_results)
-                    df_docking_results_all.append(df_docking_results)
+                )
+            print(
+                f"Re-docking {len(rescore_jobs)} of {len(screen_jobs)} pairs "
+                f"at exhaustiveness {exhaustiveness}"
+            )
 
-            df_final = pl.concat(df_docking_results_all)
-            output_csv = "docking_results.csv"
-            output_path = os.path.join(output_dir, output_csv)
-            df_final.write_csv(output_path)
+            df_rescore = self._run_jobs(rescore_jobs, engine, journal)
+            if df_rescore.height > 0:
+                df_rescore = df_rescore.filter(
+                    pl.col("binding_affinity").is_not_null()
+                ).select("ligand", "receptor", "binding_affinity")
+            else:
+                df_rescore = pl.DataFrame(
+                    schema={
+                        "ligand": pl.Utf8,
+                        "receptor": pl.Utf8,
+                        "binding_affinity": pl.Float64,
+                    }
+                )
 
-            # Check if results not saved as CSV
-            if not os.path.exists(output_path):
-                print(f"Failed to create {output_path}")
+            df_final = df_screen.join(
+                df_rescore, on=["ligand", "receptor"], how="left"
+            ).with_columns(pl.col("binding_affinity").is_not_null().alias("rescored"))
+
+            output_path = os.path.join(output_dir, "tiered_docking_results.csv")
+            df_final.write_csv(output_path)
             print(f"Docking successful: Output saved in {output_dir}")
+            self._report_map_reuse()
+            return df_final
 
         except Exception as e:
             print(f"Docking failed: {str(e)}")
             raise
 
+    def _run_jobs(
+        self,
+        jobs: List[DockingJob],
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+    ) -> Optional[pl.DataFrame]:
+        """
+        Dock a list of jobs, serially or on a DockingEngine.
+
+        Args:
+            jobs (List[DockingJob]): Jobs to dock.
+            engine (Optional[DockingEngine]): Engine to spread the jobs across
+                worker processes. Runs serially on `self.v` if None. Its
+                ENGINE_SETTINGS must match this instance's.
+            journal (Optional[CheckpointJournal]): Journal of finished jobs.
+                Jobs already in it are skipped, every outcome is appended to
+                it and failures no longer abort the batch.
+            sink (Optional[ResultSink]): Streaming writer receiving every
+                result row as soon as its job finishes.
+
+        Returns:
+            Optional[pl.DataFrame]: One row per job, including jobs finished
+            by earlier runs of the journal, with a status column ("ok",
+            "reused" for results taken from the result store without timing
+            columns, or "failed" for jobs that failed under a journal). None if
+            rows were streamed to a sink.
+
+        Raises:
+            ValueError: If the engine is configured differently, see `_check_engine`
+        """
+        rows = []
+        emit = sink.write if sink is not None else rows.append
+
+        pending = jobs
+        if journal is not None:
+            pending = [job for job in jobs if not journal.is_finished(job)]
+            if len(pending) < len(jobs):
+                print(
+                    f"Resuming from {journal.path}: "
+                    f"{len(jobs) - len(pending)} of {len(jobs)} jobs already finished"
+                )
+            for job in jobs:
+                if journal.is_finished(job):
+                    emit(self._replayed_row(job, journal.finished[job.key]))
+
+        if self.metrics is not None:
+            # Rows finished by earlier runs do not count towards throughput
+            self.metrics.start()
+            emit = self._observed(emit)
+
+        if engine is not None:
+            self._check_engine(engine)
+            # A WorkQueue's workers report their own map builds
+            worker_builds = getattr(engine, "map_builds", None)
+            worker_skipped = getattr(engine, "map_builds_skipped", None)
+            df_engine = engine.run(
+                pending,
+                journal=journal,
+                sink=sink,
+                result_store=self.result_store,
+                metrics=self.metrics,
+            )
+            if df_engine is not None:
+                rows.extend(df_engine.to_dicts())
+            if worker_builds is None:
+                self._map_builds_unknown = True
+            else:
+                self.map_builds += engine.map_builds - worker_builds
+                self.map_builds_skipped += engine.map_builds_skipped - worker_skipped
+        else:
+            for job in pending:
+                if journal is None:
+                    emit(self._run_job(job))
+                    continue
+                try:
+                    docking_results = self._run_job(job)
+                    journal.record(job, docking_results)
+                    emit(docking_results)
+                except Exception as e:
+                    print(f"Docking failed for {job.ligand} - {job.receptor}: {str(e)}")
+                    journal.record_failure(job, str(e))
+                    emit(self._status_row(job, "failed"))
+
+        if journal is not None:
+            if engine is not None:
+                journal.load()
+            n_failed = sum(1 for job in jobs if job.key in journal.failed)
+            if n_failed:
+                print(f"{n_failed} jobs failed, see {journal.path}")
+
+        if sink is not None:
+            return None
+        return _castTimingColumns(pl.DataFrame(rows, infer_schema_length=None))
+
+    def _check_engine(self, engine) -> None:
+        """
+        Check that an engine's workers dock with this instance's settings.
+
+        Raises:
+            ValueError: If a setting in ENGINE_SETTINGS differs
+        """
+        settings = {
+            "sf_name": self.sf_name,
+            "seed": self.seed,
+            "spacing": self.spacing,
+            "diagnostics": self.diagnostics,
+            "pose_archive_dir": self.pose_archive.root if self.pose_archive is not None else None,
+            "cluster_rmsd": self.cluster_rmsd,
+        }
+        mismatches = []
+        for name in ENGINE_SETTINGS:
+            ours, theirs = settings[name], engine.config[name]
+            if name == "pose_archive_dir" and ours is not None and theirs is not None:
+                ours, theirs = os.path.abspath(ours), os.path.abspath(theirs)
+            if ours != theirs:
+                mismatches.append(f"{name}={theirs!r} (AutoDock: {ours!r})")
+        if mismatches:
+            raise ValueError(
+                f"{type(engine).__name__} is configured differently from this AutoDock: "
+                + ", ".join(mismatches)
+            )
+
+    def _status_row(self, job: DockingJob, status: str) -> dict:
+        """Result row without results of a job, with this instance's columns."""
+        return _emptyResultRow(job, status, self.diagnostics, self.cluster_rmsd, self.timing)
+
+    def _replayed_row(self, job: DockingJob, row: dict) -> dict:
+        """
+        Result row of a job finished by an earlier run of a journal, with this instance's columns.
+
+        The journal holds the full row, but it may have been written with
+        other settings (e.g. without timing or a status column). Missing
+        columns are added empty, and the timing of the earlier run is dropped.
+        """
+        replayed = self._status_row(job, row.get("status", "ok"))
+        replayed.update(
+            (column, value)
+            for column, value in row.items()
+            if not column.startswith("time_") and column != "peak_rss_mb"
+        )
+        return replayed
+
+    def _observed(self, emit):
+        """Wrap a row consumer so that every emitted row is added to the run metrics."""
+
+        def observe_and_emit(row: dict) -> None:
+            self.metrics.observe(row)
+            emit(row)
+
+        return observe_and_emit
+
+    def _run_job(self, job: DockingJob) -> dict:
+        """Dock a single job with this instance's Vina object, or reuse its stored result."""
+        if self.result_store is not None:
+            spacing = self.spacing if job.spacing is None else job.spacing
+            store_key = self.result_store.key(
+                job, spacing, self.sf_name, self.seed, self.cluster_rmsd, self.diagnostics
+            )
+            if self.pose_archive is None:
+                pose_file = f"{job.output_dir}/{trimName(job.ligand)}_{trimName(job.receptor)}.pdbqt"
+            else:
+                pose_file = None
+            docking_results = self.result_store.lookup(store_key, pose_file)
+            if docking_results is not None:
+                print(f"Reusing stored result: {job.ligand} - {job.receptor}")
+                # The stored timing is that of the run that docked the job
+                reused = {
+                    column: value
+                    for column, value in docking_results.items()
+                    if not column.startswith("time_") and column != "peak_rss_mb"
+                }
+                if self.timing:
+                    reused.update(
+                        (column, None)
+                        for column in self._status_row(job, "reused")
+                        if column.startswith("time_") or column == "peak_rss_mb"
+                    )
+                # Stored results are keyed by content and may be named after another file
+                reused["ligand"] = trimName(job.ligand)
+                reused["receptor"] = trimName(job.receptor)
+                reused["status"] = "reused"
+                return reused
+
+        docking_results = self._setup_and_dock(
+            job.ligand,
+            job.receptor,
+            job.center,
+            job.box_size,
+            job.exhaustiveness,
+            job.n_poses,
+            job.output_dir,
+            reuse_maps=self.reuse_maps,
+            spacing=job.spacing,
+            ligand_pdbqt=job.ligand_pdbqt,
+        )
+
+        docking_results["status"] = "ok"
+        if self.result_store is not None:
+            self.result_store.record(store_key, job, docking_results, pose_file)
+        return docking_results
+
     def _validate_input_files(self, ligand: str, receptor: str) -> None:
         """Validate that input files exist and have correct extensions.
         Run docking: Single Ligand - Single Receptor
@@ -343,6 +1066,126 @@ class AutoDock:
         if not os.path.exists(dir):
             raise FileNotFoundError(f"{dir} not found.")
 
+    def _resolve_box(
+        self,
+        receptor: str,
+        center: Optional[Tuple[float, float, float]],
+        box_size: Optional[Tuple[float, float, float]],
+        box_from_receptor: bool = False,
+    ) -> Tuple[Tuple[float, float, float], Tuple[float, float, float]]:
+        """
+        Pick the docking box of a receptor.
+
+        Args:
+            receptor (str): Path to the receptor file in PDBQT format.
+            center (Optional[Tuple]): Fallback center of the docking box.
+            box_size (Optional[Tuple]): Fallback size of the docking box.
+            box_from_receptor (bool): Read the box from the receptor's box file
+                (see `DockPrep.prepare_receptor`) when it exists.
+
+        Returns:
+            Tuple: (center, box_size) of the docking box.
+
+        Raises:
+            ValueError: If no box is available for the receptor.
+        """
+        if box_from_receptor:
+            box_file = receptorBoxFile(receptor)
+            if os.path.exists(box_file):
+                return readBoxFile(box_file)
+            print(f"No box file found for {receptor}, using the given box")
+
+        if center is None or box_size is None:
+            raise ValueError(
+                f"center and box_size must be provided for {receptor} if AlphaFold=False"
+            )
+        return tuple(center), tuple(box_size)
+
+    def _ensure_maps(
+        self,
+        receptor: str,
+        center: List[float],
+        box_size: List[float],
+        spacing: Optional[float] = None,
+    ) -> bool:
+        """
+        Set the receptor and compute its affinity maps unless the current maps
+        were already built for the same receptor, box, spacing and scoring function.
+
+        Args:
+            receptor (str): Path to the receptor file in PDBQT format.
+            center (List[float]): Coordinates [x, y, z] for the center of the docking box.
+            box_size (List[float]): Dimensions [x, y, z] of the docking box.
+            spacing (Optional[float]): Grid spacing, defaults to `self.spacing`.
+
+        Returns:
+            bool: True if the existing maps were reused, False if they were built.
+        """
+        spacing = self.spacing if spacing is None else spacing
+        map_key = (
+            os.path.abspath(receptor),
+            tuple(float(c) for c in center),
+            tuple(float(b) for b in box_size),
+            spacing,
+            self.sf_name,
+        )
+        if map_key == self._map_key:
+            self.map_builds_skipped += 1
+            return True
+
+        # Set receptor
+        self.v.set_receptor(receptor)
+        print(f"Receptor: {receptor}")
+
+        # Load the maps from the on-disk cache when available
+        cache_key = None
+        if self.map_cache is not None:
+            cache_key = self.map_cache.key(
+                receptor, center, box_size, spacing, self.sf_name
+            )
+            if self.map_cache.load(self.v, cache_key):
+                print(f"Affinity maps loaded from cache: {cache_key}")
+                self._map_key = map_key
+                self.map_builds_skipped += 1
+                return True
+
+        # Configure binding site
+        self.v.compute_vina_maps(center=center, box_size=box_size, spacing=spacing)
+        self._map_key = map_key
+        self.map_builds += 1
+
+        if cache_key is not None:
+            self.map_cache.store(self.v, cache_key)
+        return False
+
+    def _report_map_reuse(self) -> None:
+        """Print how many affinity map builds were performed and skipped."""
+        if self._map_builds_unknown:
+            print("Affinity maps were built by the work queue's workers, see their logs")
+        elif self.reuse_maps or self.map_cache is not None:
+            print(
+                f"Affinity maps built: {self.map_builds}, "
+                f"reused: {self.map_builds_skipped}"
+            )
+        if self.map_cache is not None:
+            print(
+                f"Map cache hits: {self.map_cache.hits}, "
+                f"misses: {self.map_cache.misses}, "
+                f"evictions: {self.map_cache.evictions}"
+            )
+        if self.result_store is not None:
+            self.result_store.report()
+        if self.metrics is not None:
+            self.metrics.report()
+
+    def _set_ligand(self, ligand: str, ligand_pdbqt: Optional[str] = None) -> None:
+        """Set the ligand from a PDBQT string if given, else from its file."""
+        if ligand_pdbqt is not None:
+            self.v.set_ligand_from_string(ligand_pdbqt)
+        else:
+            self.v.set_ligand_from_file(ligand)
+        print(f"Ligand: {ligand}")
+
     def _setup_and_dock(
         self,
         ligand: str,
@@ -352,13 +1195,18 @@ class AutoDock:
         exhaustiveness: int,
         n_poses: int,
         output_dir: str,
+        reuse_maps: bool = False,
+        spacing: Optional[float] = None,
+        ligand_pdbqt: Optional[str] = None,
     ) -> dict:
         """
     Sets up and performs molecular docking using AutoDock Vina.
 
-    This method configures the docking parameters, scores and minimizes the 
-    initial pose, performs docking, saves the resulting poses, and extracts 
-    the binding affinity of the best pose.
+    This method configures the docking parameters, performs docking, saves
+    the resulting poses (to a file, or to the pose archive if one is set),
+    and extracts the binding affinity of the best pose.
+    In diagnostics mode the input pose is also scored and locally minimized
+    before docking.
 
     Args:
         ligand (str): Path to the ligand file in PDBQT format.
@@ -368,54 +1216,146 @@ class AutoDock:
         exhaustiveness (int): Exhaustiveness of the global search. Higher values increase accuracy and time.
         n_poses (int): Number of binding poses to generate.
         output_dir (str): Directory where docking results will be saved.
+        reuse_maps (bool): Skip the receptor setup and map computation when the
+            receptor, box and scoring function match the previous call.
+        spacing (Optional[float]): Grid spacing of the affinity maps, defaults
+            to the spacing set on the instance.
+        ligand_pdbqt (Optional[str]): Prepared ligand as a PDBQT string. The
+            ligand file is then not read and `ligand` only names the output.
 
     Returns:
         dict: A dictionary containing:
             - 'ligand' (str): Base name of the ligand file.
             - 'receptor' (str): Base name of the receptor file.
-            - 'binding_affinity' (float or list): Binding affinity score(s) from docking results (in kcal/mol).
+            - 'binding_affinity' (float): Binding affinity of the best pose (in kcal/mol).
+            - 'affinity_k', 'inter_k', 'intra_k', 'rmsd_lb_k', 'rmsd_ub_k' (float):
+              Energy breakdown and RMSD bounds of pose k, see `_pose_columns`.
+            - 'n_clusters', 'top_cluster_size', 'cluster_k' (int): Pose
+              clusters, if cluster_rmsd is set (see `poseClusterColumns`).
+            - 'score_before_minimization', 'score_after_minimization' (float):
+              Scores of the input pose, in diagnostics mode only.
+            - 'time_<stage>', 'time_total', 'peak_rss_mb' (float): Wall time
+              of every stage in seconds and peak RSS, if timing is on.
     """
-
-        # Set receptor
-        self.v.set_receptor(receptor)
-        print(f"Receptor: {receptor}")
-
-        # Set ligand
-        self.v.set_ligand_from_file(ligand)
-        print(f"Ligand: {ligand}")
-
-        # Configure binding site
-        self.v.compute_vina_maps(center=center, box_size=box_size)
-
-        # Score the current pose
-        energy = self.v.score()
-        print("Score before minimization: %.3f (kcal/mol)" % energy[0])
-
-        # Minimized locally the current pose
-        energy_minimized = self.v.optimize()
-        print("Score after minimization : %.3f (kcal/mol)" % energy_minimized[0])
+        stages = TIMED_STAGES + (("diagnostics",) if self.diagnostics else ())
+        stages += ("cluster",) if self.cluster_rmsd is not None else ()
+        timer = StageTimer(stages)
+
+        if reuse_maps or self.map_cache is not None:
+            # Maps are built before the ligand is set so that they cover every
+            # atom type and stay valid for all ligands docked against them
+            with timer.stage("maps"):
+                self._ensure_maps(receptor, center, box_size, spacing)
+
+            # Set ligand
+            with timer.stage("ligand"):
+                self._set_ligand(ligand, ligand_pdbqt)
+        else:
+            # Set receptor
+            with timer.stage("receptor"):
+                self.v.set_receptor(receptor)
+            print(f"Receptor: {receptor}")
+
+            # Set ligand
+            with timer.stage("ligand"):
+                self._set_ligand(ligand, ligand_pdbqt)
+
+            # Configure binding site
+            with timer.stage("maps"):
+                self.v.compute_vina_maps(
+                    center=center,
+                    box_size=box_size,
+                    spacing=self.spacing if spacing is None else spacing,
+                )
+            self._map_key = None
+
+        diagnostic_scores = {}
+        if self.diagnostics:
+            with timer.stage("diagnostics"):
+                # Score the current pose
+                energy = self.v.score()
+                # Minimized locally the current pose
+                energy_minimized = self.v.optimize()
+            print("Score before minimization: %.3f (kcal/mol)" % energy[0])
+            print("Score after minimization : %.3f (kcal/mol)" % energy_minimized[0])
+
+            diagnostic_scores = {
+                "score_before_minimization": float(energy[0]),
+                "score_after_minimization": float(energy_minimized[0]),
+            }
 
         # Generate output filename
         ligand_name = trimName(ligand)
         receptor_name = trimName(receptor)
-        output_file = f"{output_dir}/{ligand_name}_{receptor_name}.pdbqt"
-
-        # Save minimized pose
-        self.v.write_pose(output_file, overwrite=True)
 
         # Dock the ligand
-        self.v.dock(exhaustiveness=exhaustiveness, n_poses=n_poses)
-        self.v.write_poses(output_file, n_poses=n_poses, overwrite=True)
-
-        # Extract binding affinity from output
-        binding_affinity = extractBindingAffinity(output_file)
+        with timer.stage("dock"):
+            self.v.dock(exhaustiveness=exhaustiveness, n_poses=n_poses)
+        with timer.stage("write"):
+            pose_string = self.v.poses(n_poses=n_poses)
+            if self.pose_archive is not None:
+                self.pose_archive.append(ligand_name, receptor_name, pose_string)
+            else:
+                output_file = f"{output_dir}/{ligand_name}_{receptor_name}.pdbqt"
+                with open(output_file, "w") as f:
+                    f.write(pose_string)
+
+        # Take the pose energies from the Vina object instead of the output file
+        with timer.stage("energies"):
+            pose_columns = self._pose_columns(pose_string, n_poses)
+        if self.cluster_rmsd is not None:
+            with timer.stage("cluster"):
+                coords, atom_types, affinities = readPoses(pose_string, is_string=True)
+                pose_columns.update(
+                    poseClusterColumns(coords, atom_types, affinities, n_poses, self.cluster_rmsd)
+                )
 
         return {
             "ligand": ligand_name,
             "receptor": receptor_name,
-            "binding_affinity": float(binding_affinity),
+            "binding_affinity": pose_columns["affinity_1"],
+            **pose_columns,
+            **diagnostic_scores,
+            **(timer.columns() if self.timing else {}),
         }
 
+    def _pose_columns(self, pose_string: str, n_poses: int) -> Dict[str, Optional[float]]:
+        """
+        Energies of every docked pose as flat result columns.
+
+        The energy breakdown comes from `Vina.energies()` and the RMSD bounds
+        from the REMARK VINA RESULT lines of the in-memory poses. Columns of
+        pose k are affinity_k, inter_k, intra_k, rmsd_lb_k and rmsd_ub_k; they
+        are None when Vina found fewer than `n_poses` poses within the energy
+        range, so every row of a batch has the same columns.
+
+        Args:
+            pose_string (str): Poses returned by `Vina.poses()`.
+            n_poses (int): Number of poses requested from the docking run.
+
+        Returns:
+            Dict[str, Optional[float]]: Column name -> value.
+        """
+        energies = self.v.energies(n_poses=n_poses)
+        rmsds = [
+            (float(fields[4]), float(fields[5]))
+            for fields in (
+                line.split()
+                for line in pose_string.splitlines()
+                if line.startswith("REMARK VINA RESULT:")
+            )
+        ]
+
+        columns = {}
+        for k in range(n_poses):
+            found = k < len(energies) and k < len(rmsds)
+            columns[f"affinity_{k + 1}"] = float(energies[k][0]) if found else None
+            columns[f"inter_{k + 1}"] = float(energies[k][1]) if found else None
+            columns[f"intra_{k + 1}"] = float(energies[k][2]) if found else None
+            columns[f"rmsd_lb_{k + 1}"] = rmsds[k][0] if found else None
+            columns[f"rmsd_ub_{k + 1}"] = rmsds[k][1] if found else None
+        return columns
+
 
 if __name__ == "__main__":
     docker = AutoDock()
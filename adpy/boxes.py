@@ -0,0 +1,236 @@
+import os
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from scipy import ndimage
+
+from .utils import readPDBAtoms
+
+Box = Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+
+
+def boxFromCoords(coords: np.ndarray, padding: float = 5.0, min_size: float = 10.0) -> Box:
+    """
+    Compute the box enclosing a set of coordinates
+
+    Args:
+        coords: N x 3 array of coordinates
+        padding: Margin added on every side of the coordinates, in Angstrom
+        min_size: Minimum edge length of the box, in Angstrom
+
+    Returns:
+        (center, box_size) tuples in Angstrom
+    """
+    if len(coords) == 0:
+        raise ValueError("Cannot compute a docking box from zero atoms")
+
+    lower = coords.min(axis=0)
+    upper = coords.max(axis=0)
+    center = (lower + upper) / 2.0
+    size = np.maximum(upper - lower + 2.0 * padding, min_size)
+    return (
+        tuple(round(float(c), 3) for c in center),
+        tuple(round(float(s), 3) for s in size),
+    )
+
+
+def boxFromLigand(ligand: str, padding: float = 5.0, min_size: float = 10.0) -> Box:
+    """
+    Compute a docking box around a reference ligand
+
+    Args:
+        ligand: Path to the reference ligand (.pdb, .pdbqt or .sdf/.mol)
+        padding: Margin added on every side of the ligand, in Angstrom
+        min_size: Minimum edge length of the box, in Angstrom
+
+    Returns:
+        (center, box_size) tuples in Angstrom
+    """
+    if ligand.endswith((".sdf", ".mol")):
+        coords = _readSDFCoords(ligand)
+    else:
+        coords = readPDBAtoms(ligand)["coords"]
+    return boxFromCoords(coords, padding, min_size)
+
+
+def boxFromResidues(
+    receptor: str,
+    residues: List[Union[int, str]],
+    chain: Optional[str] = None,
+    padding: float = 5.0,
+    min_size: float = 10.0,
+) -> Box:
+    """
+    Compute a docking box around a selection of receptor residues
+
+    Args:
+        receptor: Path to the receptor (.pdb or .pdbqt)
+        residues: Residue numbers, or "A:745" style chain:number strings
+        chain: Chain the plain residue numbers belong to, any chain if None
+        padding: Margin added on every side of the residues, in Angstrom
+        min_size: Minimum edge length of the box, in Angstrom
+
+    Returns:
+        (center, box_size) tuples in Angstrom
+
+    Raises:
+        ValueError: If none of the residues are found in the receptor
+    """
+    atoms = readPDBAtoms(receptor, hetatm=False)
+    mask = np.zeros(len(atoms["coords"]), dtype=bool)
+    for residue in residues:
+        residue_chain = chain
+        if isinstance(residue, str) and ":" in residue:
+            residue_chain, residue = residue.split(":", 1)
+        selected = atoms["resseq"] == int(residue)
+        if residue_chain is not None:
+            selected &= atoms["chain"] == residue_chain
+        mask |= selected
+
+    if not mask.any():
+        raise ValueError(f"No residues {residues} found in {receptor}")
+    return boxFromCoords(atoms["coords"][mask], padding, min_size)
+
+
+def boxFromCavity(
+    receptor: str,
+    grid_spacing: float = 1.0,
+    probe_radius: float = 1.6,
+    min_buriedness: int = 3,
+    density_radius: float = 8.0,
+    min_density: float = 0.5,
+    min_plddt: Optional[float] = None,
+    padding: float = 4.0,
+    min_size: float = 10.0,
+) -> Box:
+    """
+    Compute a docking box around the largest buried cavity of a receptor
+
+    A LIGSITE-style scan: the receptor is voxelized, and empty voxels that
+    are enclosed by protein on both sides along `min_buriedness` of the
+    three axes, and surrounded by enough protein within `density_radius`,
+    are kept. The largest connected group of those voxels is taken as the
+    pocket.
+
+    Args:
+        receptor: Path to the receptor (.pdb or .pdbqt)
+        grid_spacing: Voxel edge length, in Angstrom
+        probe_radius: Radius around every atom that counts as occupied, in Angstrom
+        min_buriedness: Number of axes (1-3) along which a voxel must be enclosed
+        density_radius: Half-width of the neighbourhood used for the protein density, in Angstrom
+        min_density: Minimum fraction of occupied voxels in that neighbourhood
+        min_plddt: Ignore atoms whose B-factor column (pLDDT for AlphaFold models) is lower
+        padding: Margin added on every side of the cavity, in Angstrom
+        min_size: Minimum edge length of the box, in Angstrom
+
+    Returns:
+        (center, box_size) tuples in Angstrom
+
+    Raises:
+        ValueError: If no buried cavity is found
+    """
+    atoms = readPDBAtoms(receptor, hetatm=False)
+    coords = atoms["coords"]
+    if min_plddt is not None:
+        coords = coords[atoms["bfactor"] >= min_plddt]
+    if len(coords) == 0:
+        raise ValueError(f"No atoms found in {receptor}")
+
+    origin = coords.min(axis=0) - probe_radius
+    shape = np.ceil((coords.max(axis=0) + probe_radius - origin) / grid_spacing).astype(int) + 1
+
+    # Voxelize the atoms and grow them by the probe radius
+    occupied = np.zeros(shape, dtype=bool)
+    indices = np.floor((coords - origin) / grid_spacing).astype(int)
+    occupied[indices[:, 0], indices[:, 1], indices[:, 2]] = True
+    radius = int(np.ceil(probe_radius / grid_spacing))
+    ball = np.linalg.norm(np.indices((2 * radius + 1,) * 3) - radius, axis=0) <= radius
+    occupied = ndimage.binary_dilation(occupied, structure=ball)
+
+    # Count the axes along which an empty voxel has protein on both sides
+    buriedness = np.zeros(shape, dtype=np.int8)
+    for axis in range(3):
+        before = np.maximum.accumulate(occupied, axis=axis)
+        after = np.flip(np.maximum.accumulate(np.flip(occupied, axis=axis), axis=axis), axis=axis)
+        buriedness += before & after
+
+    # Fraction of protein voxels around every voxel, drops open grooves
+    window = 2 * int(np.ceil(density_radius / grid_spacing)) + 1
+    density = ndimage.uniform_filter(occupied.astype(np.float32), size=window, mode="constant")
+
+    cavity = (buriedness >= min_buriedness) & ~occupied & (density >= min_density)
+
+    labels, n_labels = ndimage.label(cavity)
+    if n_labels == 0:
+        raise ValueError(f"No buried cavity found in {receptor}")
+    sizes = np.bincount(labels.ravel())[1:]
+    largest = np.argwhere(labels == np.argmax(sizes) + 1)
+
+    pocket_coords = origin + (largest + 0.5) * grid_spacing
+    return boxFromCoords(pocket_coords, padding, min_size)
+
+
+def writeBoxFile(box: Box, output_file: str) -> str:
+    """
+    Write a docking box as a Vina config file
+
+    Args:
+        box: (center, box_size) tuples in Angstrom
+        output_file: Path of the config file
+
+    Returns:
+        Path of the config file
+    """
+    center, size = box
+    if os.path.dirname(output_file):
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, "w") as f:
+        for axis, c in zip("xyz", center):
+            f.write(f"center_{axis} = {c}\n")
+        for axis, s in zip("xyz", size):
+            f.write(f"size_{axis} = {s}\n")
+    return output_file
+
+
+def readBoxFile(box_file: str) -> Box:
+    """
+    Read a docking box from a Vina config file (e.g. the .box.txt written by mk_prepare_receptor.py -v)
+
+    Args:
+        box_file: Path of the config file
+
+    Returns:
+        (center, box_size) tuples in Angstrom
+    """
+    values = {}
+    with open(box_file, "r") as f:
+        for line in f:
+            if "=" in line:
+                key, value = line.split("=", 1)
+                values[key.strip()] = float(value.split()[0])
+
+    center = tuple(values[f"center_{axis}"] for axis in "xyz")
+    size = tuple(values[f"size_{axis}"] for axis in "xyz")
+    return center, size
+
+
+def receptorBoxFile(receptor: str) -> str:
+    """
+    Path of the box file written next to a prepared receptor
+
+    Example:
+        './prepared_receptors/rec1.pdbqt' -> './prepared_receptors/rec1.box.txt'
+    """
+    return f"{os.path.splitext(receptor)[0]}.box.txt"
+
+
+def _readSDFCoords(sdf_file: str) -> np.ndarray:
+    """Read the coordinates of the first molecule of a V2000 SDF/MOL file."""
+    with open(sdf_file, "r", encoding="utf-8", errors="ignore") as f:
+        lines = [next(f) for _ in range(4)]
+        n_atoms = int(lines[3][:3])
+        coords = []
+        for _ in range(n_atoms):
+            line = next(f)
+            coords.append((float(line[0:10]), float(line[10:20]), float(line[20:30])))
+    return np.array(coords, dtype=np.float64)
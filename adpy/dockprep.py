@@ -1,22 +1,36 @@
 import os
 import csv
-from typing import List, Tuple, Optional, Union
+from typing import Dict, List, Tuple, Optional, Union
 import subprocess
 import requests
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 from vina import Vina
 from .utils import trimName, extractBindingAffinity
+from .boxes import (
+    boxFromCavity,
+    boxFromLigand,
+    boxFromResidues,
+    receptorBoxFile,
+    writeBoxFile,
+)
+from .trim import trimReceptor
+from .prepcache import PrepCache, toolVersion
 import polars as pl
 
 class DockPrep:
     def __init__(
-        self, ligand_tool="mk_prepare_ligand.py", receptor_tool="mk_prepare_receptor.py"
+        self,
+        ligand_tool="mk_prepare_ligand.py",
+        receptor_tool="mk_prepare_receptor.py",
+        prep_cache: Optional[PrepCache] = None,
     ):
         self.ligand_tool = ligand_tool
         self.receptor_tool = receptor_tool
         self.default_box_center = (-0.319, 5.27, 1.59)
         self.default_box_size = (80, 80, 80)
+        self.prep_cache = prep_cache
 
     def prepare_ligand(self, query: str, target: str) -> str:
         """
@@ -32,11 +46,23 @@ class DockPrep:
     Raises:
         Prints an error message if the external tool fails during execution.
     """
+        cache_key = None
+        if self.prep_cache is not None:
+            cache_key = self.prep_cache.key(
+                query, f"{os.path.basename(self.ligand_tool)}-{toolVersion()}"
+            )
+            if self.prep_cache.fetch(cache_key, {"ligand.pdbqt": target}):
+                print(f"Ligand prepared (cached): {target}")
+                return target
+
         try:
             os.makedirs(os.path.dirname(target), exist_ok=True)
             subprocess.run([self.ligand_tool, "-i", query, "-o", target], check=True)
             print(f"Ligand prepared: {target}")
 
+            if cache_key is not None:
+                self.prep_cache.store(cache_key, {"ligand.pdbqt": target})
+
         except subprocess.CalledProcessError as e:
             print(f"Error preparing ligand {query}: {e}")
 
@@ -49,6 +75,12 @@ class DockPrep:
         AlphaFold: bool = True,
         box_size: Optional[Tuple[int, int, int]] = None,
         box_center: Optional[Tuple[float, float, float]] = None,
+        reference_ligand: Optional[str] = None,
+        pocket_residues: Optional[List[Union[int, str]]] = None,
+        detect_pocket: bool = False,
+        box_padding: float = 5.0,
+        min_plddt: Optional[float] = None,
+        trim_distance: Optional[float] = None,
     ) -> str:
         """
     Prepares a single receptor file for docking by processing the input structure 
@@ -58,6 +90,15 @@ class DockPrep:
     `self.default_box_size` and `self.default_box_center`) are used. Otherwise, 
     both `box_size` and `box_center` must be provided.
 
+    A tight box can instead be derived from the receptor itself, from a reference
+    ligand, a residue selection or a geometric cavity search (first match wins).
+    The box is written next to the prepared receptor as `<target_prefix>.box.txt`,
+    where `AutoDock(..., box_from_receptor=True)` picks it up.
+
+    AlphaFold receptors can be trimmed first: residues with a pLDDT (B-factor
+    column) below `min_plddt`, or further than `trim_distance` from the box, are
+    dropped and the trimmed structure is written to `<target_prefix>_trimmed.pdb`.
+
     Args:
         query (str): Path to the input receptor file (e.g., in PDB format).
         target_prefix (str): Output path prefix for the prepared receptor files.
@@ -67,14 +108,29 @@ class DockPrep:
             Required if AlphaFold is False.
         box_center (Optional[Tuple[float, float, float]]): Center of the docking box (x, y, z).
             Required if AlphaFold is False.
+        reference_ligand (Optional[str]): Ligand (.pdb, .pdbqt, .sdf) in the receptor frame to
+            build the box around.
+        pocket_residues (Optional[List[Union[int, str]]]): Residue numbers or "A:745" style
+            chain:number strings to build the box around.
+        detect_pocket (bool): Build the box around the largest buried cavity of the receptor.
+        box_padding (float): Margin around the reference ligand or residues, in Angstrom.
+        min_plddt (Optional[float]): Drop residues with a lower mean pLDDT.
+        trim_distance (Optional[float]): Drop residues further than this from the box, in Angstrom.
 
     Raises:
         ValueError: If `AlphaFold` is False and either `box_size` or `box_center` is not provided.
         Prints an error message if the external tool fails during execution.
     """
 
+        # derive the box from the receptor if requested
+        derived_box = self.derive_box(
+            query, reference_ligand, pocket_residues, detect_pocket, box_padding
+        )
+        if derived_box is not None:
+            box_center, box_size = derived_box
+            print(f"Docking box: center {box_center}, size {box_size}")
         # use default values if AlphaFold protein
-        if AlphaFold:
+        elif AlphaFold:
             box_center = self.default_box_center
             box_size = self.default_box_size
         else:
@@ -83,8 +139,37 @@ class DockPrep:
                     "box_size and box_center must be provided if AlphaFold=False"
                 )
 
+        os.makedirs(os.path.dirname(target_prefix), exist_ok=True)
+        target = f"{target_prefix}.pdbqt"
+        cached_files = {"receptor.pdbqt": target, "receptor.box.txt": receptorBoxFile(target)}
+
+        cache_key = None
+        if self.prep_cache is not None:
+            cache_key = self.prep_cache.key(
+                query,
+                f"{os.path.basename(self.receptor_tool)}-{toolVersion()}",
+                {
+                    "box_size": list(box_size),
+                    "box_center": list(box_center),
+                    "min_plddt": min_plddt,
+                    "trim_distance": trim_distance,
+                },
+            )
+            if self.prep_cache.fetch(cache_key, cached_files):
+                print(f"Receptor prepared (cached): {target_prefix}")
+                return target
+
+        # drop low-confidence and distant residues before preparation
+        if min_plddt is not None or trim_distance is not None:
+            query = trimReceptor(
+                query,
+                f"{target_prefix}_trimmed.pdb",
+                min_plddt=min_plddt,
+                box=(box_center, box_size),
+                distance_cutoff=trim_distance,
+            )
+
         try:
-            os.makedirs(os.path.dirname(target_prefix), exist_ok=True)
             subprocess.run(
                 [
                     self.receptor_tool,
@@ -105,26 +190,151 @@ class DockPrep:
             print(f"Receptor prepared: {target_prefix}")
         except subprocess.CalledProcessError as e:
             print(f"Error preparing receptor {query}: {e}")
+            return target
 
-        return f"{target_prefix}.pdbqt"
+        # make sure the box travels with the prepared receptor
+        writeBoxFile((box_center, box_size), receptorBoxFile(target))
+
+        if cache_key is not None:
+            self.prep_cache.store(cache_key, cached_files)
+
+        return target
+
+    def derive_box(
+        self,
+        query: str,
+        reference_ligand: Optional[str] = None,
+        pocket_residues: Optional[List[Union[int, str]]] = None,
+        detect_pocket: bool = False,
+        box_padding: float = 5.0,
+    ) -> Optional[Tuple[Tuple[float, float, float], Tuple[float, float, float]]]:
+        """
+    Derives a tight docking box from the receptor structure.
+
+    Args:
+        query (str): Path to the receptor file (PDB or PDBQT).
+        reference_ligand (Optional[str]): Ligand in the receptor frame to build the box around.
+        pocket_residues (Optional[List[Union[int, str]]]): Residues to build the box around.
+        detect_pocket (bool): Build the box around the largest buried cavity.
+        box_padding (float): Margin around the reference ligand or residues, in Angstrom.
+
+    Returns:
+        Optional[Tuple]: (box_center, box_size), or None if no derivation was requested.
+    """
+        if reference_ligand is not None:
+            return boxFromLigand(reference_ligand, padding=box_padding)
+        if pocket_residues:
+            return boxFromResidues(query, pocket_residues, padding=box_padding)
+        if detect_pocket:
+            return boxFromCavity(query)
+        return None
 
-    def prepare_ligands_batch(self, ligands: List[Tuple[str, str]]) -> None:
+    def prepare_ligands_batch(
+        self,
+        ligands: List[Tuple[str, str]],
+        in_process: bool = False,
+        n_workers: Optional[int] = None,
+    ) -> None:
         """
     Prepares multiple ligand files for docking in a batch process.
 
     This method iterates over a list of ligand input/output file pairs and prepares each 
-    ligand using the `prepare_ligand` method.
+    ligand using the `prepare_ligand` method. With `in_process=True` the ligands are
+    instead prepared with RDKit and meeko inside a pool of worker processes, which
+    avoids starting a new `self.ligand_tool` interpreter for every molecule.
 
     Args:
         ligands (List[Tuple[str, str]]): A list of tuples, where each tuple contains:
             - input_file (str): Path to the input ligand file.
             - output_file (str): Path where the prepared ligand file will be saved.
+        in_process (bool): Prepare the ligands in a process pool instead of
+            calling the external tool once per ligand.
+        n_workers (Optional[int]): Number of worker processes, defaults to the CPU count.
 
     Returns:
         None
     """
+        if not in_process:
+            for query, target in ligands:
+                self.prepare_ligand(query, target)
+            if self.prep_cache is not None:
+                self.prep_cache.report()
+            return
+
+        # RDKit and meeko are only needed here, not to import adpy
+        from .ligprep import prepareLigandsParallel
+
+        items = []
+        cache_keys = {}
         for query, target in ligands:
-            self.prepare_ligand(query, target)
+            if self.prep_cache is not None:
+                cache_keys[query] = self.prep_cache.key(query, f"meeko-inprocess-{toolVersion()}")
+                if self.prep_cache.fetch(cache_keys[query], {"ligand.pdbqt": target}):
+                    print(f"Ligand prepared (cached): {target}")
+                    continue
+            items.append((query, query, "file", target))
+
+        for query, target, error in prepareLigandsParallel(items, n_workers):
+            if error is not None:
+                print(f"Error preparing ligand {query}: {error}")
+            else:
+                print(f"Ligand prepared: {target}")
+                if query in cache_keys:
+                    self.prep_cache.store(cache_keys[query], {"ligand.pdbqt": target})
+
+        if self.prep_cache is not None:
+            self.prep_cache.report()
+
+    def prepare_ligand_strings(
+        self,
+        queries: List[str],
+        n_workers: Optional[int] = None,
+        executor: Optional[ProcessPoolExecutor] = None,
+    ) -> Dict[str, str]:
+        """
+    Prepares ligand files in a process pool and returns their PDBQT strings.
+
+    Nothing is written to disk; the strings can be docked directly with
+    `AutoDock.dockLigandStrings`, which uses `Vina.set_ligand_from_string`.
+
+    Args:
+        queries (List[str]): Paths to the input ligand files (e.g., SDF, MOL2).
+        n_workers (Optional[int]): Number of worker processes, defaults to the CPU count.
+        executor (Optional[ProcessPoolExecutor]): Existing preparation pool to reuse
+            across calls, see `prepareLigandsParallel`.
+
+    Returns:
+        Dict[str, str]: Ligand name (file name without extension) -> PDBQT string.
+            Ligands that failed to prepare are left out.
+    """
+        from .ligprep import prepareLigandsParallel
+
+        prepared = {}
+        items = []
+        cache_keys = {}
+        for query in queries:
+            name = os.path.splitext(os.path.basename(query))[0]
+            if self.prep_cache is not None:
+                cache_keys[name] = self.prep_cache.key(query, f"meeko-inprocess-{toolVersion()}")
+                pdbqt_string = self.prep_cache.fetch_text(cache_keys[name], "ligand.pdbqt")
+                if pdbqt_string is not None:
+                    prepared[name] = pdbqt_string
+                    continue
+            items.append((name, query, "file", None))
+
+        for name, pdbqt_string, error in prepareLigandsParallel(
+            items, n_workers, executor=executor
+        ):
+            if error is not None:
+                print(f"Error preparing ligand {name}: {error}")
+            else:
+                prepared[name] = pdbqt_string
+                if name in cache_keys:
+                    self.prep_cache.store_text(cache_keys[name], "ligand.pdbqt", pdbqt_string)
+
+        if self.prep_cache is not None:
+            self.prep_cache.report()
+        return prepared
 
     def prepare_receptors_batch(
         self,
@@ -163,4 +373,6 @@ class DockPrep:
             else:
                 self.prepare_receptor(
                     query, target_prefix, AlphaFold, box_size, box_center
-                )
\ No newline at end of file
+                )
+        if self.prep_cache is not None:
+            self.prep_cache.report()
\ No newline at end of file
@@ -0,0 +1,534 @@
+import os
+import time
+import dataclasses
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.connection import wait
+from typing import List, Optional, Tuple
+
+import polars as pl
+
+from .autodock import AutoDock, _emptyResultRow
+from .jobs import DockingJob, _chunkJobs
+from .mapcache import MapCache
+from .journal import CheckpointJournal
+from .sinks import ResultSink
+from .resultstore import ResultStore
+from .posestore import PoseArchive
+from .scheduler import ReceptorMajorScheduler
+from .metrics import RunMetrics, _castTimingColumns
+
+# Per-process AutoDock instance, created by the pool initializer
+_worker_docker = None
+_worker_journal = None
+
+
+def _init_worker(
+    sf_name: str,
+    cpu: int,
+    seed: int,
+    spacing: float,
+    map_cache_dir: Optional[str],
+    map_cache_size_gb: float,
+    diagnostics: bool = False,
+    pose_archive_dir: Optional[str] = None,
+    cluster_rmsd: Optional[float] = None,
+) -> None:
+    """Create the AutoDock (and Vina) object owned by a worker process."""
+    global _worker_docker
+    map_cache = (
+        MapCache(map_cache_dir, max_size_gb=map_cache_size_gb)
+        if map_cache_dir is not None
+        else None
+    )
+    _worker_docker = AutoDock(
+        sf_name=sf_name,
+        reuse_maps=True,
+        map_cache=map_cache,
+        spacing=spacing,
+        cpu=cpu,
+        seed=seed,
+        diagnostics=diagnostics,
+        pose_archive=PoseArchive(pose_archive_dir) if pose_archive_dir is not None else None,
+        cluster_rmsd=cluster_rmsd,
+    )
+
+
+def _dock_chunk(
+    jobs: List[DockingJob],
+    journal_path: Optional[str] = None,
+    result_store_path: Optional[str] = None,
+    timing: bool = False,
+) -> Tuple[List[Tuple[Optional[dict], float]], int, int]:
+    """
+    Dock a chunk of jobs on the worker's AutoDock, keeping its maps warm.
+
+    Returns the result row and elapsed seconds of every job, and the number
+    of affinity map builds performed and skipped for the chunk. With a journal
+    each outcome is recorded as soon as the job ends, and a failed job gets
+    a "failed" status row instead of aborting the chunk. With a result store, stored
+    jobs are reused and new results are added to it. With timing, rows carry
+    the per-stage timing columns.
+    """
+    global _worker_journal
+    if journal_path is not None and (
+        _worker_journal is None or _worker_journal.path != journal_path
+    ):
+        _worker_journal = CheckpointJournal(journal_path)
+
+    if result_store_path is None:
+        _worker_docker.result_store = None
+    elif (
+        _worker_docker.result_store is None
+        or _worker_docker.result_store.path != result_store_path
+    ):
+        _worker_docker.result_store = ResultStore(result_store_path)
+    _worker_docker.timing = timing
+
+    builds, skipped = _worker_docker.map_builds, _worker_docker.map_builds_skipped
+    results = []
+    for job in jobs:
+        start = time.perf_counter()
+        if journal_path is None:
+            row = _worker_docker._run_job(job)
+        else:
+            try:
+                row = _worker_docker._run_job(job)
+                _worker_journal.record(job, row)
+            except Exception as e:
+                print(f"Docking failed for {job.ligand} - {job.receptor}: {str(e)}")
+                _worker_journal.record_failure(job, str(e))
+                row = _worker_docker._status_row(job, "failed")
+        results.append((row, time.perf_counter() - start))
+    return (
+        results,
+        _worker_docker.map_builds - builds,
+        _worker_docker.map_builds_skipped - skipped,
+    )
+
+
+def _supervised_worker(
+    conn, init_args: tuple, result_store_path: Optional[str], timing: bool = False
+) -> None:
+    """
+    Worker loop of a supervised engine: dock one job per request until told to stop.
+
+    Sends (row, error, elapsed seconds, map builds, map builds skipped) back
+    for every job, so the supervisor always knows which job a worker is on
+    and since when.
+    """
+    _init_worker(*init_args)
+    if result_store_path is not None:
+        _worker_docker.result_store = ResultStore(result_store_path)
+    _worker_docker.timing = timing
+
+    while True:
+        job = conn.recv()
+        if job is None:
+            break
+        start = time.perf_counter()
+        builds, skipped = _worker_docker.map_builds, _worker_docker.map_builds_skipped
+        try:
+            row, error = _worker_docker._run_job(job), None
+        except Exception as e:
+            row, error = None, str(e)
+        conn.send((
+            row,
+            error,
+            time.perf_counter() - start,
+            _worker_docker.map_builds - builds,
+            _worker_docker.map_builds_skipped - skipped,
+        ))
+    conn.close()
+
+
+class DockingEngine:
+    def __init__(
+        self,
+        n_workers: Optional[int] = None,
+        cpu_per_worker: Optional[int] = None,
+        sf_name: str = "vina",
+        seed: int = 0,
+        spacing: float = 0.375,
+        map_cache_dir: Optional[str] = None,
+        map_cache_size_gb: float = 10.0,
+        chunk_size: int = 16,
+        scheduler: Optional[ReceptorMajorScheduler] = None,
+        diagnostics: bool = False,
+        pose_archive_dir: Optional[str] = None,
+        cluster_rmsd: Optional[float] = None,
+        job_timeout: Optional[float] = None,
+        timeout_retry_exhaustiveness: Optional[int] = None,
+    ) -> None:
+        """
+        Process-pool docking engine.
+
+        Every worker process owns its own Vina object. Jobs are sent to the
+        workers in chunks that share one receptor and box, so a worker keeps
+        its affinity maps for the whole chunk. `n_workers * cpu_per_worker`
+        is kept within the number of available cores unless both are given.
+
+        Args:
+            n_workers: Number of worker processes
+            cpu_per_worker: Number of threads each worker's Vina object uses
+            sf_name: Scoring function name for Vina
+            seed: Random seed passed to every worker's Vina object
+            spacing: Grid spacing of the affinity maps in Angstrom
+            map_cache_dir: Directory of a shared on-disk map cache
+            map_cache_size_gb: Size cap of the map cache in gigabytes
+            chunk_size: Maximum number of jobs sent to a worker at once
+                (ignored when a scheduler is used)
+            scheduler: Receptor-major scheduler deciding chunking and order
+            diagnostics: Score and minimize the input pose before docking,
+                see `AutoDock`
+            pose_archive_dir: Directory of a shared pose archive; every worker
+                appends its poses to its own shards instead of writing files
+            cluster_rmsd: RMSD cutoff for clustering the poses of every run,
+                see `AutoDock`
+            job_timeout: Wall-clock limit of a single job in seconds. Workers
+                are then supervised: a worker exceeding the limit is killed
+                and replaced, and the job gets a "timeout" status row.
+            timeout_retry_exhaustiveness: Retry a timed-out job once at this
+                (lower) exhaustiveness before giving up on it
+        """
+        total_cpus = os.cpu_count() or 1
+        if n_workers is None and cpu_per_worker is None:
+            cpu_per_worker = min(4, total_cpus)
+        if n_workers is None:
+            n_workers = max(1, total_cpus // cpu_per_worker)
+        if cpu_per_worker is None:
+            cpu_per_worker = max(1, total_cpus // n_workers)
+        if n_workers * cpu_per_worker > total_cpus:
+            print(
+                f"Warning: {n_workers} workers x {cpu_per_worker} threads "
+                f"oversubscribes {total_cpus} CPUs"
+            )
+
+        self.n_workers = n_workers
+        self.cpu_per_worker = cpu_per_worker
+        self.sf_name = sf_name
+        self.seed = seed
+        self.spacing = spacing
+        self.map_cache_dir = map_cache_dir
+        self.map_cache_size_gb = map_cache_size_gb
+        self.chunk_size = chunk_size
+        self.scheduler = scheduler
+        self.diagnostics = diagnostics
+        self.pose_archive_dir = pose_archive_dir
+        self.cluster_rmsd = cluster_rmsd
+        self.job_timeout = job_timeout
+        self.timeout_retry_exhaustiveness = timeout_retry_exhaustiveness
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Affinity map builds performed and skipped by the workers
+        self.map_builds = 0
+        self.map_builds_skipped = 0
+
+    def start(self) -> "DockingEngine":
+        """
+        Start a worker pool that is kept across `run()` calls.
+
+        Workers then keep their Vina objects and affinity maps between runs,
+        e.g. between the chunks of a streamed library.
+        """
+        if self._executor is None:
+            self._executor = self._make_executor()
+        return self
+
+    def shutdown(self) -> None:
+        """Stop the persistent worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "DockingEngine":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.shutdown()
+
+    def run(
+        self,
+        jobs: List[DockingJob],
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        result_store: Optional[ResultStore] = None,
+        metrics: Optional[RunMetrics] = None,
+    ) -> Optional[pl.DataFrame]:
+        """
+        Dock all jobs across the worker pool.
+
+        Args:
+            jobs (List[DockingJob]): Jobs to dock.
+            journal (Optional[CheckpointJournal]): Journal the workers record
+                every finished or failed job in.
+            sink (Optional[ResultSink]): Streaming writer receiving the rows
+                of every chunk as soon as it completes, in completion order.
+            result_store (Optional[ResultStore]): Store of finished results the
+                workers consult before docking and add new results to.
+            metrics (Optional[RunMetrics]): Run metrics every finished row is
+                added to. Workers then add per-stage timing columns to the rows.
+
+        Returns:
+            Optional[pl.DataFrame]: One row per job, in job order, with the
+            same columns as the serial AutoDock batch methods, including a
+            status column ("ok", "reused", "failed", and with a job_timeout also
+            "retried" or "timeout"). Failed jobs get a row with empty results
+            when a journal is used or a job_timeout is set. None if rows were
+            streamed to a sink.
+        """
+        if self.scheduler is not None:
+            chunks = self.scheduler.plan(jobs, self.n_workers)
+        else:
+            chunks = _chunkJobs(jobs, self.chunk_size)
+        print(
+            f"Docking {len(jobs)} jobs in {len(chunks)} chunks on "
+            f"{self.n_workers} workers x {self.cpu_per_worker} CPUs"
+        )
+
+        if metrics is not None:
+            metrics.n_workers = self.n_workers
+            metrics.start()
+
+        results = [None] * len(jobs)
+        durations = [0.0] * len(jobs)
+        start = time.perf_counter()
+        if self.job_timeout is not None:
+            self._run_supervised(
+                jobs, chunks, results, durations, journal, sink, result_store, metrics
+            )
+        else:
+            self._run_pooled(
+                jobs, chunks, results, durations, journal, sink, result_store, metrics
+            )
+        makespan = time.perf_counter() - start
+
+        if self.scheduler is not None:
+            self.scheduler.report(jobs, durations, makespan)
+
+        if sink is not None:
+            return None
+        return _castTimingColumns(pl.DataFrame(
+            [row for row in results if row is not None], infer_schema_length=None
+        ))
+
+    def _run_pooled(
+        self,
+        jobs: List[DockingJob],
+        chunks: List[List[int]],
+        results: List[Optional[dict]],
+        durations: List[float],
+        journal: Optional[CheckpointJournal],
+        sink: Optional[ResultSink],
+        result_store: Optional[ResultStore],
+        metrics: Optional[RunMetrics],
+    ) -> None:
+        """Dock the chunks on the process pool, writing rows to `results` or the sink."""
+        executor = self._executor if self._executor is not None else self._make_executor()
+        try:
+            futures = {
+                executor.submit(
+                    _dock_chunk,
+                    [jobs[i] for i in chunk],
+                    journal.path if journal is not None else None,
+                    result_store.path if result_store is not None else None,
+                    metrics is not None,
+                ): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                chunk_results, builds, skipped = future.result()
+                self.map_builds += builds
+                self.map_builds_skipped += skipped
+                for i, (row, elapsed) in zip(futures[future], chunk_results):
+                    durations[i] = elapsed
+                    if row is None:
+                        continue
+                    if metrics is not None:
+                        metrics.observe(row)
+                    if sink is not None:
+                        sink.write(row)
+                    else:
+                        results[i] = row
+        finally:
+            if executor is not self._executor:
+                executor.shutdown()
+
+    def _run_supervised(
+        self,
+        jobs: List[DockingJob],
+        chunks: List[List[int]],
+        results: List[Optional[dict]],
+        durations: List[float],
+        journal: Optional[CheckpointJournal],
+        sink: Optional[ResultSink],
+        result_store: Optional[ResultStore],
+        metrics: Optional[RunMetrics],
+    ) -> None:
+        """
+        Dock the chunks on supervised worker processes with a per-job time limit.
+
+        Each worker is sent one job at a time from its current chunk, so it
+        keeps its maps warm, while the supervisor knows how long the job has
+        been running. A worker still busy after `job_timeout` seconds is
+        killed and replaced by a fresh one that continues with the rest of the
+        chunk. Rows are written to `results` or the sink as jobs finish.
+        """
+        ctx = multiprocessing.get_context("spawn")
+        init_args = self._init_args()
+        store_path = result_store.path if result_store is not None else None
+        # Tasks are (job index, job, is retry)
+        task_chunks = deque(deque((i, jobs[i], False) for i in chunk) for chunk in chunks)
+
+        def start_worker(slot: dict) -> None:
+            parent_conn, child_conn = ctx.Pipe()
+            slot["process"] = ctx.Process(
+                target=_supervised_worker,
+                args=(child_conn, init_args, store_path, metrics is not None),
+                daemon=True,
+            )
+            slot["process"].start()
+            child_conn.close()
+            slot["conn"] = parent_conn
+
+        def stop_worker(slot: dict) -> None:
+            slot["process"].kill()
+            slot["process"].join()
+            slot["conn"].close()
+
+        def dispatch(slot: dict) -> None:
+            if not slot["tasks"] and task_chunks:
+                slot["tasks"] = task_chunks.popleft()
+            slot["running"] = slot["tasks"].popleft() if slot["tasks"] else None
+            if slot["running"] is not None:
+                slot["conn"].send(slot["running"][1])
+                slot["started"] = time.perf_counter()
+
+        def emit(i: int, row: dict) -> None:
+            if metrics is not None:
+                metrics.observe(row)
+            if sink is not None:
+                sink.write(row)
+            else:
+                results[i] = row
+
+        def status_row(job: DockingJob, status: str) -> dict:
+            return _emptyResultRow(
+                job, status, self.diagnostics, self.cluster_rmsd, metrics is not None
+            )
+
+        slots = [{"tasks": deque(), "running": None} for _ in range(min(self.n_workers, len(chunks)))]
+        try:
+            for slot in slots:
+                start_worker(slot)
+                dispatch(slot)
+
+            while True:
+                for slot in slots:
+                    if slot["running"] is None and task_chunks:
+                        dispatch(slot)
+                busy = [slot for slot in slots if slot["running"] is not None]
+                if not busy:
+                    break
+
+                deadline = min(slot["started"] for slot in busy) + self.job_timeout
+                ready = wait([slot["conn"] for slot in busy], timeout=max(0.0, deadline - time.perf_counter()))
+
+                for slot in busy:
+                    i, job, retried = slot["running"]
+                    if slot["conn"] in ready:
+                        try:
+                            row, error, elapsed, builds, skipped = slot["conn"].recv()
+                            self.map_builds += builds
+                            self.map_builds_skipped += skipped
+                        except EOFError:
+                            # The worker died, e.g. killed by the OS
+                            row, error = None, "worker process died"
+                            elapsed = time.perf_counter() - slot["started"]
+                            stop_worker(slot)
+                            start_worker(slot)
+                        durations[i] += elapsed
+
+                        if error is not None:
+                            print(f"Docking failed for {job.ligand} - {job.receptor}: {error}")
+                            if journal is not None:
+                                journal.record_failure(jobs[i], error)
+                            emit(i, status_row(job, "failed"))
+                        else:
+                            if retried:
+                                row["status"] = "retried"
+                            if journal is not None:
+                                # Under the original job, so a resumed run skips it
+                                journal.record(jobs[i], row)
+                            emit(i, row)
+                        dispatch(slot)
+
+                    elif time.perf_counter() - slot["started"] >= self.job_timeout:
+                        stop_worker(slot)
+                        start_worker(slot)
+                        durations[i] += self.job_timeout
+                        print(
+                            f"Docking timed out after {self.job_timeout:.0f} s: "
+                            f"{job.ligand} - {job.receptor} (exhaustiveness {job.exhaustiveness})"
+                        )
+
+                        retry = self.timeout_retry_exhaustiveness
+                        if not retried and retry is not None and retry < job.exhaustiveness:
+                            task_chunks.append(
+                                deque([(i, dataclasses.replace(job, exhaustiveness=retry), True)])
+                            )
+                        else:
+                            if journal is not None:
+                                journal.record_failure(jobs[i], "timeout")
+                            emit(i, status_row(job, "timeout"))
+                        dispatch(slot)
+        finally:
+            for slot in slots:
+                if "process" not in slot:
+                    continue
+                try:
+                    slot["conn"].send(None)
+                except (OSError, ValueError):
+                    pass
+                slot["process"].join(timeout=5)
+                if slot["process"].is_alive():
+                    slot["process"].kill()
+                    slot["process"].join()
+
+    @property
+    def config(self) -> dict:
+        """Worker settings, keyed like `WorkQueue.config`."""
+        return {
+            "sf_name": self.sf_name,
+            "seed": self.seed,
+            "spacing": self.spacing,
+            "cpu": self.cpu_per_worker,
+            "map_cache_dir": self.map_cache_dir,
+            "map_cache_size_gb": self.map_cache_size_gb,
+            "diagnostics": self.diagnostics,
+            "pose_archive_dir": self.pose_archive_dir,
+            "cluster_rmsd": self.cluster_rmsd,
+        }
+
+    def _init_args(self) -> tuple:
+        """Arguments of `_init_worker` for this engine's workers."""
+        return (
+            self.sf_name,
+            self.cpu_per_worker,
+            self.seed,
+            self.spacing,
+            self.map_cache_dir,
+            self.map_cache_size_gb,
+            self.diagnostics,
+            self.pose_archive_dir,
+            self.cluster_rmsd,
+        )
+
+    def _make_executor(self) -> ProcessPoolExecutor:
+        """Create a worker pool whose processes each own an AutoDock object."""
+        return ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=self._init_args(),
+        )
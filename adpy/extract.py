@@ -0,0 +1,249 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import polars as pl
+
+# Per-pose values parsed from the REMARK lines Vina writes above every MODEL
+POSE_FIELDS = ("affinity", "inter", "intra", "rmsd_lb", "rmsd_ub")
+
+
+def parsePoseRemarks(output_file: str) -> List[Dict[str, float]]:
+    """
+    Parse the energies of every pose in a docking output file
+
+    Args:
+        output_file: Path to PDBQT file generated after docking
+
+    Returns:
+        One dict per pose with 'affinity', 'rmsd_lb' and 'rmsd_ub' (from
+        REMARK VINA RESULT) and 'inter' and 'intra' (from REMARK INTER and
+        REMARK INTRA, None if missing), in pose order
+    """
+    poses: List[Dict[str, float]] = []
+    with open(output_file, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not line.startswith("REMARK"):
+                # Remarks precede the atoms of their pose
+                continue
+            fields = line.split()
+            try:
+                if line.startswith("REMARK VINA RESULT:"):
+                    poses.append(
+                        {
+                            "affinity": float(fields[3]),
+                            "inter": None,
+                            "intra": None,
+                            "rmsd_lb": float(fields[4]),
+                            "rmsd_ub": float(fields[5]),
+                        }
+                    )
+                elif poses and line.startswith("REMARK INTER:"):
+                    poses[-1]["inter"] = float(fields[2])
+                elif poses and line.startswith("REMARK INTRA:"):
+                    poses[-1]["intra"] = float(fields[2])
+            except (IndexError, ValueError):
+                print(f"Error parsing line '{line.strip()}' of {output_file}")
+    return poses
+
+
+def splitOutputName(
+    name: str,
+    ligands: Optional[Iterable[str]] = None,
+    receptors: Optional[Iterable[str]] = None,
+) -> Tuple[str, str]:
+    """
+    Map an output file name '<ligand>_<receptor>' back to its ligand and receptor
+
+    Names may contain underscores themselves, so known receptor (or ligand)
+    names are matched first, longest first. Without a match the name is split
+    at its last underscore.
+
+    Args:
+        name: Output file name without extension
+        ligands: Known ligand names
+        receptors: Known receptor names
+
+    Returns:
+        (ligand, receptor)
+    """
+    for receptor in sorted(receptors or (), key=len, reverse=True):
+        if name.endswith(f"_{receptor}") and len(name) > len(receptor) + 1:
+            return name[: -len(receptor) - 1], receptor
+    for ligand in sorted(ligands or (), key=len, reverse=True):
+        if name.startswith(f"{ligand}_") and len(name) > len(ligand) + 1:
+            return ligand, name[len(ligand) + 1:]
+
+    ligand, _, receptor = name.rpartition("_")
+    return (ligand, receptor) if ligand else (name, "")
+
+
+def _parse_output(entry: Tuple[str, int, int]) -> Tuple[str, int, int, List[Dict[str, float]], Optional[str]]:
+    """Parse one output file in a worker process; returns (path, size, mtime, poses, error)."""
+    path, size, mtime_ns = entry
+    try:
+        return path, size, mtime_ns, parsePoseRemarks(path), None
+    except OSError as e:
+        return path, size, mtime_ns, [], str(e)
+
+
+def _scan_outputs(output_dir: str, recursive: bool) -> Iterable[Tuple[str, int, int]]:
+    """Yield (path, size, mtime_ns) of every output PDBQT, using os.scandir."""
+    stack = [output_dir]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        stack.append(entry.path)
+                elif entry.name.endswith(".pdbqt"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime_ns
+
+
+def _read_summary(path: str) -> Optional[pl.DataFrame]:
+    """Read an earlier summary, or None if there is none."""
+    if not os.path.exists(path):
+        return None
+    try:
+        if path.endswith(".parquet"):
+            return pl.read_parquet(path)
+        return pl.read_csv(path, infer_schema_length=None)
+    except Exception as e:
+        print(f"Ignoring unreadable summary {path}: {str(e)}")
+        return None
+
+
+def pdbqt2csv(
+    output_dir: str,
+    output_file: Optional[str] = None,
+    ligands: Optional[Iterable[str]] = None,
+    receptors: Optional[Iterable[str]] = None,
+    n_workers: Optional[int] = None,
+    chunksize: int = 256,
+    incremental: bool = True,
+    recursive: bool = False,
+) -> pl.DataFrame:
+    """
+    Summarize a directory of docking output files into one CSV or Parquet file
+
+    The directory is listed with os.scandir and the REMARK lines of the files
+    are parsed in a process pool. Every file is mapped back to its ligand and
+    receptor by its '<ligand>_<receptor>.pdbqt' name, never by listing order.
+    With `incremental`, files whose size and modification time match the
+    existing summary are not read again, and deleted files are dropped.
+
+    Args:
+        output_dir: Directory with docking output (.pdbqt)
+        output_file: Summary path (.csv or .parquet), defaults to
+            '<output_dir>/docking_summary.csv'
+        ligands: Known ligand names (or paths) to resolve ambiguous file names
+        receptors: Known receptor names (or paths) to resolve ambiguous file names
+        n_workers: Number of parsing processes, defaults to the CPU count
+        chunksize: Number of files sent to a worker at once
+        incremental: Only parse files that are new or changed since the last summary
+        recursive: Also scan subdirectories
+
+    Returns:
+        One row per output file: file, ligand, receptor, binding_affinity,
+        n_poses, the affinity_k, inter_k, intra_k, rmsd_lb_k and rmsd_ub_k
+        columns of every pose k, and the file size and mtime_ns used by
+        incremental scans
+    """
+    if output_file is None:
+        output_file = os.path.join(output_dir, "docking_summary.csv")
+    ligands = [os.path.splitext(os.path.basename(l))[0] for l in ligands or ()]
+    receptors = [os.path.splitext(os.path.basename(r))[0] for r in receptors or ()]
+
+    files = sorted(_scan_outputs(output_dir, recursive))
+    previous = _read_summary(output_file) if incremental else None
+
+    unchanged = set()
+    if previous is not None and {"file", "size", "mtime_ns"} <= set(previous.columns):
+        current = pl.DataFrame(
+            files,
+            schema={"file": pl.Utf8, "size": pl.Int64, "mtime_ns": pl.Int64},
+            orient="row",
+        )
+        previous = previous.join(current, on=["file", "size", "mtime_ns"], how="semi")
+        unchanged = set(previous["file"].to_list())
+    else:
+        previous = None
+
+    pending = [entry for entry in files if entry[0] not in unchanged]
+    print(
+        f"Scanned {len(files)} output files in {output_dir}: "
+        f"{len(pending)} new or changed, {len(unchanged)} unchanged"
+    )
+
+    rows = []
+    max_poses = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for path, size, mtime_ns, poses, error in executor.map(
+                _parse_output, pending, chunksize=chunksize
+            ):
+                if error is not None:
+                    print(f"Error reading {path}: {error}")
+                    continue
+                name = os.path.splitext(os.path.basename(path))[0]
+                ligand, receptor = splitOutputName(name, ligands, receptors)
+                row = {
+                    "file": path,
+                    "ligand": ligand,
+                    "receptor": receptor,
+                    "binding_affinity": poses[0]["affinity"] if poses else None,
+                    "n_poses": len(poses),
+                }
+                for k, pose in enumerate(poses, start=1):
+                    for field in POSE_FIELDS:
+                        row[f"{field}_{k}"] = pose[field]
+                row["size"] = size
+                row["mtime_ns"] = mtime_ns
+                rows.append(row)
+                max_poses = max(max_poses, len(poses))
+
+    schema = {
+        "file": pl.Utf8,
+        "ligand": pl.Utf8,
+        "receptor": pl.Utf8,
+        "binding_affinity": pl.Float64,
+        "n_poses": pl.Int64,
+    }
+    for k in range(1, max_poses + 1):
+        for field in POSE_FIELDS:
+            schema[f"{field}_{k}"] = pl.Float64
+    schema["size"] = pl.Int64
+    schema["mtime_ns"] = pl.Int64
+
+    df_new = pl.DataFrame(
+        [{column: row.get(column) for column in schema} for row in rows],
+        schema=schema,
+    )
+    if previous is not None:
+        df_summary = pl.concat([previous, df_new], how="diagonal_relaxed")
+    else:
+        df_summary = df_new
+
+    # Keep the pose columns grouped by pose and the file stats last
+    pose_columns = sorted(
+        (c for c in df_summary.columns if c.rsplit("_", 1)[-1].isdigit()),
+        key=lambda c: (int(c.rsplit("_", 1)[-1]), POSE_FIELDS.index(c.rsplit("_", 1)[0])),
+    )
+    df_summary = df_summary.select(
+        ["file", "ligand", "receptor", "binding_affinity", "n_poses"]
+        + pose_columns
+        + ["size", "mtime_ns"]
+    ).sort("file")
+
+    if os.path.dirname(output_file):
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    tmp_file = f"{output_file}.tmp"
+    if output_file.endswith(".parquet"):
+        df_summary.write_parquet(tmp_file)
+    else:
+        df_summary.write_csv(tmp_file)
+    os.replace(tmp_file, output_file)
+
+    print(f"Results saved to {output_file}")
+    return df_summary
@@ -0,0 +1,90 @@
+import os
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class DockingJob:
+    """
+    A single ligand-receptor docking task.
+
+    Attributes:
+        ligand: Path to prepared ligand (.pdbqt)
+        receptor: Path to prepared receptor (.pdbqt)
+        center: Coordinates (x, y, z) for the center of the docking box
+        box_size: Dimensions (x, y, z) of the docking box
+        exhaustiveness: Exhaustiveness of the global search
+        n_poses: Number of binding poses to generate
+        output_dir: Directory where the docked poses are written
+        spacing: Grid spacing of the affinity maps, None uses the docker's default
+        ligand_pdbqt: Prepared ligand as a PDBQT string; `ligand` is then only
+            used as its name and is never read
+
+    File paths are made absolute on construction, so a job means the same
+    files, and has the same key, in any working directory or process.
+    """
+
+    ligand: str
+    receptor: str
+    center: Tuple[float, float, float]
+    box_size: Tuple[float, float, float]
+    exhaustiveness: int
+    n_poses: int
+    output_dir: str
+    spacing: Optional[float] = None
+    ligand_pdbqt: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.ligand_pdbqt is None:
+            object.__setattr__(self, "ligand", os.path.abspath(self.ligand))
+        object.__setattr__(self, "receptor", os.path.abspath(self.receptor))
+        object.__setattr__(self, "output_dir", os.path.abspath(self.output_dir))
+
+    @property
+    def map_key(self) -> Tuple:
+        """Jobs sharing this key can dock against the same affinity maps."""
+        return (self.receptor, tuple(self.center), tuple(self.box_size), self.spacing)
+
+    @property
+    def key(self) -> str:
+        """Stable identifier of the (ligand, receptor, params) triple."""
+        fields = (
+            self.ligand,
+            self.receptor,
+            tuple(float(c) for c in self.center),
+            tuple(float(b) for b in self.box_size),
+            self.exhaustiveness,
+            self.n_poses,
+            self.spacing,
+        )
+        # A ligand given as a string is identified by its content, not only its name
+        if self.ligand_pdbqt is not None:
+            fields += (hashlib.sha1(self.ligand_pdbqt.encode()).hexdigest(),)
+        return hashlib.sha1(repr(fields).encode()).hexdigest()
+
+    @property
+    def params(self) -> dict:
+        """Docking parameters of the job."""
+        return {
+            "center": list(self.center),
+            "box_size": list(self.box_size),
+            "exhaustiveness": self.exhaustiveness,
+            "n_poses": self.n_poses,
+            "spacing": self.spacing,
+        }
+
+
+def _chunkJobs(jobs: List[DockingJob], chunk_size: int) -> List[List[int]]:
+    """Split job indices into chunks of at most chunk_size consecutive jobs sharing the same maps."""
+    chunks: List[List[int]] = []
+    for i, job in enumerate(jobs):
+        if (
+            chunks
+            and len(chunks[-1]) < chunk_size
+            and jobs[chunks[-1][-1]].map_key == job.map_key
+        ):
+            chunks[-1].append(i)
+        else:
+            chunks.append([i])
+    return chunks
@@ -0,0 +1,93 @@
+import os
+import json
+from typing import Dict
+
+from .jobs import DockingJob
+
+
+class CheckpointJournal:
+    def __init__(self, path: str) -> None:
+        """
+        Append-only journal of finished and failed docking jobs.
+
+        Every job outcome is written as one JSON line and fsync'd before the
+        next job starts, so a crashed or killed run loses at most the job in
+        flight. A restarted run with the same journal skips every job whose
+        (ligand, receptor, params) triple finished successfully; failed jobs
+        are retried. Lines are short single writes in append mode, so several
+        worker processes can share one journal.
+
+        Args:
+            path: Path of the journal file (JSON lines)
+        """
+        self.path = path
+        self.finished: Dict[str, dict] = {}
+        self.failed: Dict[str, str] = {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.load()
+
+    def load(self) -> None:
+        """Read the journal from disk, the latest entry of a job wins."""
+        self.finished.clear()
+        self.failed.clear()
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line of a killed run
+                    continue
+                key = entry["key"]
+                if entry["status"] == "ok":
+                    self.finished[key] = entry["result"]
+                    self.failed.pop(key, None)
+                else:
+                    self.failed[key] = entry.get("error", "")
+                    self.finished.pop(key, None)
+
+    def is_finished(self, job: DockingJob) -> bool:
+        """Return True if the job already finished successfully."""
+        return job.key in self.finished
+
+    def record(self, job: DockingJob, result: dict) -> None:
+        """Record a successfully docked job and its result row."""
+        self.finished[job.key] = result
+        self.failed.pop(job.key, None)
+        self._append(
+            {
+                "key": job.key,
+                "ligand": job.ligand,
+                "receptor": job.receptor,
+                "params": job.params,
+                "status": "ok",
+                "result": result,
+            }
+        )
+
+    def record_failure(self, job: DockingJob, error: str) -> None:
+        """Record a job that raised instead of aborting the batch."""
+        self.failed[job.key] = error
+        self._append(
+            {
+                "key": job.key,
+                "ligand": job.ligand,
+                "receptor": job.receptor,
+                "params": job.params,
+                "status": "failed",
+                "error": error,
+            }
+        )
+
+    def _append(self, entry: dict) -> None:
+        """Append one entry with a single write and fsync it."""
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
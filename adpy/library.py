@@ -0,0 +1,263 @@
+import os
+import re
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+
+from .autodock import AutoDock
+from .jobs import DockingJob
+from .journal import CheckpointJournal
+from .ligprep import _init_preparator, prepareLigandsParallel
+from .pipeline import _iterQueue, _startStage
+from .sinks import ResultSink
+from .utils import trimName
+
+if TYPE_CHECKING:
+    from .engine import DockingEngine
+
+def _moleculeName(title: str, stem: str, n: int) -> str:
+    """File-safe name of record n of a library: its cleaned-up title (or the library stem) and n."""
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", title.strip()).strip("._")
+    return f"{safe or stem}_{n}"
+
+
+class LigandLibrary:
+    def __init__(self, path: str, format: Optional[str] = None, chunk_size: int = 1000) -> None:
+        """
+        Streaming reader of a multi-molecule SDF or SMILES library.
+
+        Molecules are read one record at a time and handed out in chunks, so
+        memory use does not depend on the size of the file. A byte-offset
+        index (built once and stored next to the library as `<path>.idx.npy`)
+        lets a reader jump straight to molecule N.
+
+        Args:
+            path: Path to the library (.sdf or .smi/.smiles/.txt)
+            format: "sdf" or "smiles", inferred from the extension if None
+            chunk_size: Number of molecules per chunk
+        """
+        if format is None:
+            format = "sdf" if path.lower().endswith((".sdf", ".mol")) else "smiles"
+        if format not in ("sdf", "smiles"):
+            raise ValueError(f"Unsupported library format: {format}")
+
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.stem = os.path.splitext(os.path.basename(path))[0]
+        self._offsets: Optional[np.ndarray] = None
+
+    def __iter__(self) -> Iterator[List[Tuple[str, str]]]:
+        """Yield chunks of (name, record) tuples."""
+        return self.iterChunks()
+
+    def __len__(self) -> int:
+        return len(self.index())
+
+    def iterMolecules(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (name, record) tuples of molecules start..stop
+
+        A record is a mol block for SDF libraries and a SMILES line for SMILES
+        libraries. The name is `<title>_<N>`, N being the record index, so
+        that records sharing a title get distinct output files; characters
+        other than letters, digits, '.', '_' and '-' are replaced by '_'.
+        Records without a title are named `<library>_<N>`.
+
+        Args:
+            start: Index of the first molecule
+            stop: Index after the last molecule, None reads to the end
+        """
+        with open(self.path, "rb") as f:
+            if start > 0:
+                f.seek(int(self.index()[start]))
+
+            n = start
+            record: List[str] = []
+            for raw in f:
+                if stop is not None and n >= stop:
+                    return
+                line = raw.decode("utf-8", errors="ignore")
+
+                if self.format == "smiles":
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    fields = line.split()
+                    yield _moleculeName(fields[1] if len(fields) > 1 else "", self.stem, n), fields[0]
+                    n += 1
+                    continue
+
+                if line.startswith("$$$$"):
+                    title = record[0] if record else ""
+                    yield _moleculeName(title, self.stem, n), "".join(record)
+                    record = []
+                    n += 1
+                else:
+                    record.append(line)
+
+            # Last SDF record without a trailing $$$$
+            if self.format == "sdf" and any(line.strip() for line in record):
+                if stop is None or n < stop:
+                    yield _moleculeName(record[0], self.stem, n), "".join(record)
+
+    def iterChunks(self, start: int = 0, stop: Optional[int] = None) -> Iterator[List[Tuple[str, str]]]:
+        """Yield lists of up to `chunk_size` (name, record) tuples of molecules start..stop."""
+        chunk = []
+        for molecule in self.iterMolecules(start, stop):
+            chunk.append(molecule)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get(self, n: int) -> Tuple[str, str]:
+        """Return molecule N through the byte-offset index."""
+        for molecule in self.iterMolecules(n, n + 1):
+            return molecule
+        raise IndexError(f"Molecule {n} out of range in {self.path}")
+
+    def index(self) -> np.ndarray:
+        """
+        Byte offsets of every molecule, loaded from or saved to `<path>.idx.npy`
+
+        The index is rebuilt when the library file is newer than the index.
+        """
+        if self._offsets is not None:
+            return self._offsets
+
+        index_file = f"{self.path}.idx.npy"
+        if os.path.exists(index_file) and os.path.getmtime(index_file) >= os.path.getmtime(self.path):
+            self._offsets = np.load(index_file)
+            return self._offsets
+
+        offsets = []
+        with open(self.path, "rb") as f:
+            position = 0
+            # Start of the SDF record being read; its title line may be blank
+            record_start: Optional[int] = 0
+            for raw in f:
+                if self.format == "smiles":
+                    stripped = raw.strip()
+                    if stripped and not stripped.startswith(b"#"):
+                        offsets.append(position)
+                elif record_start is not None and raw.strip():
+                    # Indexed once it has content, so blank lines after the
+                    # last $$$$ are not a molecule
+                    offsets.append(record_start)
+                    record_start = None
+                position += len(raw)
+                if self.format == "sdf" and raw.startswith(b"$$$$"):
+                    record_start = position
+
+        self._offsets = np.array(offsets, dtype=np.int64)
+        try:
+            np.save(index_file, self._offsets)
+        except OSError as e:
+            print(f"Could not save library index {index_file}: {str(e)}")
+        return self._offsets
+
+
+def screenLibrary(
+    library: LigandLibrary,
+    receptor: str,
+    output_dir: str,
+    docker: Optional[AutoDock] = None,
+    engine: Optional["DockingEngine"] = None,
+    AlphaFold: bool = True,
+    center: Optional[Tuple[float, float, float]] = None,
+    box_size: Optional[Tuple[int, int, int]] = None,
+    exhaustiveness: int = 32,
+    n_poses: int = 5,
+    prep_workers: Optional[int] = None,
+    max_pending_chunks: int = 4,
+    journal: Optional[CheckpointJournal] = None,
+    sink: Optional[ResultSink] = None,
+    box_from_receptor: bool = False,
+) -> None:
+    """
+    Stream a ligand library through preparation and docking
+
+    Three stages run concurrently: a reader thread parses chunks of the
+    library, a preparation thread turns them into PDBQT strings on a process
+    pool, and the calling thread docks them. Stages are connected by queues
+    holding at most `max_pending_chunks` chunks, so neither the library nor
+    the prepared ligands are ever held in memory as a whole.
+
+    Args:
+        library: Ligand library to screen
+        receptor: Path to prepared receptor (.pdbqt)
+        output_dir: Directory to save docking output
+        docker: AutoDock instance used for docking, a new one if None
+        engine: DockingEngine to dock on worker processes, configured with the
+            same ENGINE_SETTINGS as docker
+        AlphaFold: Use the default AlphaFold box
+        center: Center of the docking box, required if AlphaFold is False
+        box_size: Size of the docking box, required if AlphaFold is False
+        exhaustiveness: Exhaustiveness of the global search
+        n_poses: Number of binding poses to generate
+        prep_workers: Number of ligand preparation processes
+        max_pending_chunks: Capacity of the queues between stages, in chunks
+        journal: Checkpoint journal to resume from
+        sink: Streaming writer for the result rows, defaults to a CSV in output_dir
+        box_from_receptor: Use the box file written next to the prepared receptor
+    """
+    docker = docker if docker is not None else AutoDock()
+    center = docker.default_center if AlphaFold else center
+    box_size = docker.default_box_size if AlphaFold else box_size
+    center, box_size = docker._resolve_box(receptor, center, box_size, box_from_receptor)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if sink is None:
+        sink = ResultSink(os.path.join(output_dir, f"{trimName(receptor)}_docking_results.csv"))
+
+    raw_chunks: queue.Queue = queue.Queue(maxsize=max_pending_chunks)
+    prepared_chunks: queue.Queue = queue.Queue(maxsize=max_pending_chunks)
+    errors: List[BaseException] = []
+
+    def prepare(executor: ProcessPoolExecutor) -> Iterator[List[Tuple[str, str]]]:
+        for chunk in _iterQueue(raw_chunks):
+            items = [(name, record, library.format, None) for name, record in chunk]
+            prepared = []
+            for name, pdbqt_string, error in prepareLigandsParallel(items, executor=executor):
+                if error is not None:
+                    print(f"Error preparing ligand {name}: {error}")
+                else:
+                    prepared.append((name, pdbqt_string))
+            yield prepared
+
+    n_docked = 0
+    with ProcessPoolExecutor(max_workers=prep_workers, initializer=_init_preparator) as executor, sink:
+        stages = [
+            _startStage(library, raw_chunks, errors),
+            _startStage(prepare(executor), prepared_chunks, errors, upstream=raw_chunks),
+        ]
+
+        for prepared in _iterQueue(prepared_chunks):
+            jobs = [
+                DockingJob(
+                    f"{name}.pdbqt",
+                    receptor,
+                    center,
+                    box_size,
+                    exhaustiveness,
+                    n_poses,
+                    output_dir,
+                    ligand_pdbqt=pdbqt_string,
+                )
+                for name, pdbqt_string in prepared
+            ]
+            docker._run_jobs(jobs, engine, journal, sink)
+            sink.flush()
+            n_docked += len(jobs)
+            print(f"Docked {n_docked} ligands from {library.path}")
+
+        for stage in stages:
+            stage.join()
+
+    if errors:
+        raise errors[0]
+    docker._report_map_reuse()
+    print(f"Docking successful: Output saved in {output_dir}")
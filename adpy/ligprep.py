@@ -0,0 +1,154 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Optional, Tuple
+
+try:
+    from rdkit import Chem
+    from rdkit.Chem import AllChem
+    from meeko import MoleculePreparation, PDBQTWriterLegacy
+except ImportError:  # Only needed to prepare ligands in-process
+    Chem = AllChem = MoleculePreparation = PDBQTWriterLegacy = None
+
+# (name, source, kind, target): kind is "file", "sdf" (a mol block) or "smiles";
+# target is the output .pdbqt path, or None to get the PDBQT string back
+LigandItem = Tuple[str, str, str, Optional[str]]
+
+# Per-process meeko preparator, created once by the pool initializer
+_preparator = None
+
+
+def _requireRDKit() -> None:
+    """Raise ImportError if RDKit or meeko is not installed."""
+    if Chem is None or MoleculePreparation is None:
+        raise ImportError("In-process ligand preparation requires rdkit and meeko")
+
+
+def _init_preparator() -> None:
+    """Create the MoleculePreparation object reused by a worker process."""
+    global _preparator
+    _requireRDKit()
+    _preparator = MoleculePreparation()
+
+
+def moleculeFromSource(source: str, kind: str = "file") -> "Chem.Mol":
+    """
+    Build an RDKit molecule from a file, a mol block or a SMILES string
+
+    Args:
+        source: Path to a ligand file, mol block or SMILES, depending on kind
+        kind: "file", "sdf" or "smiles"
+
+    Returns:
+        RDKit molecule with explicit hydrogens
+
+    Raises:
+        ImportError: If rdkit or meeko is not installed
+        ValueError: If the molecule cannot be parsed
+    """
+    _requireRDKit()
+    if kind == "smiles":
+        mol = Chem.MolFromSmiles(source.split()[0])
+    elif kind == "sdf":
+        mol = Chem.MolFromMolBlock(source, removeHs=False)
+    elif source.endswith(".mol2"):
+        mol = Chem.MolFromMol2File(source, removeHs=False)
+    elif source.endswith(".pdb"):
+        mol = Chem.MolFromPDBFile(source, removeHs=False)
+    else:
+        mol = next(iter(Chem.SDMolSupplier(source, removeHs=False)), None)
+
+    if mol is None:
+        raise ValueError(f"Could not parse molecule from {kind}: {source[:80]}")
+    return mol
+
+
+def prepareMolecule(mol: "Chem.Mol", embed_3d: bool = True, seed: int = 0xF00D) -> str:
+    """
+    Prepare an RDKit molecule for docking and return its PDBQT string
+
+    Args:
+        mol: RDKit molecule
+        embed_3d: Add hydrogens and embed a 3D conformer when the molecule has
+            no 3D coordinates (e.g. SMILES or 2D SDF input)
+        seed: Random seed of the conformer embedding
+
+    Returns:
+        PDBQT string of the first molecule setup
+
+    Raises:
+        ImportError: If rdkit or meeko is not installed
+        ValueError: If embedding or preparation fails
+    """
+    _requireRDKit()
+    needs_3d = mol.GetNumConformers() == 0 or not mol.GetConformer().Is3D()
+    if embed_3d and needs_3d:
+        mol = Chem.AddHs(mol)
+        if AllChem.EmbedMolecule(mol, randomSeed=seed) != 0:
+            raise ValueError("3D embedding failed")
+        AllChem.MMFFOptimizeMolecule(mol)
+    elif mol.GetNumAtoms() == mol.GetNumHeavyAtoms():
+        mol = Chem.AddHs(mol, addCoords=True)
+
+    preparator = _preparator if _preparator is not None else MoleculePreparation()
+    setups = preparator.prepare(mol)
+    pdbqt_string, is_ok, error_msg = PDBQTWriterLegacy.write_string(setups[0])
+    if not is_ok:
+        raise ValueError(error_msg)
+    return pdbqt_string
+
+
+def _prepare_item(item: LigandItem) -> Tuple[str, Optional[str], Optional[str]]:
+    """
+    Prepare one ligand in a worker process.
+
+    Returns (name, result, error): result is the written target path, or the
+    PDBQT string if no target was given; error is set if preparation failed.
+    """
+    name, source, kind, target = item
+    try:
+        pdbqt_string = prepareMolecule(moleculeFromSource(source, kind))
+    except Exception as e:
+        return name, None, str(e)
+
+    if target is None:
+        return name, pdbqt_string, None
+
+    if os.path.dirname(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "w") as f:
+        f.write(pdbqt_string)
+    return name, target, None
+
+
+def prepareLigandsParallel(
+    items: Iterable[LigandItem],
+    n_workers: Optional[int] = None,
+    chunksize: int = 32,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Prepare ligands in-process across a pool of worker processes
+
+    Each worker imports RDKit and meeko once and reuses its preparator for
+    every molecule, instead of starting a new interpreter per ligand.
+
+    Args:
+        items: (name, source, kind, target) tuples, see `LigandItem`
+        n_workers: Number of worker processes, defaults to the CPU count
+        chunksize: Number of ligands sent to a worker at once
+        executor: Existing pool (created with `_init_preparator`) to reuse
+            across calls; a new pool is started if None
+
+    Yields:
+        (name, result, error) per ligand, in input order
+
+    Raises:
+        ImportError: If rdkit or meeko is not installed
+    """
+    _requireRDKit()
+    if executor is not None:
+        yield from executor.map(_prepare_item, items, chunksize=chunksize)
+        return
+
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_preparator) as executor:
+        yield from executor.map(_prepare_item, items, chunksize=chunksize)
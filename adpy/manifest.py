@@ -0,0 +1,190 @@
+import os
+import csv
+from typing import Dict, Iterator, List, Optional, Union
+
+import polars as pl
+
+# Optional per-row columns of a job manifest and their types
+ROW_FIELDS = {
+    "center_x": float,
+    "center_y": float,
+    "center_z": float,
+    "size_x": float,
+    "size_y": float,
+    "size_z": float,
+    "exhaustiveness": int,
+    "n_poses": int,
+    "spacing": float,
+    "output_dir": str,
+}
+
+
+class JobManifest:
+    def __init__(
+        self,
+        path: str,
+        format: Optional[str] = None,
+        chunk_size: int = 1000,
+        base_dir: Optional[str] = None,
+    ) -> None:
+        """
+        Streaming reader of a docking job manifest.
+
+        A manifest is a CSV file or Parquet file with one docking job per
+        row: the `ligand` and `receptor` paths (prepared .pdbqt), and
+        optionally the box (center_x/y/z, size_x/y/z), exhaustiveness,
+        n_poses, spacing and output_dir of the row. Empty or missing values
+        fall back to the defaults of the batch. Rows are read in chunks, so
+        the job list never has to be in memory as a whole, and no input
+        directory is ever listed. Pairing and order are exactly the rows of
+        the manifest.
+
+        Args:
+            path: Path to the manifest (.csv or .parquet)
+            format: "csv" or "parquet", inferred from the extension if None
+            chunk_size: Number of rows per chunk
+            base_dir: Directory relative paths are resolved against, defaults
+                to the directory of the manifest
+        """
+        if format is None:
+            format = "parquet" if path.lower().endswith(".parquet") else "csv"
+        if format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported manifest format: {format}")
+
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        self.base_dir = base_dir if base_dir is not None else os.path.dirname(os.path.abspath(path))
+
+    def __iter__(self) -> Iterator[List[Dict[str, Union[str, int, float, None]]]]:
+        """Yield chunks of rows."""
+        return self.iterChunks()
+
+    def iterRows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict[str, Union[str, int, float, None]]]:
+        """
+        Yield the rows start..stop as dicts
+
+        Every row has 'ligand' and 'receptor' (paths resolved against
+        base_dir) and every ROW_FIELDS key, None where the manifest has no
+        value.
+
+        Args:
+            start: Index of the first row
+            stop: Index after the last row, None reads to the end
+
+        Raises:
+            ValueError: If the manifest lacks a ligand or receptor column, or
+                a row lacks a ligand or receptor
+        """
+        for n, raw in enumerate(self._iterRaw(start, stop), start=start):
+            yield self._parseRow(n, raw)
+
+    def iterChunks(self, start: int = 0, stop: Optional[int] = None) -> Iterator[List[Dict[str, Union[str, int, float, None]]]]:
+        """Yield lists of up to `chunk_size` rows of the rows start..stop."""
+        chunk = []
+        for row in self.iterRows(start, stop):
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _iterRaw(self, start: int, stop: Optional[int]) -> Iterator[dict]:
+        """Yield the raw rows start..stop of the file."""
+        if self.format == "csv":
+            with open(self.path, "r", newline="") as f:
+                reader = csv.DictReader(f)
+                self._checkColumns(reader.fieldnames or [])
+                for n, raw in enumerate(reader):
+                    if stop is not None and n >= stop:
+                        return
+                    if n >= start:
+                        yield raw
+            return
+
+        lf = pl.scan_parquet(self.path)
+        self._checkColumns(lf.collect_schema().names())
+        offset = start
+        while stop is None or offset < stop:
+            length = self.chunk_size if stop is None else min(self.chunk_size, stop - offset)
+            # Slices are pushed down to the reader, which skips whole row groups
+            df = lf.slice(offset, length).collect()
+            if df.height == 0:
+                return
+            yield from df.iter_rows(named=True)
+            offset += df.height
+
+    def _checkColumns(self, columns: List[str]) -> None:
+        """Raise if the ligand or receptor column is missing."""
+        missing = [c for c in ("ligand", "receptor") if c not in columns]
+        if missing:
+            raise ValueError(f"Manifest {self.path} lacks the {', '.join(missing)} column(s)")
+
+    def _parseRow(self, n: int, raw: dict) -> Dict[str, Union[str, int, float, None]]:
+        """Type the values of a raw row and resolve its paths."""
+        row: Dict[str, Union[str, int, float, None]] = {}
+        for column in ("ligand", "receptor"):
+            value = raw.get(column)
+            if value is None or str(value).strip() == "":
+                raise ValueError(f"Row {n} of {self.path} has no {column}")
+            row[column] = self._resolve(str(value).strip())
+
+        for column, cast in ROW_FIELDS.items():
+            value = raw.get(column)
+            if value is None or str(value).strip() == "":
+                row[column] = None
+            elif cast is int:
+                row[column] = int(float(value))
+            else:
+                row[column] = cast(value)
+
+        if row["output_dir"] is not None:
+            row["output_dir"] = self._resolve(row["output_dir"])
+        return row
+
+    def _resolve(self, path: str) -> str:
+        """Resolve a path of the manifest against base_dir."""
+        return path if os.path.isabs(path) else os.path.normpath(os.path.join(self.base_dir, path))
+
+
+def _scanPDBQT(directory: str) -> List[str]:
+    """Sorted paths of the prepared (.pdbqt) files of a directory, listed with one os.scandir."""
+    with os.scandir(directory) as it:
+        return sorted(
+            entry.path for entry in it if entry.is_file() and entry.name.endswith(".pdbqt")
+        )
+
+
+def writeManifest(
+    ligand_dir: str,
+    receptor_dir: str,
+    path: str,
+) -> int:
+    """
+    Write an all-against-all manifest of the prepared ligands and receptors of two directories
+
+    Each directory is scanned once with os.scandir. The manifest can then be
+    edited, split or subset and passed to `AutoDock.dockManifest`.
+
+    Args:
+        ligand_dir: Directory of prepared ligands (.pdbqt)
+        receptor_dir: Directory of prepared receptors (.pdbqt)
+        path: Path of the manifest (.csv)
+
+    Returns:
+        Number of rows written
+    """
+    receptors = _scanPDBQT(receptor_dir)
+    ligands = _scanPDBQT(ligand_dir)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["ligand", "receptor"])
+        for receptor in receptors:
+            for ligand in ligands:
+                writer.writerow([os.path.abspath(ligand), os.path.abspath(receptor)])
+    os.replace(tmp_file, path)
+    return len(receptors) * len(ligands)
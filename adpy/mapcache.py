@@ -0,0 +1,141 @@
+import os
+import shutil
+import hashlib
+import uuid
+from typing import List
+
+from vina import Vina
+
+from .utils import fileHash
+
+
+class MapCache:
+    def __init__(self, cache_dir: str = "./.adpy_cache/maps", max_size_gb: float = 10.0) -> None:
+        """
+        On-disk cache of Vina affinity maps.
+
+        Each entry is a directory named after a hash of the receptor PDBQT
+        content, box center, box size, grid spacing and scoring function. The
+        maps inside are written with `Vina.write_maps` and read back with
+        `Vina.load_maps`. Entries are evicted least-recently-used first once
+        the cache grows beyond `max_size_gb`.
+
+        Args:
+            cache_dir: Directory holding the cached maps
+            max_size_gb: Size cap of the cache in gigabytes
+        """
+        self.cache_dir = cache_dir
+        self.max_size = int(max_size_gb * 1024**3)
+        self.map_prefix = "maps"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(
+        self,
+        receptor: str,
+        center: List[float],
+        box_size: List[float],
+        spacing: float,
+        sf_name: str,
+    ) -> str:
+        """
+        Build the cache key of a receptor/box combination.
+
+        Args:
+            receptor (str): Path to the receptor file in PDBQT format.
+            center (List[float]): Coordinates [x, y, z] for the center of the docking box.
+            box_size (List[float]): Dimensions [x, y, z] of the docking box.
+            spacing (float): Grid spacing in Angstrom.
+            sf_name (str): Scoring function name.
+
+        Returns:
+            str: Hex digest identifying the maps.
+        """
+        params = ",".join(
+            [f"{float(c):.4f}" for c in center]
+            + [f"{float(b):.4f}" for b in box_size]
+            + [f"{float(spacing):.4f}", sf_name]
+        )
+        digest = hashlib.sha256()
+        digest.update(fileHash(receptor).encode())
+        digest.update(params.encode())
+        return digest.hexdigest()
+
+    def load(self, v: Vina, key: str) -> bool:
+        """
+        Load cached maps into a Vina object.
+
+        Args:
+            v (Vina): Vina object with the receptor already set.
+            key (str): Cache key from `key()`.
+
+        Returns:
+            bool: True on a cache hit, False if the maps have to be computed.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(entry):
+            self.misses += 1
+            return False
+
+        try:
+            v.load_maps(os.path.join(entry, self.map_prefix))
+        except Exception as e:
+            print(f"Discarding unreadable map cache entry {entry}: {str(e)}")
+            shutil.rmtree(entry, ignore_errors=True)
+            self.misses += 1
+            return False
+
+        # Refresh the entry for LRU eviction
+        os.utime(entry)
+        self.hits += 1
+        return True
+
+    def store(self, v: Vina, key: str) -> None:
+        """
+        Write the maps of a Vina object to the cache.
+
+        The maps are written to a temporary directory first and renamed into
+        place, so concurrent runs never see a partially written entry.
+
+        Args:
+            v (Vina): Vina object with computed maps.
+            key (str): Cache key from `key()`.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry):
+            return
+
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            v.write_maps(os.path.join(tmp_dir, self.map_prefix), overwrite=True)
+            os.rename(tmp_dir, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until the cache fits its size cap."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.is_dir() or entry.name.startswith(".tmp-"):
+                    continue
+                size = sum(
+                    f.stat().st_size for f in os.scandir(entry.path) if f.is_file()
+                )
+                entries.append((entry.stat().st_mtime, size, entry.path))
+                total_size += size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
+            self.evictions += 1
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional
+
+import polars as pl
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peakRSS() -> Optional[float]:
+    """
+    Peak resident set size of the current process in megabytes
+
+    Returns:
+        Peak RSS, or None where the resource module is unavailable
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / 1024**2 if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def _castTimingColumns(df: pl.DataFrame) -> pl.DataFrame:
+    """Give the timing columns their float dtype, also when no row has a value (e.g. all reused)."""
+    return df.with_columns(
+        pl.col(column).cast(pl.Float64)
+        for column in df.columns
+        if column.startswith("time_") or column == "peak_rss_mb"
+    )
+
+
+# Row statuses of jobs that were docked in the run
+DOCKED_STATUSES = ("ok", "retried")
+
+
+class StageTimer:
+    def __init__(self, stages: Iterable[str] = ()) -> None:
+        """
+        Wall-clock timer of the stages of one docking job.
+
+        Time spent in every `stage()` block is added up per stage name and
+        returned as `time_<stage>` result columns, together with the total
+        job time and the peak RSS of the process.
+
+        Args:
+            stages: Stages reported even if they did not run (as 0 s), so
+                that every row of a batch has the same columns
+        """
+        self.stages: Dict[str, float] = dict.fromkeys(stages, 0.0)
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as stage `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def columns(self) -> Dict[str, Optional[float]]:
+        """Result columns: time_<stage> and time_total in seconds, peak_rss_mb."""
+        columns = {f"time_{name}": seconds for name, seconds in self.stages.items()}
+        columns["time_total"] = time.perf_counter() - self._start
+        columns["peak_rss_mb"] = peakRSS()
+        return columns
+
+
+class RunMetrics:
+    def __init__(
+        self,
+        metrics_file: Optional[str] = None,
+        interval: float = 30.0,
+        n_workers: int = 1,
+    ) -> None:
+        """
+        Run-level throughput metrics aggregated from the result rows.
+
+        Rows with `time_*` columns (see `StageTimer`) add to the time split by
+        stage and to worker utilization, i.e. the share of the available
+        worker time spent on jobs. Only docked rows (status "ok", or
+        "retried" after a timeout) count as jobs towards throughput; failed
+        and timed-out rows are counted as failures, and rows with status
+        "reused" (taken from a result store) only by status. With a metrics file, a snapshot is written
+        every `interval` seconds, in Prometheus text format (for a local
+        scraper, e.g. the node exporter's textfile collector) or as JSON if
+        the path ends with .json.
+
+        Args:
+            metrics_file: Path of the periodic metrics file, none if None
+            interval: Seconds between metrics file updates
+            n_workers: Number of workers docking in parallel, set by
+                DockingEngine.run
+        """
+        self.metrics_file = metrics_file
+        self.interval = interval
+        self.n_workers = n_workers
+        self.jobs = 0
+        self.failed = 0
+        self.status: Dict[str, int] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.busy_seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self._start: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start the run clock and the metrics file writer, if not running yet."""
+        if self._start is None:
+            self._start = time.perf_counter()
+        if self.metrics_file is not None and self._writer is None:
+            self._stop.clear()
+            self._writer = threading.Thread(target=self._write_periodically, daemon=True)
+            self._writer.start()
+
+    def observe(self, row: dict) -> None:
+        """Add a finished job's result row."""
+        with self._lock:
+            status = row.get("status", "ok")
+            self.status[status] = self.status.get(status, 0) + 1
+            if status == "reused":
+                return
+            if status in DOCKED_STATUSES:
+                self.jobs += 1
+            else:
+                self.failed += 1
+            for column, value in row.items():
+                if value is None or not column.startswith("time_"):
+                    continue
+                if column == "time_total":
+                    self.busy_seconds += value
+                else:
+                    stage = column[len("time_"):]
+                    self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + value
+            if row.get("peak_rss_mb") is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb, row["peak_rss_mb"])
+
+    def summary(self) -> dict:
+        """
+        Snapshot of the run metrics
+
+        Returns:
+            dict: jobs docked in this run, failed (failed or timed-out jobs),
+            status counts, wall_seconds, ligands_per_hour, stage_seconds,
+            stage_share, worker_utilization and peak_rss_mb
+        """
+        with self._lock:
+            wall = time.perf_counter() - self._start if self._start is not None else 0.0
+            stage_total = sum(self.stage_seconds.values())
+            return {
+                "jobs": self.jobs,
+                "failed": self.failed,
+                "status": dict(self.status),
+                "wall_seconds": wall,
+                "ligands_per_hour": self.jobs / wall * 3600 if wall > 0 else 0.0,
+                "stage_seconds": dict(self.stage_seconds),
+                "stage_share": {
+                    stage: seconds / stage_total if stage_total else 0.0
+                    for stage, seconds in self.stage_seconds.items()
+                },
+                "worker_utilization": (
+                    self.busy_seconds / (wall * self.n_workers) if wall > 0 else 0.0
+                ),
+                "peak_rss_mb": self.peak_rss_mb,
+            }
+
+    def report(self) -> dict:
+        """Print the run summary (and update the metrics file) and return it."""
+        summary = self.summary()
+        print(
+            f"Run metrics: {summary['jobs']} jobs in {summary['wall_seconds']:.1f} s "
+            f"({summary['failed']} failed), "
+            f"{summary['ligands_per_hour']:.1f} ligands/hour, "
+            f"worker utilization {summary['worker_utilization']:.1%}, "
+            f"peak RSS {summary['peak_rss_mb']:.0f} MB"
+        )
+        if summary["stage_seconds"]:
+            print(
+                "Time by stage: "
+                + ", ".join(
+                    f"{stage} {seconds:.1f} s ({summary['stage_share'][stage]:.1%})"
+                    for stage, seconds in sorted(
+                        summary["stage_seconds"].items(), key=lambda item: -item[1]
+                    )
+                )
+            )
+        if self.metrics_file is not None:
+            self.write()
+        return summary
+
+    def close(self) -> None:
+        """Stop the metrics file writer after a final update."""
+        if self._writer is not None:
+            self._stop.set()
+            self._writer.join()
+            self._writer = None
+        if self.metrics_file is not None:
+            self.write()
+
+    def write(self) -> None:
+        """Write a snapshot to the metrics file, replacing it atomically."""
+        summary = self.summary()
+        if self.metrics_file.endswith(".json"):
+            text = json.dumps(summary, indent=2)
+        else:
+            lines = [
+                "# HELP adpy_jobs_total Docking jobs finished, by status.",
+                "# TYPE adpy_jobs_total counter",
+            ]
+            for status, count in sorted(summary["status"].items()):
+                lines.append(f'adpy_jobs_total{{status="{status}"}} {count}')
+            lines += [
+                "# HELP adpy_jobs_failed_total Docking jobs that failed or timed out.",
+                "# TYPE adpy_jobs_failed_total counter",
+                f"adpy_jobs_failed_total {summary['failed']}",
+                "# TYPE adpy_stage_seconds_total counter",
+            ]
+            for stage, seconds in sorted(summary["stage_seconds"].items()):
+                lines.append(f'adpy_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}')
+            lines += [
+                "# TYPE adpy_ligands_per_hour gauge",
+                f"adpy_ligands_per_hour {summary['ligands_per_hour']:.6f}",
+                "# TYPE adpy_worker_utilization gauge",
+                f"adpy_worker_utilization {summary['worker_utilization']:.6f}",
+                "# TYPE adpy_peak_rss_megabytes gauge",
+                f"adpy_peak_rss_megabytes {summary['peak_rss_mb']:.3f}",
+                "# TYPE adpy_wall_seconds gauge",
+                f"adpy_wall_seconds {summary['wall_seconds']:.3f}",
+            ]
+            text = "\n".join(lines) + "\n"
+
+        if os.path.dirname(self.metrics_file):
+            os.makedirs(os.path.dirname(self.metrics_file), exist_ok=True)
+        tmp_file = f"{self.metrics_file}.tmp"
+        with open(tmp_file, "w") as f:
+            f.write(text)
+        os.replace(tmp_file, self.metrics_file)
+
+    def _write_periodically(self) -> None:
+        """Metrics file writer thread."""
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Could not write metrics file {self.metrics_file}: {str(e)}")
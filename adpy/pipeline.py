@@ -0,0 +1,87 @@
+import queue
+import threading
+from typing import Any, Iterable, Iterator, List, Optional
+
+# Sentinel closing a pipeline queue
+_DONE = object()
+
+
+def _runStage(
+    items: Iterable,
+    out: queue.Queue,
+    errors: List[BaseException],
+    upstream: Optional[queue.Queue] = None,
+) -> None:
+    """Put every item on `out`, then close it with _DONE; errors are collected in `errors`."""
+    try:
+        for item in items:
+            out.put(item)
+    except BaseException as e:
+        errors.append(e)
+        # Unblock the stage feeding this one so it can finish
+        if upstream is not None:
+            while upstream.get() is not _DONE:
+                pass
+    finally:
+        out.put(_DONE)
+
+
+def _startStage(
+    items: Iterable,
+    out: queue.Queue,
+    errors: List[BaseException],
+    upstream: Optional[queue.Queue] = None,
+) -> threading.Thread:
+    """
+    Run one pipeline stage in a daemon thread.
+
+    The stage consumes `items` (typically a generator reading `upstream`
+    through `_iterQueue`) and puts them on the bounded queue `out`, closing
+    it with `_DONE` when done or failed, so the stages of a pipeline never
+    hold more than the queue capacities in memory.
+
+    Args:
+        items: Items the stage produces
+        out: Queue the items are put on
+        errors: List the error of a failed stage is appended to
+        upstream: Queue `items` reads from, drained if the stage fails
+
+    Returns:
+        threading.Thread: The started stage thread
+    """
+    thread = threading.Thread(target=_runStage, args=(items, out, errors, upstream), daemon=True)
+    thread.start()
+    return thread
+
+
+def _iterQueue(q: queue.Queue, producers: int = 1) -> Iterator[Any]:
+    """Yield the items of a pipeline queue until all of its `producers` stages are done."""
+    while producers:
+        item = q.get()
+        if item is _DONE:
+            producers -= 1
+        else:
+            yield item
+
+
+def _iterBatches(q: queue.Queue, producers: int = 1) -> Iterator[List[Any]]:
+    """
+    Yield lists of the items of a pipeline queue until all of its `producers` stages are done.
+
+    Each list holds everything that became available while the consumer
+    was busy with the previous one, so work can be batched.
+    """
+    while producers:
+        batch = []
+        item = q.get()
+        while True:
+            if item is _DONE:
+                producers -= 1
+            else:
+                batch.append(item)
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                break
+        if batch:
+            yield batch
@@ -0,0 +1,257 @@
+import os
+from typing import Dict, List, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np
+import polars as pl
+
+if TYPE_CHECKING:
+    from .posestore import PoseArchive
+
+# AutoDock atom types of hydrogens, left out of RMSD calculations
+HYDROGEN_TYPES = ("H", "HD", "HS")
+
+
+def readPoses(source: str, is_string: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Read every pose of a docking output into contiguous NumPy arrays
+
+    Coordinates are cut from the fixed-width ATOM/HETATM columns of all
+    models at once and converted in a single NumPy call.
+
+    Args:
+        source: Path to a PDBQT file, or the PDBQT text if is_string is True
+        is_string: Treat source as PDBQT text instead of a path
+
+    Returns:
+        (coords, atom_types, affinities): coords is (n_poses, n_atoms, 3)
+        float64, atom_types the AutoDock type of each of the n_atoms atoms,
+        and affinities the REMARK VINA RESULT affinity of every pose (NaN
+        if missing)
+
+    Raises:
+        ValueError: If the models do not all have the same atoms
+
+    Example:
+        coords, types, _ = readPoses('lig_rec.pdbqt'); coords.shape -> (9, 31, 3)
+    """
+    if is_string:
+        lines = source.splitlines()
+    else:
+        with open(source, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+
+    atom_lines = []
+    atoms_per_model = []
+    affinities = []
+    n_atoms = 0
+    in_model = False
+    for line in lines:
+        if line.startswith(("ATOM", "HETATM")):
+            atom_lines.append(line)
+            n_atoms += 1
+        elif line.startswith("MODEL"):
+            in_model = True
+            n_atoms = 0
+            affinities.append(np.nan)
+        elif line.startswith("ENDMDL"):
+            atoms_per_model.append(n_atoms)
+            in_model = False
+        elif line.startswith("REMARK VINA RESULT:") and affinities:
+            try:
+                affinities[-1] = float(line.split()[3])
+            except (IndexError, ValueError):
+                pass
+
+    if in_model or not atoms_per_model:
+        # Last model without ENDMDL, or a single pose without MODEL records
+        atoms_per_model.append(n_atoms)
+        if not affinities:
+            affinities.append(np.nan)
+
+    if len(set(atoms_per_model)) > 1:
+        raise ValueError(f"Poses have different atom counts: {sorted(set(atoms_per_model))}")
+    n_poses, n_atoms = len(atoms_per_model), atoms_per_model[0]
+
+    # Columns 31-54 hold x, y and z as three 8-character fields
+    buffer = "".join(line[30:54].ljust(24) for line in atom_lines).encode("ascii", "replace")
+    coords = np.frombuffer(buffer, dtype="S8").astype(np.float64).reshape(n_poses, n_atoms, 3)
+    atom_types = np.array(
+        [line[77:].strip() or line.split()[-1] for line in atom_lines[:n_atoms]], dtype=object
+    )
+    return coords, atom_types, np.array(affinities, dtype=np.float64)
+
+
+def pairwiseRMSD(coords: np.ndarray, other: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    RMSD between every pair of poses, without superposition
+
+    Docked poses share the receptor frame, so the in-place RMSD is the
+    relevant distance. It is computed from the Gram matrix of the flattened
+    poses, which needs O(n^2) memory instead of O(n^2 * n_atoms).
+
+    Args:
+        coords: Poses of shape (n_poses, n_atoms, 3)
+        other: Second set of poses (m_poses, n_atoms, 3), defaults to coords
+
+    Returns:
+        RMSD matrix of shape (n_poses, m_poses)
+    """
+    a = coords.reshape(len(coords), -1)
+    b = a if other is None else other.reshape(len(other), -1)
+    n_atoms = coords.shape[1]
+    sq_a = np.einsum("ij,ij->i", a, a)
+    sq_b = sq_a if other is None else np.einsum("ij,ij->i", b, b)
+    squared = sq_a[:, None] + sq_b[None, :] - 2.0 * (a @ b.T)
+    return np.sqrt(np.maximum(squared, 0.0) / max(n_atoms, 1))
+
+
+def clusterPoses(
+    rmsd: np.ndarray,
+    cutoff: float = 2.0,
+    affinities: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Greedy leader clustering of poses by RMSD
+
+    The best-scoring unassigned pose becomes a cluster leader and takes every
+    unassigned pose within `cutoff` of it; this repeats until all poses are
+    assigned. Each step is vectorized over the poses.
+
+    Args:
+        rmsd: Square RMSD matrix from `pairwiseRMSD`
+        cutoff: RMSD cutoff in Angstrom
+        affinities: Pose scores (lower is better), input order is used if None
+
+    Returns:
+        Cluster label of every pose; clusters are numbered 1, 2, ... in
+        order of their leader's score
+    """
+    n = len(rmsd)
+    order = np.arange(n) if affinities is None else np.argsort(affinities, kind="stable")
+    labels = np.zeros(n, dtype=np.int64)
+    cluster = 0
+    for leader in order:
+        if labels[leader]:
+            continue
+        cluster += 1
+        labels[(labels == 0) & (rmsd[leader] <= cutoff)] = cluster
+    return labels
+
+
+def heavyAtomMask(atom_types: np.ndarray) -> np.ndarray:
+    """Boolean mask of the non-hydrogen atoms."""
+    return ~np.isin(atom_types.astype(str), HYDROGEN_TYPES)
+
+
+def poseClusterColumns(
+    coords: np.ndarray,
+    atom_types: np.ndarray,
+    affinities: np.ndarray,
+    n_poses: int,
+    cutoff: float = 2.0,
+) -> Dict[str, Optional[float]]:
+    """
+    Cluster the poses of one docking run into flat result columns
+
+    Args:
+        coords: Poses from `readPoses`
+        atom_types: Atom types from `readPoses`
+        affinities: Pose affinities from `readPoses`
+        n_poses: Number of poses requested, columns are padded to it
+        cutoff: RMSD cutoff in Angstrom
+
+    Returns:
+        n_clusters, top_cluster_size (poses in the cluster of the best pose)
+        and cluster_k (cluster label of pose k, None if missing)
+    """
+    heavy = heavyAtomMask(atom_types)
+    labels = clusterPoses(pairwiseRMSD(coords[:, heavy]), cutoff, affinities)
+
+    columns = {
+        "n_clusters": int(labels.max()) if len(labels) else 0,
+        "top_cluster_size": int((labels == labels[0]).sum()) if len(labels) else 0,
+    }
+    for k in range(n_poses):
+        columns[f"cluster_{k + 1}"] = int(labels[k]) if k < len(labels) else None
+    return columns
+
+
+def clusterDockingResults(
+    df: pl.DataFrame,
+    output_dir: Optional[str] = None,
+    pose_archive: Optional["PoseArchive"] = None,
+    cutoff: float = 2.0,
+    across_receptors: bool = False,
+) -> pl.DataFrame:
+    """
+    Add pose clustering columns to a docking results frame
+
+    The poses of every row are loaded from `{output_dir}/{ligand}_{receptor}.pdbqt`
+    or from a pose archive. Per row, the poses of the run are clustered
+    (n_clusters, top_cluster_size, cluster_k). With `across_receptors`, the
+    best poses of each ligand against all receptors are clustered too
+    (receptor_cluster, receptor_cluster_size), which is meaningful when the
+    receptors share one frame, e.g. conformers of one protein.
+
+    Args:
+        df: Docking results with ligand and receptor columns
+        output_dir: Directory of the docking output files
+        pose_archive: Pose archive holding the poses instead of files
+        cutoff: RMSD cutoff in Angstrom
+        across_receptors: Also cluster each ligand's best poses across receptors
+
+    Returns:
+        df with the clustering columns added; rows whose poses cannot be read
+        get nulls
+    """
+    if output_dir is None and pose_archive is None:
+        raise ValueError("output_dir or pose_archive is required to read the poses")
+
+    rows: List[dict] = []
+    best_poses: Dict[str, List[Tuple[int, np.ndarray, np.ndarray, float]]] = {}
+    max_poses = 0
+    for i, (ligand, receptor) in enumerate(df.select("ligand", "receptor").iter_rows()):
+        try:
+            if pose_archive is not None:
+                poses = readPoses(pose_archive.get(ligand, receptor), is_string=True)
+            else:
+                poses = readPoses(os.path.join(output_dir, f"{ligand}_{receptor}.pdbqt"))
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Cannot read poses of {ligand} - {receptor}: {str(e)}")
+            rows.append({})
+            continue
+
+        coords, atom_types, affinities = poses
+        max_poses = max(max_poses, len(coords))
+        rows.append(poseClusterColumns(coords, atom_types, affinities, len(coords), cutoff))
+        if across_receptors:
+            heavy = heavyAtomMask(atom_types)
+            best_poses.setdefault(ligand, []).append(
+                (i, coords[0][heavy], atom_types[heavy], affinities[0])
+            )
+
+    schema = {"n_clusters": pl.Int64, "top_cluster_size": pl.Int64}
+    for k in range(1, max_poses + 1):
+        schema[f"cluster_{k}"] = pl.Int64
+
+    if across_receptors:
+        schema["receptor_cluster"] = pl.Int64
+        schema["receptor_cluster_size"] = pl.Int64
+        for entries in best_poses.values():
+            n_atoms = {len(coords) for _, coords, _, _ in entries}
+            if len(n_atoms) > 1:
+                # Differently prepared copies of the ligand cannot be compared
+                continue
+            coords = np.stack([coords for _, coords, _, _ in entries])
+            affinities = np.array([affinity for _, _, _, affinity in entries])
+            labels = clusterPoses(pairwiseRMSD(coords), cutoff, affinities)
+            sizes = np.bincount(labels)
+            for (i, _, _, _), label in zip(entries, labels):
+                rows[i]["receptor_cluster"] = int(label)
+                rows[i]["receptor_cluster_size"] = int(sizes[label])
+
+    df_clusters = pl.DataFrame(
+        [{column: row.get(column) for column in schema} for row in rows],
+        schema=schema,
+    )
+    return pl.concat([df.drop([c for c in schema if c in df.columns]), df_clusters], how="horizontal")
@@ -0,0 +1,226 @@
+import os
+import glob
+import socket
+from typing import List, Optional, Tuple
+
+import polars as pl
+
+
+class PoseArchive:
+    def __init__(self, root: str = "./.adpy_poses", max_shard_mb: float = 1024.0) -> None:
+        """
+        Sharded archive of docked poses.
+
+        Instead of one PDBQT file per ligand-receptor pair, poses are appended
+        to a few large shard files. Every process writes its own shards
+        (`poses-<host>-<pid>-<n>.pdbqt`, rolled over at `max_shard_mb`), so
+        concurrent workers never share a file, and each shard has a
+        tab-separated index (`<shard>.idx`) of the byte offset and length of
+        every pose for random access by (ligand, receptor, pose). The data is
+        written before its index line, so an interrupted run never indexes a
+        partial pose.
+
+        Args:
+            root: Directory of the archive
+            max_shard_mb: Size in megabytes after which a writer starts a new shard
+        """
+        self.root = root
+        self.max_shard_size = int(max_shard_mb * 1024**2)
+        self._shard: Optional[str] = None
+        self._data_file = None
+        self._index_file = None
+        self._shard_size = 0
+        self._shard_count = 0
+        self._index_df: Optional[pl.DataFrame] = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def append(self, ligand: str, receptor: str, pose_string: str) -> None:
+        """
+        Add the docked poses of a ligand-receptor pair.
+
+        Args:
+            ligand (str): Ligand name.
+            receptor (str): Receptor name.
+            pose_string (str): Poses as written by Vina, one MODEL per pose.
+        """
+        data = pose_string.encode("utf-8")
+        self._writer_shard(len(data))
+        offset = self._shard_size
+
+        index_lines = []
+        for pose, (start, length) in enumerate(_splitModels(data), start=1):
+            index_lines.append(f"{ligand}\t{receptor}\t{pose}\t{offset + start}\t{length}\n")
+
+        self._data_file.write(data)
+        self._data_file.flush()
+        self._index_file.writelines(index_lines)
+        self._index_file.flush()
+        self._shard_size += len(data)
+        self._index_df = None
+
+    def index(self) -> pl.DataFrame:
+        """
+        Offset index of every archived pose
+
+        Returns:
+            pl.DataFrame: Columns shard, ligand, receptor, pose, offset and
+            length. The latest entry wins if a pair was archived twice.
+        """
+        if self._index_df is not None:
+            return self._index_df
+
+        schema = {
+            "ligand": pl.Utf8,
+            "receptor": pl.Utf8,
+            "pose": pl.Int64,
+            "offset": pl.Int64,
+            "length": pl.Int64,
+        }
+        frames = []
+        for index_file in sorted(glob.glob(os.path.join(self.root, "poses-*.pdbqt.idx"))):
+            if os.path.getsize(index_file) == 0:
+                continue
+            frames.append(
+                pl.read_csv(
+                    index_file,
+                    separator="\t",
+                    has_header=False,
+                    new_columns=list(schema),
+                    schema_overrides=schema,
+                    quote_char=None,
+                ).with_columns(
+                    pl.lit(index_file[: -len(".idx")]).alias("shard"),
+                    pl.lit(os.path.getmtime(index_file)).alias("_mtime"),
+                )
+            )
+
+        if not frames:
+            self._index_df = pl.DataFrame(schema={"shard": pl.Utf8, **schema})
+            return self._index_df
+
+        # Keep the most recently written copy of every pose
+        self._index_df = (
+            pl.concat(frames)
+            .with_row_index("_order")
+            .sort(["_mtime", "_order"])
+            .unique(subset=["ligand", "receptor", "pose"], keep="last", maintain_order=True)
+            .select("shard", *schema)
+            .sort(["receptor", "ligand", "pose"])
+        )
+        return self._index_df
+
+    def get(self, ligand: str, receptor: str, pose: Optional[int] = None) -> str:
+        """
+        Read archived poses of a ligand-receptor pair.
+
+        Args:
+            ligand (str): Ligand name.
+            receptor (str): Receptor name.
+            pose (Optional[int]): Pose number (1 is the best pose), all poses if None.
+
+        Returns:
+            str: The poses in PDBQT format.
+
+        Raises:
+            KeyError: If the pair (or pose) is not in the archive.
+        """
+        entries = self.index().filter(
+            (pl.col("ligand") == ligand) & (pl.col("receptor") == receptor)
+        )
+        if pose is not None:
+            entries = entries.filter(pl.col("pose") == pose)
+        if entries.height == 0:
+            raise KeyError(f"No archived poses for {ligand} - {receptor} (pose {pose})")
+
+        chunks = []
+        for shard, offset, length in entries.select("shard", "offset", "length").iter_rows():
+            with open(shard, "rb") as f:
+                f.seek(offset)
+                chunks.append(f.read(length))
+        return b"".join(chunks).decode("utf-8")
+
+    def export(
+        self,
+        ligand: str,
+        receptor: str,
+        output_dir: str,
+        pose: Optional[int] = None,
+    ) -> str:
+        """
+        Write archived poses to a regular `{ligand}_{receptor}.pdbqt` file.
+
+        Args:
+            ligand (str): Ligand name.
+            receptor (str): Receptor name.
+            output_dir (str): Directory to write the file to.
+            pose (Optional[int]): Pose number, all poses if None.
+
+        Returns:
+            str: Path of the exported file.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        suffix = f"_pose{pose}" if pose is not None else ""
+        output_file = os.path.join(output_dir, f"{ligand}_{receptor}{suffix}.pdbqt")
+        with open(output_file, "w") as f:
+            f.write(self.get(ligand, receptor, pose))
+        return output_file
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """Return every archived (ligand, receptor) pair."""
+        return self.index().select("ligand", "receptor").unique(maintain_order=True).rows()
+
+    def _writer_shard(self, size: int) -> str:
+        """Return this process's current shard, starting a new one when it is full."""
+        if self._shard is None or (
+            self._shard_size > 0 and self._shard_size + size > self.max_shard_size
+        ):
+            self.close()
+            prefix = f"poses-{socket.gethostname()}-{os.getpid()}"
+            while True:
+                self._shard = os.path.join(self.root, f"{prefix}-{self._shard_count:04d}.pdbqt")
+                self._shard_count += 1
+                if not os.path.exists(self._shard):
+                    break
+            # Shard files stay open while they are written to, so appending
+            # a pose costs no metadata operations on the filesystem
+            self._data_file = open(self._shard, "ab")
+            self._index_file = open(f"{self._shard}.idx", "a")
+            self._shard_size = 0
+        return self._shard
+
+    def close(self) -> None:
+        """Close the shard this process is writing to."""
+        for f in (self._data_file, self._index_file):
+            if f is not None:
+                f.close()
+        self._shard = None
+        self._data_file = None
+        self._index_file = None
+
+    def __getstate__(self) -> dict:
+        # A copy in another process writes its own shards
+        state = self.__dict__.copy()
+        state["_shard"] = None
+        state["_data_file"] = None
+        state["_index_file"] = None
+        state["_shard_size"] = 0
+        state["_index_df"] = None
+        return state
+
+
+def _splitModels(data: bytes) -> List[Tuple[int, int]]:
+    """(start, length) of every MODEL ... ENDMDL block of a pose string."""
+    blocks = []
+    start = None
+    position = 0
+    for line in data.splitlines(keepends=True):
+        if line.startswith(b"MODEL"):
+            start = position
+        position += len(line)
+        if line.startswith(b"ENDMDL") and start is not None:
+            blocks.append((start, position - start))
+            start = None
+    if not blocks and data:
+        # A single pose written without MODEL records
+        blocks.append((0, len(data)))
+    return blocks
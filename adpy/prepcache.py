@@ -0,0 +1,153 @@
+import os
+import json
+import shutil
+import hashlib
+import uuid
+from functools import lru_cache
+from importlib import metadata
+from typing import Dict, Optional
+
+
+@lru_cache(maxsize=None)
+def toolVersion(package: str = "meeko") -> str:
+    """
+    Version of the package providing the preparation tools
+
+    Args:
+        package: Distribution name, e.g. "meeko"
+
+    Returns:
+        Installed version, or "unknown" if the package is not installed
+    """
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class PrepCache:
+    def __init__(self, cache_dir: str = "./.adpy_cache/prepared") -> None:
+        """
+        Content-addressed cache of prepared ligands and receptors.
+
+        An entry is keyed by the SHA-256 of the input file, the preparation
+        tool and its version, and every option that changes the output (for
+        receptors including box_size and box_center). Repeat preparations of
+        the same input with the same options are served from the cache.
+
+        Args:
+            cache_dir: Directory holding the cached structures
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, query: str, tool: str, options: Optional[dict] = None) -> str:
+        """
+        Build the cache key of a preparation.
+
+        Args:
+            query (str): Path to the input structure.
+            tool (str): Name of the preparation tool, including its version.
+            options (Optional[dict]): Options passed to the tool.
+
+        Returns:
+            str: Hex digest identifying the prepared structure.
+        """
+        digest = hashlib.sha256()
+        with open(query, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(tool.encode())
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def fetch(self, key: str, targets: Dict[str, str]) -> bool:
+        """
+        Copy the cached files of an entry to their targets.
+
+        Args:
+            key (str): Cache key from `key()`.
+            targets (Dict[str, str]): Name of each cached file -> target path.
+
+        Returns:
+            bool: True on a cache hit, False if the structure has to be prepared.
+        """
+        entry = os.path.join(self.cache_dir, key)
+        if not all(os.path.exists(os.path.join(entry, name)) for name in targets):
+            self.misses += 1
+            return False
+
+        for name, target in targets.items():
+            if os.path.dirname(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(os.path.join(entry, name), target)
+        self.hits += 1
+        return True
+
+    def fetch_text(self, key: str, name: str) -> Optional[str]:
+        """Return the content of a cached file, or None on a cache miss."""
+        path = os.path.join(self.cache_dir, key, name)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with open(path, "r") as f:
+            return f.read()
+
+    def store(self, key: str, sources: Dict[str, str]) -> None:
+        """
+        Add prepared files to the cache.
+
+        The files are copied to a temporary directory first and renamed into
+        place, so concurrent runs never see a partially written entry.
+
+        Args:
+            key (str): Cache key from `key()`.
+            sources (Dict[str, str]): Name of each cached file -> prepared file.
+        """
+        if not all(os.path.exists(source) for source in sources.values()):
+            return
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry):
+            return
+
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            for name, source in sources.items():
+                shutil.copyfile(source, os.path.join(tmp_dir, name))
+            os.rename(tmp_dir, entry)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def store_text(self, key: str, name: str, text: str) -> None:
+        """Add a prepared structure given as a string to the cache."""
+        entry = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry):
+            return
+
+        tmp_dir = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        try:
+            with open(os.path.join(tmp_dir, name), "w") as f:
+                f.write(text)
+            os.rename(tmp_dir, entry)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> None:
+        """Print the cache hit-rate statistics."""
+        print(
+            f"Preparation cache hits: {self.hits}, misses: {self.misses}, "
+            f"hit rate: {self.hit_rate:.1%}"
+        )
@@ -0,0 +1,178 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+from typing import Optional
+
+from .jobs import DockingJob
+from .utils import fileHash
+
+
+class ResultStore:
+    def __init__(self, path: str = "./.adpy_cache/results.sqlite") -> None:
+        """
+        SQLite store of finished docking results.
+
+        A result is keyed by the content of the ligand and receptor, the box,
+        the docking parameters, the scoring function, the seed, the
+        diagnostics setting and the pose clustering cutoff, and holds the
+        result row together with the path of the docked poses. Jobs found in
+        the store are not docked again; with a fixed seed the reused result
+        is exactly what re-docking would produce. Several processes can share
+        one store.
+
+        Poses written to a PoseArchive are not stored: a reused result is
+        not appended to the archive again, so its poses are only in the
+        archive of the run that docked it.
+
+        Args:
+            path: Path of the SQLite database
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection of this process, opened on first use."""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=60.0)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, ligand TEXT, receptor TEXT, params TEXT, "
+                "binding_affinity REAL, pose_file TEXT, row TEXT)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def key(
+        self,
+        job: DockingJob,
+        spacing: float,
+        sf_name: str,
+        seed: int,
+        cluster_rmsd: Optional[float] = None,
+        diagnostics: bool = False,
+    ) -> str:
+        """
+        Build the store key of a fully specified job.
+
+        Args:
+            job (DockingJob): Job to dock.
+            spacing (float): Grid spacing the job is docked with.
+            sf_name (str): Scoring function name.
+            seed (int): Random seed of the Vina object.
+            cluster_rmsd (Optional[float]): RMSD cutoff the poses are clustered
+                with, None if they are not clustered.
+            diagnostics (bool): Whether the result has the diagnostic scores.
+
+        Returns:
+            str: Hex digest identifying the result.
+        """
+        if job.ligand_pdbqt is not None:
+            ligand_hash = hashlib.sha256(job.ligand_pdbqt.encode()).hexdigest()
+        else:
+            ligand_hash = fileHash(job.ligand)
+
+        params = ",".join(
+            [f"{float(c):.4f}" for c in job.center]
+            + [f"{float(b):.4f}" for b in job.box_size]
+            + [str(job.exhaustiveness), str(job.n_poses), f"{float(spacing):.4f}"]
+            + [sf_name, str(seed)]
+        )
+        # Left out when unset, so stores of plain runs keep their keys
+        if cluster_rmsd is not None:
+            params += f",cluster_rmsd={float(cluster_rmsd):.4f}"
+        if diagnostics:
+            params += ",diagnostics"
+        digest = hashlib.sha256()
+        digest.update(ligand_hash.encode())
+        digest.update(fileHash(job.receptor).encode())
+        digest.update(params.encode())
+        return digest.hexdigest()
+
+    def lookup(self, key: str, pose_file: Optional[str]) -> Optional[dict]:
+        """
+        Return the stored result row of a job.
+
+        The stored poses are copied to `pose_file` if the job writes its
+        output somewhere else. Results whose poses have gone missing count
+        as a miss.
+
+        Args:
+            key (str): Store key from `key()`.
+            pose_file (Optional[str]): Path the job writes its docked poses to,
+                None if the poses go to a pose archive.
+
+        Returns:
+            Optional[dict]: Result row, or None if the job has to be docked.
+        """
+        found = self.conn.execute(
+            "SELECT pose_file, row FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if found is None or (
+            pose_file is not None
+            and (found[0] is None or not os.path.exists(found[0]))
+        ):
+            self.misses += 1
+            return None
+
+        stored_pose_file, row = found
+        if pose_file is not None and os.path.abspath(stored_pose_file) != os.path.abspath(pose_file):
+            if os.path.dirname(pose_file):
+                os.makedirs(os.path.dirname(pose_file), exist_ok=True)
+            shutil.copyfile(stored_pose_file, pose_file)
+        self.hits += 1
+        return json.loads(row)
+
+    def record(self, key: str, job: DockingJob, row: dict, pose_file: Optional[str]) -> None:
+        """
+        Add the result of a docked job to the store.
+
+        Args:
+            key (str): Store key from `key()`.
+            job (DockingJob): Job that was docked.
+            row (dict): Result row of the job.
+            pose_file (Optional[str]): Path of the docked poses, None if they
+                were written to a pose archive.
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    job.ligand,
+                    job.receptor,
+                    json.dumps(job.params),
+                    row.get("binding_affinity"),
+                    os.path.abspath(pose_file) if pose_file is not None else None,
+                    json.dumps(row),
+                ),
+            )
+
+    def close(self) -> None:
+        """Close the connection of this process."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def report(self) -> None:
+        """Print the store hit statistics."""
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        print(
+            f"Result store hits: {self.hits}, misses: {self.misses}, "
+            f"hit rate: {hit_rate:.1%}"
+        )
+
+    def __getstate__(self) -> dict:
+        # Connections cannot be pickled; worker processes open their own
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        return state
+
@@ -0,0 +1,164 @@
+import heapq
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from .jobs import DockingJob
+
+
+def estimateLigandCost(ligand: str, pdbqt_string: Optional[str] = None) -> float:
+    """
+    Estimate the relative docking cost of a prepared ligand.
+
+    Vina runs about 70 * 3 * (50 + heavy atoms) / 2 Monte Carlo steps per
+    search, and every step costs time roughly proportional to the number of
+    heavy atoms and torsions being moved. The product of both terms is used
+    as a unitless cost; `ReceptorMajorScheduler` calibrates it to seconds.
+
+    Args:
+        ligand: Path to prepared ligand (.pdbqt)
+        pdbqt_string: Prepared ligand as a PDBQT string, read instead of the file
+
+    Returns:
+        Relative cost of docking the ligand
+    """
+    if pdbqt_string is not None:
+        return _costFromLines(pdbqt_string.splitlines())
+    with open(ligand, "r", encoding="utf-8", errors="ignore") as f:
+        return _costFromLines(f)
+
+
+def _costFromLines(lines: Iterable[str]) -> float:
+    """Cost estimate of a ligand from its PDBQT lines."""
+    heavy_atoms = 0
+    torsions = 0
+    for line in lines:
+        if line.startswith(("ATOM", "HETATM")):
+            fields = line.split()
+            if fields and fields[-1] not in ("H", "HD", "HS"):
+                heavy_atoms += 1
+        elif line.startswith("TORSDOF"):
+            try:
+                torsions = int(line.split()[1])
+            except (IndexError, ValueError):
+                pass
+
+    return (50 + heavy_atoms) * (heavy_atoms + 2 * torsions) / 1000.0
+
+
+class ReceptorMajorScheduler:
+    def __init__(self, seconds_per_unit: Optional[float] = None) -> None:
+        """
+        Group docking jobs by receptor and box and order them for a worker pool.
+
+        Jobs sharing a receptor and box are kept together so that each worker
+        finishes a receptor's ligands before moving on and keeps its maps warm.
+        A group is only split across workers when there are fewer groups than
+        workers. Within a chunk ligands run longest-first, and chunks are
+        submitted longest-first, which cuts tail latency.
+
+        Args:
+            seconds_per_unit: Seconds per unit of `estimateLigandCost`, used to
+                report the predicted makespan in seconds. Calibrated from the
+                measured job times after every run.
+        """
+        self.seconds_per_unit = seconds_per_unit
+        self.last_report: Dict[str, float] = {}
+        self._costs: Dict[str, float] = {}
+
+    def cost(self, job: DockingJob) -> float:
+        """Return the estimated cost of a job, memoized per ligand file."""
+        if job.ligand not in self._costs:
+            self._costs[job.ligand] = estimateLigandCost(job.ligand, job.ligand_pdbqt)
+        return self._costs[job.ligand]
+
+    def plan(self, jobs: List[DockingJob], n_workers: int) -> List[List[int]]:
+        """
+        Split jobs into receptor-major chunks.
+
+        Args:
+            jobs (List[DockingJob]): Jobs to schedule.
+            n_workers (int): Number of workers the chunks will run on.
+
+        Returns:
+            List[List[int]]: Chunks of job indices, in submission order.
+        """
+        groups = OrderedDict()
+        for index, job in enumerate(jobs):
+            groups.setdefault(job.map_key, []).append(index)
+
+        costs = [self.cost(job) for job in jobs]
+        total_cost = sum(costs) or 1.0
+
+        chunks = []
+        for indices in groups.values():
+            indices.sort(key=lambda i: costs[i], reverse=True)
+            group_cost = sum(costs[i] for i in indices)
+
+            # Share of the workers this group deserves, at least one
+            n_splits = max(1, round(n_workers * group_cost / total_cost))
+            n_splits = min(n_splits, len(indices))
+
+            # Longest-processing-time-first assignment to the splits
+            splits = [[] for _ in range(n_splits)]
+            loads = [(0.0, k) for k in range(n_splits)]
+            for i in indices:
+                load, k = heapq.heappop(loads)
+                splits[k].append(i)
+                heapq.heappush(loads, (load + costs[i], k))
+            chunks.extend(splits)
+
+        chunks.sort(key=lambda chunk: sum(costs[i] for i in chunk), reverse=True)
+        self.last_report = {
+            "predicted_makespan": self._simulate(chunks, costs, n_workers),
+        }
+        return chunks
+
+    def report(
+        self,
+        jobs: List[DockingJob],
+        durations: List[float],
+        actual_makespan: float,
+    ) -> Dict[str, float]:
+        """
+        Compare the predicted makespan with the measured one.
+
+        Args:
+            jobs (List[DockingJob]): Jobs that were docked.
+            durations (List[float]): Measured seconds per job, in job order.
+            actual_makespan (float): Measured wall time of the run in seconds.
+
+        Returns:
+            Dict[str, float]: Predicted and actual makespan, and the calibrated
+            seconds per cost unit.
+        """
+        predicted = self.last_report.get("predicted_makespan", 0.0)
+        total_cost = sum(self.cost(job) for job in jobs)
+        if self.seconds_per_unit is not None:
+            predicted *= self.seconds_per_unit
+            unit = "s"
+        else:
+            unit = "cost units"
+
+        if total_cost > 0:
+            self.seconds_per_unit = sum(durations) / total_cost
+
+        self.last_report = {
+            "predicted_makespan": predicted,
+            "actual_makespan": actual_makespan,
+            "seconds_per_unit": self.seconds_per_unit or 0.0,
+        }
+        print(
+            f"Predicted makespan: {predicted:.1f} {unit}, "
+            f"actual makespan: {actual_makespan:.1f} s, "
+            f"calibrated seconds per cost unit: {self.last_report['seconds_per_unit']:.4f}"
+        )
+        return self.last_report
+
+    @staticmethod
+    def _simulate(chunks: List[List[int]], costs: List[float], n_workers: int) -> float:
+        """Simulate the pool pulling chunks in order and return the makespan."""
+        finish_times = [0.0] * max(1, n_workers)
+        for chunk in chunks:
+            start = heapq.heappop(finish_times)
+            heapq.heappush(finish_times, start + sum(costs[i] for i in chunk))
+        return max(finish_times)
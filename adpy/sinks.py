@@ -0,0 +1,157 @@
+import os
+import csv
+import glob
+from typing import List, Optional
+
+import polars as pl
+
+from .metrics import _castTimingColumns
+
+
+class ResultSink:
+    def __init__(
+        self,
+        path: str,
+        format: Optional[str] = None,
+        batch_size: int = 1000,
+        overwrite: bool = True,
+        columns: Optional[List[str]] = None,
+    ) -> None:
+        """
+        Streaming writer for docking result rows.
+
+        Rows are buffered and appended in batches, so memory stays flat no
+        matter how many jobs are docked. CSV output is a single file; Parquet
+        output is a directory of part files, one per flushed batch. Both can be
+        read with `read()` while the run is still going.
+
+        The columns are the union of the keys of all rows written, in order
+        of first appearance, so rows of different shapes (e.g. failure rows
+        next to full result rows) never lose fields: missing values are left
+        empty, and a CSV whose header lacks a new column is rewritten with
+        the widened header.
+
+        Args:
+            path: Output CSV file or Parquet directory
+            format: "csv" or "parquet", inferred from the path if None
+            batch_size: Number of rows buffered before they are written
+            overwrite: Start from an empty output instead of appending
+            columns: Columns known up front, written first in this order
+        """
+        if format is None:
+            format = "parquet" if path.endswith(".parquet") else "csv"
+        if format not in ("csv", "parquet"):
+            raise ValueError(f"Unsupported result format: {format}")
+
+        self.path = path
+        self.format = format
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._buffer: List[dict] = []
+        self._fieldnames: Optional[List[str]] = list(columns) if columns else None
+        self._part = 0
+
+        if format == "csv":
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            if overwrite and os.path.exists(path):
+                os.remove(path)
+            elif os.path.exists(path) and os.path.getsize(path) > 0:
+                with open(path, "r", newline="") as f:
+                    existing = next(csv.reader(f))
+                self._fieldnames = existing + [
+                    c for c in self._fieldnames or [] if c not in existing
+                ]
+                if len(self._fieldnames) > len(existing):
+                    self._rewrite_csv_header()
+        else:
+            os.makedirs(path, exist_ok=True)
+            existing = sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+            if overwrite:
+                for part in existing:
+                    os.remove(part)
+            else:
+                self._part = len(existing)
+
+    def write(self, row: dict) -> None:
+        """Buffer one result row, flushing when the batch is full."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows to disk."""
+        if not self._buffer:
+            return
+
+        known = set(self._fieldnames or [])
+        new_columns = []
+        for row in self._buffer:
+            for column in row:
+                if column not in known:
+                    known.add(column)
+                    new_columns.append(column)
+
+        if self.format == "csv":
+            write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._fieldnames = (self._fieldnames or []) + new_columns
+            if new_columns and not write_header:
+                self._rewrite_csv_header()
+            with open(self.path, "a", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self._fieldnames)
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(self._buffer)
+        else:
+            self._fieldnames = (self._fieldnames or []) + new_columns
+            part_path = os.path.join(self.path, f"part-{self._part:05d}.parquet")
+            tmp_path = f"{part_path}.tmp"
+            # Every part carries all columns seen so far
+            pl.DataFrame(
+                [{column: row.get(column) for column in self._fieldnames} for row in self._buffer],
+                infer_schema_length=None,
+            ).write_parquet(tmp_path)
+            os.replace(tmp_path, part_path)
+            self._part += 1
+
+        self.rows_written += len(self._buffer)
+        self._buffer = []
+
+    def close(self) -> None:
+        """Flush the remaining rows."""
+        self.flush()
+
+    def read(self) -> pl.DataFrame:
+        """
+        Read the rows written so far.
+
+        Returns:
+            pl.DataFrame: All flushed rows; buffered rows are not included.
+        """
+        if self.format == "csv":
+            if not os.path.exists(self.path):
+                return pl.DataFrame()
+            return _castTimingColumns(pl.read_csv(self.path, infer_schema_length=None))
+
+        parts = sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+        if not parts:
+            return pl.DataFrame()
+        # Earlier parts lack the columns that first appeared later
+        return _castTimingColumns(
+            pl.concat([pl.read_parquet(part) for part in parts], how="diagonal_relaxed")
+        )
+
+    def _rewrite_csv_header(self) -> None:
+        """Rewrite the CSV file with the current (widened) header."""
+        tmp_path = f"{self.path}.tmp"
+        with open(self.path, "r", newline="") as src, open(tmp_path, "w", newline="") as dst:
+            writer = csv.DictWriter(dst, fieldnames=self._fieldnames)
+            writer.writeheader()
+            writer.writerows(csv.DictReader(src))
+        os.replace(tmp_path, self.path)
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
@@ -0,0 +1,114 @@
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .utils import readPDBAtoms
+
+
+def _readTER(query: str) -> List[Tuple[int, str, str]]:
+    """(number of atoms before it, chain, line) of every TER record, atoms counted as by readPDBAtoms."""
+    ters = []
+    n_atoms = 0
+    chain = ""
+    with open(query, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if line.startswith(("ATOM", "HETATM")):
+                try:
+                    float(line[30:38]), float(line[38:46]), float(line[46:54])
+                except ValueError:
+                    continue
+                n_atoms += 1
+                chain = line[21:22].strip()
+            elif line.startswith("TER"):
+                # A bare TER closes the chain of the atom before it
+                ter_chain = line[21:22].strip() if len(line.rstrip("\n")) > 21 else chain
+                ters.append((n_atoms, ter_chain, line if line.endswith("\n") else line + "\n"))
+    return ters
+
+
+def trimReceptor(
+    query: str,
+    output_file: str,
+    min_plddt: Optional[float] = None,
+    box: Optional[Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = None,
+    distance_cutoff: Optional[float] = None,
+) -> str:
+    """
+    Drop low-confidence and distant residues from a receptor before preparation
+
+    AlphaFold models store the per-residue pLDDT in the B-factor column. A
+    residue is removed when its mean pLDDT is below `min_plddt`, or when none
+    of its atoms lie within `distance_cutoff` Angstrom of the docking box.
+    Whole residues are kept or removed so that the receptor tool never sees
+    a partial side chain. TER records of chains with atoms left are kept,
+    so that the chains stay separate for the receptor preparation.
+
+    Args:
+        query: Path to the input receptor (.pdb)
+        output_file: Path of the trimmed receptor (.pdb)
+        min_plddt: Minimum mean pLDDT of a kept residue, no confidence filter if None
+        box: (center, box_size) of the docking box, required for the distance filter
+        distance_cutoff: Maximum distance from the box of a kept residue, in Angstrom
+
+    Returns:
+        Path of the trimmed receptor
+
+    Raises:
+        ValueError: If distance_cutoff is given without a box, or no residue is left
+    """
+    if distance_cutoff is not None and box is None:
+        raise ValueError("A docking box is required to trim by distance")
+
+    atoms = readPDBAtoms(query)
+    n_atoms = len(atoms["coords"])
+
+    # Residue index of every atom
+    residue_ids = np.array(
+        [f"{c}:{r}" for c, r in zip(atoms["chain"], atoms["resseq"])], dtype=object
+    )
+    _, residue_index = np.unique(residue_ids, return_inverse=True)
+    n_residues = residue_index.max() + 1 if n_atoms else 0
+    keep_residue = np.ones(n_residues, dtype=bool)
+
+    if min_plddt is not None:
+        plddt_sum = np.bincount(residue_index, weights=atoms["bfactor"], minlength=n_residues)
+        atom_count = np.bincount(residue_index, minlength=n_residues)
+        keep_residue &= plddt_sum / np.maximum(atom_count, 1) >= min_plddt
+
+    if distance_cutoff is not None:
+        center, box_size = box
+        outside = np.abs(atoms["coords"] - np.asarray(center)) - np.asarray(box_size) / 2.0
+        distance = np.linalg.norm(np.maximum(outside, 0.0), axis=1)
+        near = np.bincount(
+            residue_index, weights=distance <= distance_cutoff, minlength=n_residues
+        )
+        keep_residue &= near > 0
+
+    keep_atom = keep_residue[residue_index] if n_atoms else np.zeros(0, dtype=bool)
+    if not keep_atom.any():
+        raise ValueError(f"No residues of {query} left after trimming")
+
+    if os.path.dirname(output_file):
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    kept_chains = set(atoms["chain"][keep_atom])
+    with open(output_file, "w") as f:
+        written = 0
+        atoms_since_ter = False
+        for position, chain, ter in _readTER(query):
+            lines = atoms["line"][written:position][keep_atom[written:position]]
+            f.writelines(lines)
+            atoms_since_ter |= len(lines) > 0
+            # No TER for a trimmed-away chain or right after another TER
+            if chain in kept_chains and atoms_since_ter:
+                f.write(ter)
+                atoms_since_ter = False
+            written = position
+        f.writelines(atoms["line"][written:][keep_atom[written:]])
+        f.write("END\n")
+
+    print(
+        f"Receptor trimmed: kept {int(keep_residue.sum())}/{n_residues} residues, "
+        f"{int(keep_atom.sum())}/{n_atoms} atoms -> {output_file}"
+    )
+    return output_file
@@ -1,7 +1,10 @@
 import os
 import argparse
+import hashlib
+from functools import lru_cache
 import polars as pl
-from typing import Optional
+import numpy as np
+from typing import Dict, Optional
 
 class DataUtils:
     def __init__(self) -> None:
@@ -38,19 +41,93 @@ def extractBindingAffinity(output_file: str) -> str:
 
     return affinity
 
+def fileHash(path: str) -> str:
+    """
+    SHA-256 of a file's content, memoized on path, size and modification time
+
+    Args:
+        path: Path to a file
+
+    Returns:
+        Hex digest of the file
+    """
+    stat = os.stat(path)
+    return _hashFile(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+@lru_cache(maxsize=65536)
+def _hashFile(path: str, size: int, mtime_ns: int) -> str:
+    """Hash a file; size and mtime only key the memo of `fileHash`."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 def trimName(filepath):
     """
     Extract filename without Extension from filepath
 
     Args:
+        filepath: Path to a file
 
     Returns:
+        File name without its directory and last extension
 
     Example:
         '/path/to/ligand.pdbqt' -> 'ligand'
     """
     filename = os.path.basename(filepath)
-    return filename[:-6]
+    return os.path.splitext(filename)[0]
+
+def readPDBAtoms(structure_file: str, hetatm: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Read the ATOM (and HETATM) records of a PDB or PDBQT file into arrays
+
+    Args:
+        structure_file: Path to a PDB or PDBQT file
+        hetatm: Include HETATM records
+
+    Returns:
+        Dictionary of per-atom arrays: 'coords' (N x 3 float), 'name',
+        'resname', 'chain', 'resseq' (int), 'bfactor' (float) and 'line'
+        (the original record, newline included)
+
+    Example:
+        atoms = readPDBAtoms('AF-P04637-F1.pdb'); atoms['coords'].shape -> (N, 3)
+    """
+    records = ("ATOM", "HETATM") if hetatm else ("ATOM",)
+    coords, names, resnames, chains, resseqs, bfactors, lines = [], [], [], [], [], [], []
+
+    with open(structure_file, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not line.startswith(records):
+                continue
+            try:
+                coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            except ValueError:
+                continue
+            names.append(line[12:16].strip())
+            resnames.append(line[17:20].strip())
+            chains.append(line[21:22].strip())
+            try:
+                resseqs.append(int(line[22:26]))
+            except ValueError:
+                resseqs.append(0)
+            try:
+                bfactors.append(float(line[60:66]))
+            except ValueError:
+                bfactors.append(0.0)
+            lines.append(line if line.endswith("\n") else line + "\n")
+
+    return {
+        "coords": np.array(coords, dtype=np.float64).reshape(-1, 3),
+        "name": np.array(names, dtype=object),
+        "resname": np.array(resnames, dtype=object),
+        "chain": np.array(chains, dtype=object),
+        "resseq": np.array(resseqs, dtype=np.int64),
+        "bfactor": np.array(bfactors, dtype=np.float64),
+        "line": np.array(lines, dtype=object),
+    }
 
 # def log2csv(log_file):
 
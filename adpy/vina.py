@@ -154,16 +154,17 @@ def run_dock_ms(ligand_dir=None, receptor=None, output_dir=None):
     output_csv = f"{receptor}_docking_results.csv"
     output_path = os.path.join(output_dir, output_csv)
 
-    pdbqt_files = [f for f in os.listdir(output_dir) if f.endswith(".pdbqt")]
-    for pdbqt_file in pdbqt_files:
-        file = os.path.join(output_dir, pdbqt_file)
-
-        with open(file, "r", encoding="utf-8", errors="ignore") as f:
-            for line in f:
-                if line.startswith("REMARK VINA RESULT:"):
-                    affinity = line.split()[3]
-                    # print(affinity)
-                    break
+    # Pair every ligand with its own output file by name, not by listing order
+    for ligand in results_ligand:
+        file = os.path.join(output_dir, f"{ligand}_{receptor}.pdbqt")
+        affinity = None
+        if os.path.exists(file):
+            with open(file, "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    if line.startswith("REMARK VINA RESULT:"):
+                        affinity = line.split()[3]
+                        # print(affinity)
+                        break
 
 
         # print(ligand, receptor, affinity)
@@ -1,82 +1,262 @@
-from typing import List, Tuple, Optional, Union
+from typing import Iterator, List, Tuple, Optional, TYPE_CHECKING
 from .alphafold import AlphaFold
 from .autodock import AutoDock
 from .dockprep import DockPrep
-from .utils import trimName, extractBindingAffinity
+from .prepcache import PrepCache
+from .jobs import DockingJob
+from .journal import CheckpointJournal
+from .pipeline import _iterBatches, _iterQueue, _startStage
+from .sinks import ResultSink
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 import polars as pl
 import os
+import queue
+
+if TYPE_CHECKING:
+    from .engine import DockingEngine
+
+LIGAND_EXTENSIONS = (".pdb", ".sdf", ".mol", ".mol2", ".pdbqt")
+
 
 class Workflows:
 
-    def __init__(self) -> None:
-        pass
+    def __init__(self, prep_cache: Optional[PrepCache] = None) -> None:
+        """
+        Args:
+            prep_cache: Cache of prepared ligands and receptors shared by all runs
+        """
+        self.prep_cache = prep_cache
 
-    def run_dock(self, genes: Optional[List[str]] = None, receptor: Optional[str] = None, receptor_dir: str = "./data/receptors", ligand: Optional[str] = None, ligand_dir: Optional[str] = None, output_dir: str = './docking_results/') -> pl.DataFrame:
+    def run_dock(
+        self,
+        genes: Optional[List[str]] = None,
+        receptor: Optional[str] = None,
+        receptor_dir: str = "./data/receptors",
+        ligand: Optional[str] = None,
+        ligand_dir: Optional[str] = None,
+        output_dir: str = './docking_results/',
+        prepared_receptor_dir: str = "./data/prepared_receptors",
+        prepared_ligand_dir: str = "./data/prepared_ligands",
+        exhaustiveness: int = 32,
+        n_poses: int = 5,
+        docker: Optional[AutoDock] = None,
+        alphafold: Optional[AlphaFold] = None,
+        engine: Optional["DockingEngine"] = None,
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        ligand_chunk_size: int = 32,
+        prep_workers: Optional[int] = None,
+        max_pending: int = 4,
+    ) -> pl.DataFrame:
         """
         A workflow to perform docking using AutoDock Vina.
 
-        Steps:
-            1. Download protein structure from AlphaFold using gene names.
-            2. Prepare receptor and ligand files using DockPrep.
-            3. Run AutoDock Vina for docking.
-            4. Extract and summarize binding affinities.
+        Steps (run concurrently as a pipeline):
+            1. Download protein structures from AlphaFold using gene names,
+               several at a time.
+            2. Prepare receptors using DockPrep.
+            3. Prepare ligands in a process pool.
+            4. Run AutoDock Vina for docking and collect binding affinities.
+
+        Every stage runs in its own thread, connected by queues holding at most
+        `max_pending` items, so structures are fetched and prepared while
+        earlier receptors are being docked. A receptor is docked against every
+        ligand prepared so far as soon as it is ready, and every newly prepared
+        ligand chunk against every ready receptor; all jobs that became ready
+        while the docker was busy are docked together in the next batch.
 
-        Parameters:res
-        - receptor: Path to a single receptor PDB file.
-        - receptor_dir: Directory containing multiple receptor PDB files.
+        Parameters:
         - genes: A single gene or a list of gene names to fetch protein structures from AlphaFold.
-        - ligand: Path to a single ligand PDB file.
-        - ligand_dir: Directory containing multiple ligand PDB files.
+        - receptor: Path to a single receptor PDB file, used if no genes are given.
+        - receptor_dir: Directory AlphaFold structures are saved to. Without genes
+          or receptor, every PDB file in it is docked.
+        - ligand: Path to a single ligand file.
+        - ligand_dir: Directory containing multiple ligand files (.pdb, .sdf, .mol, .mol2,
+          or .pdbqt, which are docked without preparation).
         - output_dir: Directory to save docking results.
+        - prepared_receptor_dir: Directory to save prepared receptors.
+        - prepared_ligand_dir: Directory to save prepared ligands. Only their
+          paths are kept while the pipeline runs, not their PDBQT strings.
+        - exhaustiveness: Exhaustiveness of the global search.
+        - n_poses: Number of binding poses to generate.
+        - docker: AutoDock instance used for docking, a new one if None.
+        - alphafold: AlphaFold retriever (e.g. with a local mirror backend), a new
+          one saving to receptor_dir if None.
+        - engine: DockingEngine to dock on worker processes. Its worker pool is
+          started once for the whole pipeline.
+        - journal: Checkpoint journal to resume from.
+        - sink: Streaming writer for the result rows, defaults to a CSV in output_dir.
+        - ligand_chunk_size: Number of ligands prepared per chunk.
+        - prep_workers: Number of ligand preparation processes.
+        - max_pending: Capacity of the queues between stages.
+
+        Returns:
+        - One row per docked ligand-receptor pair, or None if there is nothing to dock.
         """
- 
-        # Workflow 1: Docking - Ligand + Gene
-        # Step 1: Download protein structure from AlphaFold using gene names
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir, exist_ok=True)
+        if isinstance(genes, str):
+            genes = [genes]
 
-        if not os.path.exists(receptor_dir):
-            os.makedirs(receptor_dir, exist_ok=True)
+        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(receptor_dir, exist_ok=True)
+        os.makedirs(prepared_ligand_dir, exist_ok=True)
 
-        alphafold = AlphaFold(pdb_path=receptor_dir)
+        if genes:
+            receptor_sources = list(genes)
+        elif receptor is not None:
+            receptor_sources = [receptor]
+        else:
+            receptor_sources = [
+                os.path.join(receptor_dir, f)
+                for f in sorted(os.listdir(receptor_dir))
+                if f.endswith(".pdb")
+            ]
 
-        if len(genes) == 1:
-            receptor = alphafold._from_gene_single(genes[0])
-        elif len(genes) > 1:
-            alphafold._from_gene_batch(genes)
+        if ligand is not None:
+            ligands = [ligand]
+        elif ligand_dir is not None:
+            ligands = [
+                os.path.join(ligand_dir, f)
+                for f in sorted(os.listdir(ligand_dir))
+                if f.endswith(LIGAND_EXTENSIONS)
+            ]
         else:
-            print("No genes provided for AlphaFold retrieval.")
+            ligands = []
+
+        if not receptor_sources or not ligands:
+            print("No genes/receptors or ligands provided for docking.")
             return None
-        
-        # Step 2: Prepare ligands and proteins
-        dockprep = DockPrep()
 
-        # Prepare single ligand
-        prepared_ligand = dockprep.prepare_ligand(
-        query=ligand,
-        target="./data/prepared_ligands/lig1.pdbqt"
-        )
+        if alphafold is None:
+            alphafold = AlphaFold(pdb_path=receptor_dir)
+        dockprep = DockPrep(prep_cache=self.prep_cache)
+        docker = docker if docker is not None else AutoDock()
+        if sink is None:
+            sink = ResultSink(os.path.join(output_dir, "workflow_docking_results.csv"))
+
+        fetched: queue.Queue = queue.Queue(maxsize=max_pending)
+        ready: queue.Queue = queue.Queue(maxsize=max_pending)
+        errors: List[BaseException] = []
+
+        # Step 1: Download protein structures from AlphaFold
+        def fetch() -> Iterator[str]:
+            if genes:
+                sources = alphafold._iter_genes(receptor_sources)
+            else:
+                sources = ((source, source) for source in receptor_sources)
+            for source, path in sources:
+                if path is None:
+                    print(f"No AlphaFold structure retrieved for {source}")
+                    continue
+                yield path
+
+        # Step 2: Prepare receptors
+        def prepare_receptors() -> Iterator[Tuple[str, str]]:
+            for path in _iterQueue(fetched):
+                receptor_name = os.path.splitext(os.path.basename(path))[0]
+                prepared_receptor = dockprep.prepare_receptor(
+                    query=path,
+                    target_prefix=os.path.join(prepared_receptor_dir, receptor_name),
+                    AlphaFold=True,
+                    box_center=None,
+                    box_size=None
+                )
+                if os.path.exists(prepared_receptor):
+                    yield ("receptor", prepared_receptor)
+
+        # Step 3: Prepare ligands; PDBQT ligands are docked as they are
+        ready_ligands = [lig for lig in ligands if lig.endswith(".pdbqt")]
+        to_prepare = [lig for lig in ligands if not lig.endswith(".pdbqt")]
+
+        def prepare_ligands(executor: Optional[ProcessPoolExecutor]) -> Iterator[Tuple[str, List[str]]]:
+            if ready_ligands:
+                yield ("ligands", ready_ligands)
+            for start in range(0, len(to_prepare), ligand_chunk_size):
+                prepared = dockprep.prepare_ligand_strings(
+                    to_prepare[start:start + ligand_chunk_size], executor=executor
+                )
+                paths = []
+                for name, pdbqt_string in prepared.items():
+                    path = os.path.join(prepared_ligand_dir, f"{name}.pdbqt")
+                    with open(path, "w") as f:
+                        f.write(pdbqt_string)
+                    paths.append(path)
+                if paths:
+                    yield ("ligands", paths)
+
+        # Step 4: Docking
+        receptors: List[Tuple[str, Tuple, Tuple]] = []
+        prepared_ligands: List[str] = []
 
-        # Prepare single receptor
-        prepared_receptor = dockprep.prepare_receptor(
-            query=receptor,
-            target_prefix="./data/prepared_receptors/rec1",
-            AlphaFold=True,
-            box_center=None,
-            box_size=None
-        )
+        def new_jobs(event) -> List[DockingJob]:
+            kind, value = event
+            if kind == "receptor":
+                center, box_size = docker._resolve_box(
+                    value, docker.default_center, docker.default_box_size, box_from_receptor=True
+                )
+                receptors.append((value, center, box_size))
+                pairs = [((value, center, box_size), lig) for lig in prepared_ligands]
+            else:
+                new_ligands = value
+                prepared_ligands.extend(new_ligands)
+                pairs = [(rec, lig) for rec in receptors for lig in new_ligands]
 
-        # print(prepared_ligand, prepared_receptor)
+            return [
+                DockingJob(
+                    lig_path,
+                    rec_path,
+                    center,
+                    box_size,
+                    exhaustiveness,
+                    n_poses,
+                    output_dir,
+                )
+                for (rec_path, center, box_size), lig_path in pairs
+            ]
 
-        # Step 3: Docking
-        docker = AutoDock()
+        n_docked = 0
+        # A pool the caller started is left running for them
+        stop_engine = engine is not None and engine._executor is None
+        if engine is not None:
+            engine.start()
+        try:
+            if to_prepare:
+                # Only ligands that need preparation need RDKit
+                from .ligprep import _init_preparator
+                prep_pool = ProcessPoolExecutor(max_workers=prep_workers, initializer=_init_preparator)
+            else:
+                prep_pool = nullcontext()
 
-        # ligand = prepared_ligand
-        # receptor = prepared_receptor
+            with prep_pool as executor, sink:
+                stages = [
+                    _startStage(fetch(), fetched, errors),
+                    _startStage(prepare_receptors(), ready, errors, upstream=fetched),
+                    _startStage(prepare_ligands(executor), ready, errors),
+                ]
 
-        result = docker.singleLigandSingleReceptor(ligand=prepared_ligand, receptor=prepared_receptor, output_dir=output_dir)
+                for events in _iterBatches(ready, producers=2):
+                    # Everything that became ready while docking is one batch
+                    jobs = [job for event in events for job in new_jobs(event)]
+                    if jobs:
+                        docker._run_jobs(jobs, engine, journal, sink)
+                        sink.flush()
+                        n_docked += len(jobs)
+                        print(
+                            f"Docked {n_docked} pairs: {len(receptors)} receptors x "
+                            f"{len(prepared_ligands)} ligands ready"
+                        )
 
-        return result
+                for stage in stages:
+                    stage.join()
+        finally:
+            if stop_engine:
+                engine.shutdown()
 
-        
+        if errors:
+            raise errors[0]
+        docker._report_map_reuse()
+        if self.prep_cache is not None:
+            self.prep_cache.report()
+        print(f"Docking successful: Output saved in {output_dir}")
 
+        return sink.read()
@@ -0,0 +1,520 @@
+import os
+import json
+import glob
+import time
+import uuid
+import socket
+import argparse
+import dataclasses
+import threading
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import polars as pl
+
+from .autodock import AutoDock, _emptyResultRow
+from .jobs import DockingJob, _chunkJobs
+from .mapcache import MapCache
+from .journal import CheckpointJournal
+from .sinks import ResultSink
+from .resultstore import ResultStore
+from .posestore import PoseArchive
+from .metrics import RunMetrics, _castTimingColumns
+from .scheduler import ReceptorMajorScheduler
+
+
+class WorkQueue:
+    def __init__(
+        self,
+        root: str,
+        chunk_size: int = 16,
+        scheduler: Optional[ReceptorMajorScheduler] = None,
+        n_chunks: Optional[int] = None,
+        lease_timeout: float = 600.0,
+        poll_interval: float = 5.0,
+        local_workers: int = 0,
+        sf_name: str = "vina",
+        seed: int = 0,
+        spacing: float = 0.375,
+        cpu: int = 0,
+        map_cache_dir: Optional[str] = None,
+        map_cache_size_gb: float = 10.0,
+        diagnostics: bool = False,
+        pose_archive_dir: Optional[str] = None,
+        cluster_rmsd: Optional[float] = None,
+    ) -> None:
+        """
+        Work queue on a shared POSIX filesystem for docking across nodes without a broker.
+
+        A coordinator (`run`, or `submit`) writes a manifest of the batch and
+        its chunks of jobs to `<root>/pending`. Workers on any node that mounts
+        the filesystem (`work`, or `python -m adpy.workqueue <root>`) claim a
+        chunk by renaming it into `<root>/leases`; rename is atomic, so exactly
+        one worker wins each chunk. A worker keeps its lease alive by touching
+        it, and a lease not touched for `lease_timeout` seconds is renamed back
+        to pending by whoever notices, so the chunks of a dead node are picked
+        up again. Lease age is measured against the filesystem's own clock, so
+        node clock skew does not expire leases early.
+
+        Every worker appends its results to its own journal shard in
+        `<root>/results`; the reducer (`reduce`) merges the shards, and the
+        latest successful result of a job wins if a chunk ran twice.
+
+        A WorkQueue can be passed as `engine` to the AutoDock batch methods.
+        The caller is then the coordinator: it submits the jobs, optionally
+        starts `local_workers` worker processes (e.g. to stand in for nodes
+        when testing locally), waits for all chunks to finish and returns the
+        reduced rows.
+
+        Args:
+            root: Queue directory on the shared filesystem
+            chunk_size: Maximum number of jobs per chunk (ignored when a
+                scheduler is used)
+            scheduler: Receptor-major scheduler deciding chunking and order
+            n_chunks: Number of chunks the scheduler plans for, defaults to
+                four per local worker (at least 16)
+            lease_timeout: Seconds after which an untouched lease is expired
+            poll_interval: Seconds between queue polls
+            local_workers: Number of worker processes the coordinator starts
+            sf_name: Scoring function name for Vina
+            seed: Random seed of every worker's Vina object
+            spacing: Grid spacing of the affinity maps in Angstrom
+            cpu: Number of CPUs each worker's Vina object uses (0 uses all)
+            map_cache_dir: Directory of a shared on-disk map cache
+            map_cache_size_gb: Size cap of the map cache in gigabytes
+            diagnostics: Score and minimize the input pose before docking
+            pose_archive_dir: Directory of a shared pose archive
+            cluster_rmsd: RMSD cutoff for clustering the poses of every run
+        """
+        self.root = root
+        self.chunk_size = chunk_size
+        self.scheduler = scheduler
+        self.n_chunks = n_chunks
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.local_workers = local_workers
+        self.config = {
+            "sf_name": sf_name,
+            "seed": seed,
+            "spacing": spacing,
+            "cpu": cpu,
+            "map_cache_dir": map_cache_dir,
+            "map_cache_size_gb": map_cache_size_gb,
+            "diagnostics": diagnostics,
+            "pose_archive_dir": pose_archive_dir,
+            "cluster_rmsd": cluster_rmsd,
+        }
+
+        self.pending_dir = os.path.join(root, "pending")
+        self.lease_dir = os.path.join(root, "leases")
+        self.done_dir = os.path.join(root, "done")
+        self.manifest_dir = os.path.join(root, "manifests")
+        self.result_dir = os.path.join(root, "results")
+        for path in (
+            self.pending_dir,
+            self.lease_dir,
+            self.done_dir,
+            self.manifest_dir,
+            self.result_dir,
+        ):
+            os.makedirs(path, exist_ok=True)
+
+    def submit(
+        self,
+        jobs: List[DockingJob],
+        result_store: Optional[ResultStore] = None,
+        timing: bool = False,
+    ) -> str:
+        """
+        Write the manifest and chunks of a batch (coordinator side).
+
+        Args:
+            jobs (List[DockingJob]): Jobs to dock.
+            result_store (Optional[ResultStore]): Store the workers consult
+                before docking and add new results to; must be on the shared
+                filesystem.
+            timing (bool): Have the workers add per-stage timing columns.
+
+        Returns:
+            str: ID of the submitted batch.
+        """
+        run_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        if self.scheduler is not None:
+            n_chunks = self.n_chunks or max(16, 4 * self.local_workers)
+            chunks = self.scheduler.plan(jobs, n_chunks)
+        else:
+            chunks = _chunkJobs(jobs, self.chunk_size)
+
+        # Workers on other nodes run in other working directories
+        config = {
+            **self.config,
+            "result_store_path": result_store.path if result_store is not None else None,
+            "timing": timing,
+        }
+        for path in ("map_cache_dir", "pose_archive_dir", "result_store_path"):
+            if config[path] is not None:
+                config[path] = os.path.abspath(config[path])
+
+        # The manifest goes first: a worker reading a chunk needs its config
+        manifest = {
+            "run_id": run_id,
+            "created": time.time(),
+            "n_jobs": len(jobs),
+            "n_chunks": len(chunks),
+            "config": config,
+        }
+        _writeJSON(os.path.join(self.manifest_dir, f"{run_id}.json"), manifest)
+
+        for n, chunk in enumerate(chunks):
+            _writeJSON(
+                os.path.join(self.pending_dir, f"{run_id}-{n:06d}.json"),
+                {"run_id": run_id, "jobs": [dataclasses.asdict(jobs[i]) for i in chunk]},
+            )
+        print(f"Submitted {len(jobs)} jobs in {len(chunks)} chunks to {self.root} (run {run_id})")
+        return run_id
+
+    def claim(self, worker_id: str) -> Optional[str]:
+        """
+        Claim a pending chunk by renaming it into the lease directory.
+
+        Args:
+            worker_id (str): Name of the claiming worker.
+
+        Returns:
+            Optional[str]: Path of the lease, or None if nothing is pending.
+        """
+        for chunk_file in sorted(os.listdir(self.pending_dir)):
+            if not chunk_file.endswith(".json"):
+                continue
+            pending = os.path.join(self.pending_dir, chunk_file)
+            lease = os.path.join(self.lease_dir, f"{chunk_file}@{worker_id}")
+            try:
+                # Touched first so the lease is never born stale
+                os.utime(pending)
+                os.rename(pending, lease)
+            except FileNotFoundError:
+                # Another worker claimed it first
+                continue
+            os.utime(lease)
+            return lease
+        return None
+
+    def expire(self) -> int:
+        """
+        Return the chunks of stale leases to the pending directory.
+
+        Returns:
+            int: Number of leases expired.
+        """
+        now = self._filesystem_time()
+        expired = 0
+        for lease in os.listdir(self.lease_dir):
+            path = os.path.join(self.lease_dir, lease)
+            try:
+                if now - os.path.getmtime(path) < self.lease_timeout:
+                    continue
+                chunk_file, _, worker_id = lease.rpartition("@")
+                os.rename(path, os.path.join(self.pending_dir, chunk_file))
+            except FileNotFoundError:
+                # Completed, or expired by someone else, in the meantime
+                continue
+            print(f"Expired stale lease of {chunk_file} held by {worker_id}")
+            expired += 1
+        return expired
+
+    def status(self, run_id: Optional[str] = None) -> Dict[str, int]:
+        """Number of pending, leased and done chunks, of one batch or of all."""
+        prefix = f"{run_id}-" if run_id is not None else ""
+        return {
+            state: sum(1 for name in os.listdir(path) if name.startswith(prefix))
+            for state, path in (
+                ("pending", self.pending_dir),
+                ("leased", self.lease_dir),
+                ("done", self.done_dir),
+            )
+        }
+
+    def work(
+        self,
+        worker_id: Optional[str] = None,
+        wait: bool = False,
+        max_chunks: Optional[int] = None,
+    ) -> int:
+        """
+        Claim and dock chunks until the queue is drained (worker side).
+
+        Chunks of the same batch are docked on one AutoDock object, so maps
+        stay warm across chunks. A background thread touches the lease while
+        a chunk runs.
+
+        Args:
+            worker_id (Optional[str]): Name of this worker, defaults to
+                `<host>-<pid>`. Names the lease files and the result shard.
+            wait (bool): Keep polling for new batches once the queue is empty
+                instead of returning.
+            max_chunks (Optional[int]): Stop after this many chunks.
+
+        Returns:
+            int: Number of chunks docked.
+        """
+        if worker_id is None:
+            worker_id = f"{socket.gethostname()}-{os.getpid()}"
+        journal = CheckpointJournal(os.path.join(self.result_dir, f"{worker_id}.jsonl"))
+        dockers: Dict[str, AutoDock] = {}
+        n_chunks = 0
+
+        while max_chunks is None or n_chunks < max_chunks:
+            self.expire()
+            lease = self.claim(worker_id)
+            if lease is None:
+                if not wait and not os.listdir(self.lease_dir):
+                    break
+                # Leases of other workers may still expire and come back
+                time.sleep(self.poll_interval)
+                continue
+
+            with open(lease, "r") as f:
+                chunk = json.load(f)
+            run_id = chunk["run_id"]
+            if run_id not in dockers:
+                dockers.clear()
+                dockers[run_id] = self._make_docker(run_id)
+            docker = dockers[run_id]
+
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(lease, stop), daemon=True)
+            heartbeat.start()
+            try:
+                for fields in chunk["jobs"]:
+                    job = _jobFromDict(fields)
+                    if journal.is_finished(job):
+                        continue
+                    try:
+                        journal.record(job, docker._run_job(job))
+                    except Exception as e:
+                        print(f"Docking failed for {job.ligand} - {job.receptor}: {str(e)}")
+                        journal.record_failure(job, str(e))
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            try:
+                os.rename(lease, os.path.join(self.done_dir, os.path.basename(lease).rpartition("@")[0]))
+            except FileNotFoundError:
+                # The lease expired while the chunk ran; the results still count
+                print(f"Lease {os.path.basename(lease)} was lost before completion")
+            n_chunks += 1
+
+        for docker in dockers.values():
+            docker._report_map_reuse()
+        print(f"Worker {worker_id} docked {n_chunks} chunks")
+        return n_chunks
+
+    def reduce(
+        self,
+        jobs: Optional[List[DockingJob]] = None,
+        output_file: Optional[str] = None,
+    ) -> pl.DataFrame:
+        """
+        Merge the result shards of all workers.
+
+        Args:
+            jobs (Optional[List[DockingJob]]): Only return the rows of these
+                jobs, in job order. All results if None.
+            output_file (Optional[str]): Also write the rows to this CSV or
+                Parquet file.
+
+        Returns:
+            pl.DataFrame: One row per successfully docked job.
+        """
+        finished, _ = self._read_shards()
+        if jobs is None:
+            rows = list(finished.values())
+        else:
+            rows = [finished[job.key] for job in jobs if job.key in finished]
+
+        df = _castTimingColumns(pl.DataFrame(rows, infer_schema_length=None))
+        if output_file is not None:
+            if os.path.dirname(output_file):
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            if output_file.endswith(".parquet"):
+                df.write_parquet(output_file)
+            else:
+                df.write_csv(output_file)
+            print(f"Results saved to {output_file}")
+        return df
+
+    def run(
+        self,
+        jobs: List[DockingJob],
+        journal: Optional[CheckpointJournal] = None,
+        sink: Optional[ResultSink] = None,
+        result_store: Optional[ResultStore] = None,
+        metrics: Optional[RunMetrics] = None,
+    ) -> Optional[pl.DataFrame]:
+        """
+        Dock all jobs on the queue's workers and wait for them (coordinator side).
+
+        Same interface as `DockingEngine.run`, so a WorkQueue can be passed as
+        `engine` to the AutoDock batch methods.
+
+        Args:
+            jobs (List[DockingJob]): Jobs to dock.
+            journal (Optional[CheckpointJournal]): Journal the reduced outcome
+                of every job is recorded in.
+            sink (Optional[ResultSink]): Streaming writer receiving the rows.
+            result_store (Optional[ResultStore]): Store of finished results the
+                workers consult before docking and add new results to.
+            metrics (Optional[RunMetrics]): Run metrics every row docked by
+                this run is added to, leaving out results already in the shards.
+
+        Returns:
+            Optional[pl.DataFrame]: One row per job, in job order, failed
+            jobs with a "failed" status and empty results. None if rows were
+            streamed to a sink.
+        """
+        if metrics is not None:
+            metrics.n_workers = max(1, self.local_workers)
+            metrics.start()
+        # Results already in the shards were docked by earlier runs
+        replayed = set(self._read_shards()[0]) if metrics is not None else set()
+        run_id = self.submit(jobs, result_store=result_store, timing=metrics is not None)
+
+        ctx = multiprocessing.get_context("spawn")
+        workers = [
+            ctx.Process(target=_work_process, args=(self.root, self.lease_timeout, self.poll_interval))
+            for _ in range(self.local_workers)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            while True:
+                status = self.status(run_id)
+                if status["pending"] == 0 and status["leased"] == 0:
+                    break
+                self.expire()
+                time.sleep(self.poll_interval)
+        finally:
+            for worker in workers:
+                worker.join()
+
+        finished, failed = self._read_shards()
+        rows = []
+        for job in jobs:
+            if job.key in finished:
+                row = finished[job.key]
+                if journal is not None:
+                    journal.record(job, row)
+            else:
+                row = _emptyResultRow(
+                    job,
+                    "failed",
+                    self.config["diagnostics"],
+                    self.config["cluster_rmsd"],
+                    metrics is not None,
+                )
+                if journal is not None:
+                    journal.record_failure(job, failed.get(job.key, "no result"))
+            if metrics is not None and job.key not in replayed:
+                metrics.observe(row)
+            if sink is not None:
+                sink.write(row)
+            else:
+                rows.append(row)
+        if sink is not None:
+            return None
+        return _castTimingColumns(pl.DataFrame(rows, infer_schema_length=None))
+
+    def _make_docker(self, run_id: str) -> AutoDock:
+        """Create the AutoDock object configured by a batch's manifest."""
+        with open(os.path.join(self.manifest_dir, f"{run_id}.json"), "r") as f:
+            config = json.load(f)["config"]
+        return AutoDock(
+            sf_name=config["sf_name"],
+            reuse_maps=True,
+            map_cache=(
+                MapCache(config["map_cache_dir"], max_size_gb=config["map_cache_size_gb"])
+                if config["map_cache_dir"] is not None
+                else None
+            ),
+            spacing=config["spacing"],
+            cpu=config["cpu"],
+            seed=config["seed"],
+            result_store=(
+                ResultStore(config["result_store_path"])
+                if config["result_store_path"] is not None
+                else None
+            ),
+            diagnostics=config["diagnostics"],
+            pose_archive=(
+                PoseArchive(config["pose_archive_dir"])
+                if config["pose_archive_dir"] is not None
+                else None
+            ),
+            cluster_rmsd=config["cluster_rmsd"],
+            timing=config["timing"],
+        )
+
+    def _read_shards(self) -> Tuple[Dict[str, dict], Dict[str, str]]:
+        """Finished rows and failures of every worker's result shard, successes win."""
+        finished: Dict[str, dict] = {}
+        failed: Dict[str, str] = {}
+        for shard in sorted(glob.glob(os.path.join(self.result_dir, "*.jsonl"))):
+            journal = CheckpointJournal(shard)
+            finished.update(journal.finished)
+            failed.update(journal.failed)
+        return finished, {key: error for key, error in failed.items() if key not in finished}
+
+    def _heartbeat(self, lease: str, stop: threading.Event) -> None:
+        """Touch a lease until stopped, so it is not expired while the chunk runs."""
+        while not stop.wait(self.lease_timeout / 4):
+            try:
+                os.utime(lease)
+            except FileNotFoundError:
+                return
+
+    def _filesystem_time(self) -> float:
+        """Current time on the shared filesystem's clock."""
+        clock = os.path.join(self.root, ".clock")
+        with open(clock, "a"):
+            pass
+        os.utime(clock)
+        return os.path.getmtime(clock)
+
+
+def _jobFromDict(fields: dict) -> DockingJob:
+    """Rebuild a DockingJob read back from JSON."""
+    return DockingJob(
+        **{
+            **fields,
+            "center": tuple(fields["center"]),
+            "box_size": tuple(fields["box_size"]),
+        }
+    )
+
+
+def _writeJSON(path: str, content: dict) -> None:
+    """Write a JSON file atomically, so readers never see a partial file."""
+    tmp_file = f"{path}.tmp-{uuid.uuid4().hex}"
+    with open(tmp_file, "w") as f:
+        json.dump(content, f)
+    os.replace(tmp_file, path)
+
+
+def _work_process(root: str, lease_timeout: float, poll_interval: float) -> None:
+    """Entry point of a local worker process started by `WorkQueue.run`."""
+    WorkQueue(root, lease_timeout=lease_timeout, poll_interval=poll_interval).work()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dock chunks from a shared-filesystem work queue")
+    parser.add_argument("root", help="Queue directory on the shared filesystem")
+    parser.add_argument("--worker-id", help="Worker name, defaults to <host>-<pid>")
+    parser.add_argument("--wait", action="store_true", help="Keep polling once the queue is empty")
+    parser.add_argument("--lease-timeout", type=float, default=600.0, help="Seconds after which an untouched lease is expired")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between queue polls")
+    args = parser.parse_args()
+
+    WorkQueue(
+        args.root, lease_timeout=args.lease_timeout, poll_interval=args.poll_interval
+    ).work(worker_id=args.worker_id, wait=args.wait)
@@ -0,0 +1,231 @@
+from adpy import AutoDock, DockPrep, DockingEngine, DockingJob, RunMetrics
+from adpy.boxes import readBoxFile, receptorBoxFile
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+# Bundled AlphaFold receptors and sample ligand the benchmarks run on
+RECEPTORS = [
+    './examples/receptors/AF-P00533-F1.pdb',
+    './examples/receptors/AF-P04637-F1.pdb',
+    './examples/receptors/AF-P15692-F1.pdb',
+]
+LIGAND = './examples/ligands/Structure2D_COMPOUND_CID_24978538.sdf'
+BENCHMARKS = ('prep', 'latency', 'maps', 'throughput')
+
+
+def timeRepeats(fn, repeats):
+    '''
+    Run fn repeatedly and time every run
+
+    Args:
+        fn: Function without arguments
+        repeats: Number of runs
+
+    Returns:
+        (median seconds, min seconds, result of the last run)
+    '''
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), min(times), result
+
+
+def metric(value, unit, higher_is_better=False, **extra):
+    '''Benchmark result entry, as stored in the results file.'''
+    return {'value': value, 'unit': unit, 'higher_is_better': higher_is_better, **extra}
+
+
+def boxCenter(receptor):
+    '''Center of the box DockPrep wrote next to a prepared receptor.'''
+    center, _ = readBoxFile(receptorBoxFile(receptor))
+    return center
+
+
+def benchmarkPrep(args, prep, results):
+    '''Time receptor and ligand preparation, without the preparation cache.'''
+    prepared = {}
+    for receptor in RECEPTORS:
+        name = os.path.splitext(os.path.basename(receptor))[0]
+        target_prefix = os.path.join(args.workdir, 'receptors', name)
+        median, best, target = timeRepeats(
+            lambda: prep.prepare_receptor(receptor, target_prefix), args.repeats
+        )
+        results[f'prep.receptor.{name}'] = metric(median, 's', min=best)
+        prepared[name] = target
+
+    target = os.path.join(args.workdir, 'ligands', 'ligand.pdbqt')
+    median, best, _ = timeRepeats(lambda: prep.prepare_ligand(LIGAND, target), args.repeats)
+    results['prep.ligand'] = metric(median, 's', min=best)
+    return prepared, target
+
+
+def benchmarkLatency(args, receptors, ligand, results):
+    '''Time one docking run per receptor, end to end and by stage.'''
+    docker = AutoDock(cpu=args.cpu, seed=args.seed, reuse_maps=False, timing=True)
+    output_dir = os.path.join(args.workdir, 'outputs', 'latency')
+    os.makedirs(output_dir, exist_ok=True)
+    for name, receptor in receptors.items():
+        job = DockingJob(
+            ligand, receptor, boxCenter(receptor), tuple(args.box_size),
+            args.exhaustiveness, args.n_poses, output_dir,
+        )
+        median, best, row = timeRepeats(lambda: docker._run_job(job), args.repeats)
+        stages = {k[len('time_'):]: v for k, v in row.items() if k.startswith('time_')}
+        results[f'latency.{name}'] = metric(
+            median, 's', min=best, stages=stages, binding_affinity=row['binding_affinity']
+        )
+
+
+def benchmarkMaps(args, receptors, results):
+    '''Time the affinity map build of the first receptor at increasing box sizes.'''
+    docker = AutoDock(cpu=args.cpu, seed=args.seed, reuse_maps=False)
+    name, receptor = next(iter(receptors.items()))
+    center = boxCenter(receptor)
+    for edge in args.map_box_sizes:
+        def build():
+            docker.v.set_receptor(receptor)
+            docker.v.compute_vina_maps(
+                center=center, box_size=(edge, edge, edge), spacing=docker.spacing
+            )
+        median, best, _ = timeRepeats(build, args.repeats)
+        results[f'maps.{name}.box{edge:g}'] = metric(median, 's', min=best)
+
+
+def benchmarkThroughput(args, receptors, ligand, results):
+    '''Dock copies of the ligand against every receptor at each worker x cpu split.'''
+    ligand_dir = os.path.join(args.workdir, 'ligands', 'copies')
+    os.makedirs(ligand_dir, exist_ok=True)
+    ligands = []
+    for i in range(args.n_ligands):
+        copy = os.path.join(ligand_dir, f'ligand{i:03d}.pdbqt')
+        shutil.copyfile(ligand, copy)
+        ligands.append(copy)
+
+    for split in args.splits:
+        n_workers, cpu_per_worker = map(int, split.split('x'))
+        output_dir = os.path.join(args.workdir, 'outputs', f'throughput_{split}')
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            DockingJob(
+                copy, receptor, boxCenter(receptor), tuple(args.box_size),
+                args.exhaustiveness, args.n_poses, output_dir,
+            )
+            for receptor in receptors.values()
+            for copy in ligands
+        ]
+        metrics = RunMetrics()
+        engine = DockingEngine(
+            n_workers=n_workers, cpu_per_worker=cpu_per_worker, seed=args.seed
+        )
+        engine.run(jobs, metrics=metrics)
+        summary = metrics.summary()
+        results[f'throughput.{split}'] = metric(
+            summary['ligands_per_hour'], 'ligands/hour', higher_is_better=True,
+            jobs=summary['jobs'], wall_seconds=summary['wall_seconds'],
+            worker_utilization=summary['worker_utilization'],
+            peak_rss_mb=summary['peak_rss_mb'],
+        )
+
+
+def compareResults(results, baseline, tolerance):
+    '''
+    Compare benchmark results against a stored baseline
+
+    Args:
+        results: Current results file content
+        baseline: Baseline results file content
+        tolerance: Allowed relative slowdown, e.g. 0.1 for 10%
+
+    Returns:
+        Names of the benchmarks that regressed
+    '''
+    regressions = []
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in sorted(results['results'].items()):
+        previous = baseline['results'].get(name)
+        if previous is None or not previous['value']:
+            print(f'{name:<40} {"-":>12} {current["value"]:>12.4g}')
+            continue
+
+        change = current['value'] / previous['value'] - 1.0
+        if current['higher_is_better']:
+            regressed = change < -tolerance
+        else:
+            regressed = change > tolerance
+        flag = '  REGRESSION' if regressed else ''
+        print(
+            f'{name:<40} {previous["value"]:>12.4g} {current["value"]:>12.4g} '
+            f'{change:>+8.1%}{flag}'
+        )
+        if regressed:
+            regressions.append(name)
+
+    if results['config'] != baseline.get('config'):
+        print('Warning: benchmark configuration differs from the baseline')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark docking on the bundled example receptors')
+    parser.add_argument('--output', default='./benchmark_results.json', help='Set path to save benchmark results (JSON)')
+    parser.add_argument('--compare', help='Compare the results against this baseline results file')
+    parser.add_argument('--compare-only', action='store_true', help='Compare an existing --output file against --compare without running')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Relative slowdown flagged as a regression')
+    parser.add_argument('--workdir', default='./.adpy_benchmark', help='Set directory for prepared inputs and docking output')
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS), help='Benchmarks to run')
+    parser.add_argument('--seed', type=int, default=42, help='Vina random seed')
+    parser.add_argument('--exhaustiveness', type=int, default=8, help='Exhaustiveness of every docking run')
+    parser.add_argument('--n-poses', type=int, default=5, help='Number of poses of every docking run')
+    parser.add_argument('--box-size', type=float, nargs=3, default=[20.0, 20.0, 20.0], help='Docking box of the latency and throughput runs')
+    parser.add_argument('--map-box-sizes', type=float, nargs='+', default=[10.0, 20.0, 30.0, 40.0], help='Box edge lengths of the map build benchmark')
+    parser.add_argument('--cpu', type=int, default=1, help='Vina CPUs of the latency and map benchmarks')
+    parser.add_argument('--splits', nargs='+', default=['1x4', '2x2', '4x1'], help='Worker x CPU splits of the throughput benchmark')
+    parser.add_argument('--n-ligands', type=int, default=8, help='Ligands per receptor in the throughput benchmark')
+    parser.add_argument('--repeats', type=int, default=3, help='Repeats of the timed benchmarks (the median is reported)')
+    args = parser.parse_args()
+
+    if args.compare_only:
+        with open(args.output, 'r') as f:
+            results = json.load(f)
+    else:
+        config = {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'compare_only', 'tolerance', 'workdir')}
+        results = {
+            'config': config,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'results': {},
+        }
+
+        prep = DockPrep()
+        receptors, ligand = benchmarkPrep(args, prep, results['results'] if 'prep' in args.only else {})
+        if 'latency' in args.only:
+            benchmarkLatency(args, receptors, ligand, results['results'])
+        if 'maps' in args.only:
+            benchmarkMaps(args, receptors, results['results'])
+        if 'throughput' in args.only:
+            benchmarkThroughput(args, receptors, ligand, results['results'])
+
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'Benchmark results saved to {args.output}')
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compareResults(results, baseline, args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} benchmarks regressed by more than {args.tolerance:.0%}')
+            sys.exit(1)
@@ -1,4 +1,5 @@
-from adpy import run_dock_ss, run_dock_ms, pdbqt2csv
+from adpy import pdbqt2csv
+from adpy.vina import run_dock_ss, run_dock_ms
 import argparse
 import os
 
@@ -13,11 +14,16 @@ if __name__ == "__main__":
     parser.add_argument('--receptor-dir', help='Set receptor directory')
     parser.add_argument('--output-dir', required=True, help='Set path to save docking output')
     parser.add_argument('--multi-ligand', type=bool, default=False, help='If docking with multiple proteins: True, else: False')
+    parser.add_argument('--summary', help='Only summarize the existing docking output in output-dir to this CSV/Parquet file')
     args = parser.parse_args()
 
     if not os.path.exists(args.output_dir):
         os.makedirs(args.output_dir)
 
+    if args.summary:
+        pdbqt2csv(args.output_dir, args.summary) # bulk extract affinities of existing output
+        raise SystemExit(0)
+
     # run_dock_ss(ligand=args.ligand, receptor=args.receptor, output_dir=args.output_dir) # one ligand - one receptor
     run_dock_ms(ligand_dir=args.ligand_dir, receptor=args.receptor, output_dir=args.output_dir) # many ligand - many receptor
     
\ No newline at end of file
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The stub Vina shadows any installed one; spawned engine workers inherit sys.path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "stubs"))
+
+
+@pytest.fixture
+def receptor(tmp_path):
+    """Path of a (stub) prepared receptor."""
+    path = tmp_path / "rec.pdbqt"
+    path.write_text("ATOM      1  C   ALA A   1       0.000   0.000   0.000  0.00  0.00    +0.000 C \n")
+    return str(path)
+
+
+@pytest.fixture
+def make_ligand(tmp_path):
+    """Factory writing a (stub) prepared ligand named `<name>.pdbqt`."""
+
+    def make(name, content=None):
+        path = tmp_path / "ligands" / f"{name}.pdbqt"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(content if content is not None else f"REMARK {name}\n")
+        return str(path)
+
+    return make
@@ -0,0 +1,59 @@
+"""
+Stand-in for the AutoDock Vina bindings, so the tests run without Vina.
+
+Docking returns one fixed pose. A ligand whose name contains "crash" raises
+in dock(), and one containing "slow" sleeps for exhaustiveness / 4 seconds.
+"""
+import time
+
+import numpy as np
+
+POSE = (
+    "MODEL 1\n"
+    "REMARK VINA RESULT:    -7.000      0.000      0.000\n"
+    "ATOM      1  C   UNL     1       0.000   0.000   0.000  0.00  0.00    +0.000 C \n"
+    "ENDMDL\n"
+)
+
+
+class Vina:
+    def __init__(self, sf_name="vina", cpu=0, seed=0, verbosity=1):
+        self.ligand = ""
+        self.docks = 0
+
+    def set_receptor(self, rigid_pdbqt_filename=None, flex_pdbqt_filename=None):
+        pass
+
+    def compute_vina_maps(self, center, box_size, spacing=0.375, force_even_voxels=False):
+        pass
+
+    def set_ligand_from_file(self, pdbqt_filename):
+        self.ligand = pdbqt_filename
+
+    def set_ligand_from_string(self, pdbqt_string):
+        self.ligand = pdbqt_string
+
+    def dock(self, exhaustiveness=8, n_poses=20, **kwargs):
+        if "slow" in self.ligand:
+            time.sleep(exhaustiveness / 4)
+        if "crash" in self.ligand:
+            raise RuntimeError("docking crashed")
+        self.docks += 1
+
+    def poses(self, n_poses=9, **kwargs):
+        return POSE
+
+    def energies(self, n_poses=9, **kwargs):
+        return np.array([[-7.0, -8.0, -1.0, 0.5, -1.0]])
+
+    def score(self):
+        return np.array([-6.0, -7.0, -1.0, 0.0, 0.0, 0.0, 0.0, -1.0])
+
+    def optimize(self, max_steps=0):
+        return np.array([-6.5, -7.5, -1.0, 0.0, 0.0, 0.0, 0.0, -1.0])
+
+    def write_maps(self, map_prefix_filename="receptor", gpf_filename="NULL", fld_filename="NULL", receptor_filename="NULL", overwrite=False):
+        pass
+
+    def load_maps(self, map_prefix_filename):
+        pass
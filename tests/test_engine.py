@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from adpy import AutoDock, CheckpointJournal, DockingEngine, DockingJob
+
+
+def make_job(ligand, receptor, output_dir, exhaustiveness=1):
+    return DockingJob(ligand, receptor, (0.0, 0.0, 0.0), (20, 20, 20), exhaustiveness, 1, output_dir)
+
+
+@pytest.fixture
+def output_dir(tmp_path):
+    path = tmp_path / "out"
+    path.mkdir()
+    return str(path)
+
+
+def test_pooled_run_matches_serial_run(receptor, make_ligand, output_dir):
+    jobs = [make_job(make_ligand(name), receptor, output_dir) for name in ("a", "b", "c")]
+
+    serial = AutoDock()._run_jobs(jobs)
+    pooled = DockingEngine(n_workers=2, cpu_per_worker=1, chunk_size=2).run(jobs)
+
+    assert pooled["ligand"].to_list() == ["a", "b", "c"]
+    assert pooled.drop("status").equals(serial.drop("status"))
+
+
+def test_timed_out_job_is_retried_at_lower_exhaustiveness(receptor, make_ligand, output_dir):
+    # The stub sleeps exhaustiveness / 4 s: 40 s at first, 0.25 s on the retry
+    jobs = [
+        make_job(make_ligand("a"), receptor, output_dir),
+        make_job(make_ligand("slow"), receptor, output_dir, exhaustiveness=160),
+        make_job(make_ligand("crash"), receptor, output_dir),
+    ]
+    engine = DockingEngine(
+        n_workers=2, cpu_per_worker=1, job_timeout=5.0, timeout_retry_exhaustiveness=1
+    )
+    journal = CheckpointJournal(os.path.join(output_dir, "journal.jsonl"))
+
+    df = engine.run(jobs, journal=journal)
+
+    assert df["ligand"].to_list() == ["a", "slow", "crash"]
+    assert df["status"].to_list() == ["ok", "retried", "failed"]
+    assert df["binding_affinity"].to_list()[:2] == [-7.0, -7.0]
+    journal.load()
+    # Recorded under the original job, so a resumed run skips it
+    assert journal.is_finished(jobs[1])
+    assert set(journal.failed) == {jobs[2].key}
+
+
+def test_job_without_retry_times_out(receptor, make_ligand, output_dir):
+    jobs = [
+        make_job(make_ligand("a"), receptor, output_dir),
+        make_job(make_ligand("slow"), receptor, output_dir, exhaustiveness=160),
+    ]
+    engine = DockingEngine(n_workers=2, cpu_per_worker=1, job_timeout=5.0)
+
+    df = engine.run(jobs)
+
+    assert df["status"].to_list() == ["ok", "timeout"]
+    assert df["binding_affinity"].to_list() == [-7.0, None]
@@ -0,0 +1,46 @@
+from adpy import AutoDock, CheckpointJournal, DockingJob
+
+
+def make_jobs(ligands, receptor, output_dir):
+    return [
+        DockingJob(ligand, receptor, (0.0, 0.0, 0.0), (20, 20, 20), 8, 1, output_dir)
+        for ligand in ligands
+    ]
+
+
+def test_resume_skips_finished_jobs_and_replays_their_rows(tmp_path, receptor, make_ligand):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    jobs = make_jobs([make_ligand("a"), make_ligand("crash"), make_ligand("b")], receptor, str(output_dir))
+    journal_path = str(tmp_path / "journal.jsonl")
+
+    first = AutoDock()._run_jobs(jobs, journal=CheckpointJournal(journal_path))
+    assert first["status"].to_list() == ["ok", "failed", "ok"]
+
+    docker = AutoDock(timing=True)
+    journal = CheckpointJournal(journal_path)
+    assert set(journal.finished) == {jobs[0].key, jobs[2].key}
+    assert set(journal.failed) == {jobs[1].key}
+
+    resumed = docker._run_jobs(jobs, journal=journal)
+    # Only the failed job is docked again; finished rows come back from the journal
+    assert docker.v.docks == 0
+    assert resumed["ligand"].to_list() == ["a", "b", "crash"]
+    assert resumed["status"].to_list() == ["ok", "ok", "failed"]
+    assert resumed["binding_affinity"].to_list()[:2] == first["binding_affinity"].to_list()[::2]
+    assert resumed["time_total"].to_list() == [None, None, None]
+
+
+def test_torn_last_line_is_ignored(tmp_path, receptor, make_ligand):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    jobs = make_jobs([make_ligand("a"), make_ligand("b")], receptor, str(output_dir))
+    journal_path = tmp_path / "journal.jsonl"
+
+    AutoDock()._run_jobs(jobs, journal=CheckpointJournal(str(journal_path)))
+    lines = journal_path.read_text().splitlines(keepends=True)
+    journal_path.write_text(lines[0] + lines[1][: len(lines[1]) // 2])
+
+    journal = CheckpointJournal(str(journal_path))
+    assert journal.is_finished(jobs[0])
+    assert not journal.is_finished(jobs[1])
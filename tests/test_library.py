@@ -0,0 +1,50 @@
+from adpy import LigandLibrary
+
+MOL_BLOCK = "  RDKit          3D\n\n  1  0  0  0  0  0  0  0  0  0999 V2000\n    0.0000    0.0000    0.0000 C   0  0\nM  END\n"
+
+
+def write_sdf(path, titles):
+    path.write_text("".join(f"{title}\n{MOL_BLOCK}$$$$\n" for title in titles))
+    return str(path)
+
+
+def test_index_starts_at_blank_title_lines(tmp_path):
+    library = LigandLibrary(write_sdf(tmp_path / "lib.sdf", ["first", "", "third", ""]))
+
+    offsets = library.index()
+    assert len(offsets) == 4
+    with open(library.path, "rb") as f:
+        data = f.read()
+    assert offsets[0] == 0
+    assert all(data[o - 5:o] == b"$$$$\n" for o in offsets[1:])
+
+
+def test_random_access_matches_sequential_read(tmp_path):
+    library = LigandLibrary(write_sdf(tmp_path / "lib.sdf", ["first", "", "a/b", ""]))
+
+    molecules = list(library.iterMolecules())
+    assert [name for name, _ in molecules] == ["first_0", "lib_1", "a_b_2", "lib_3"]
+    for n, molecule in enumerate(molecules):
+        assert library.get(n) == molecule
+    assert list(library.iterMolecules(start=1)) == molecules[1:]
+    assert molecules[1][1].splitlines()[1] == "  RDKit          3D"
+
+
+def test_trailing_blank_lines_are_not_a_molecule(tmp_path):
+    path = tmp_path / "lib.sdf"
+    write_sdf(path, ["first", "second"])
+    with open(path, "a") as f:
+        f.write("\n\n")
+    library = LigandLibrary(str(path))
+
+    assert len(library.index()) == 2
+    assert len(list(library.iterMolecules())) == 2
+
+
+def test_smiles_names(tmp_path):
+    path = tmp_path / "lib.smi"
+    path.write_text("# header\nCCO ethanol\nCCC\n\nCCN a/b\n")
+    library = LigandLibrary(str(path))
+
+    assert [name for name, _ in library.iterMolecules()] == ["ethanol_0", "lib_1", "a_b_2"]
+    assert library.get(2) == ("a_b_2", "CCN")
@@ -0,0 +1,63 @@
+import polars as pl
+
+from adpy import AutoDock, DockingJob, ResultStore
+
+
+def make_job(ligand, receptor, output_dir):
+    return DockingJob(ligand, receptor, (0.0, 0.0, 0.0), (20, 20, 20), 8, 1, output_dir)
+
+
+def test_stored_results_are_reused(tmp_path, receptor, make_ligand):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    store_path = str(tmp_path / "results.sqlite")
+    job = make_job(make_ligand("a"), receptor, str(output_dir))
+
+    first = AutoDock(result_store=ResultStore(store_path))._run_jobs([job])
+    assert first["status"].to_list() == ["ok"]
+
+    # Same ligand content under another name
+    renamed = make_job(make_ligand("copy", "REMARK a\n"), receptor, str(output_dir))
+    docker = AutoDock(result_store=ResultStore(store_path), timing=True)
+    reused = docker._run_jobs([job, renamed])
+
+    assert docker.v.docks == 0
+    assert docker.result_store.hits == 2
+    assert reused["status"].to_list() == ["reused", "reused"]
+    assert reused["ligand"].to_list() == ["a", "copy"]
+    assert reused["binding_affinity"].to_list() == first["binding_affinity"].to_list() * 2
+    # Timing of the run that docked the job is not reused
+    assert reused["time_total"].dtype == pl.Float64
+    assert reused["time_total"].to_list() == [None, None]
+    assert (output_dir / "copy_rec.pdbqt").exists()
+
+
+def test_key_depends_on_settings(tmp_path, receptor, make_ligand):
+    store = ResultStore(str(tmp_path / "results.sqlite"))
+    job = make_job(make_ligand("a"), receptor, str(tmp_path))
+
+    plain = store.key(job, 0.375, "vina", 1)
+    assert store.key(job, 0.375, "vina", 1) == plain
+    keys = {
+        plain,
+        store.key(job, 0.375, "vina", 2),
+        store.key(job, 0.375, "vinardo", 1),
+        store.key(job, 0.5, "vina", 1),
+        store.key(job, 0.375, "vina", 1, cluster_rmsd=2.0),
+        store.key(job, 0.375, "vina", 1, diagnostics=True),
+    }
+    assert len(keys) == 6
+
+
+def test_diagnostics_run_does_not_reuse_plain_results(tmp_path, receptor, make_ligand):
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    store_path = str(tmp_path / "results.sqlite")
+    job = make_job(make_ligand("a"), receptor, str(output_dir))
+
+    AutoDock(result_store=ResultStore(store_path))._run_jobs([job])
+    docker = AutoDock(result_store=ResultStore(store_path), diagnostics=True)
+    df = docker._run_jobs([job])
+
+    assert df["status"].to_list() == ["ok"]
+    assert docker.v.docks == 1
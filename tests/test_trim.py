@@ -0,0 +1,27 @@
+from adpy.trim import trimReceptor
+
+
+def atom(serial, chain, resseq, x, plddt):
+    return (
+        f"ATOM  {serial:5d}  CA  ALA {chain}{resseq:4d}    "
+        f"{x:8.3f}{0.0:8.3f}{0.0:8.3f}  1.00{plddt:6.2f}           C  \n"
+    )
+
+
+def test_ter_records_of_kept_chains_survive(tmp_path):
+    query = tmp_path / "rec.pdb"
+    query.write_text(
+        atom(1, "A", 1, 0.0, 90.0)
+        + atom(2, "A", 2, 1.0, 20.0)
+        + "TER       3      ALA A   2\n"
+        + atom(4, "B", 1, 2.0, 20.0)
+        + "TER       5      ALA B   1\n"
+        + atom(6, "C", 1, 3.0, 90.0)
+        + "TER\n"
+        + "END\n"
+    )
+
+    output = trimReceptor(str(query), str(tmp_path / "trimmed.pdb"), min_plddt=50.0)
+
+    records = [line[:6].strip() + line[21:22] for line in open(output)]
+    assert records == ["ATOMA", "TERA", "ATOMC", "TER", "END"]